@@ -60,8 +60,7 @@ for item in bld_2.components:
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
 # and other information are stored in Environment objects.
-# prj.time_cluster(nr_periods=15, save_cls='15day_24hour.csv')
-prj.time_cluster(read_cls='15day_24hour.csv')
+prj.time_cluster(nr_periods=15)
 
 # After clustering need to update the demand profiles and storage assumptions.
 for bld in prj.building_list:
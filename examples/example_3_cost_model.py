@@ -54,8 +54,7 @@ for comp in bld_1.components.values():
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
 # and other information are stored in Environment objects.
-# prj_2.time_cluster(nr_periods=12, save_cls='12day_24hour.csv')
-project_1.time_cluster(read_cls='15day_24hour.csv')
+project_1.time_cluster(nr_periods=15)
 
 # After clustering need to update the demand profiles and storage assumptions.
 for bld in project_1.building_list:
@@ -105,8 +104,7 @@ for comp in bld_2.components.values():
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
 # and other information are stored in Environment objects.
-# prj_2.time_cluster(nr_periods=12, save_cls='12day_24hour.csv')
-project_2.time_cluster(read_cls='15day_24hour.csv')
+project_2.time_cluster(nr_periods=15)
 
 # After clustering need to update the demand profiles and storage assumptions.
 for bld in project_2.building_list:
@@ -150,8 +148,7 @@ for comp in bld_3.components.values():
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
 # and other information are stored in Environment objects.
-# prj_2.time_cluster(nr_periods=5, save_cls='5day_24hour.csv')
-project_3.time_cluster(read_cls='15day_24hour.csv')
+project_3.time_cluster(nr_periods=15)
 
 # After clustering need to update the demand profiles and storage assumptions.
 for bld in project_3.building_list:
@@ -62,8 +62,7 @@ prj.add_building(bld_4)
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
 # and other information are stored in Environment objects.
-# prj.time_cluster(nr_periods=15, save_cls='15day_24hour.csv')
-prj.time_cluster(read_cls='15day_24hour.csv')
+prj.time_cluster(nr_periods=15)
 
 # After clustering need to update the demand profiles and storage assumptions.
 for bld in prj.building_list:
@@ -144,8 +143,7 @@ prj_2.add_building(bld_5)
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
 # and other information are stored in Environment objects.
-# prj_2.time_cluster(nr_periods=12, save_cls='12day_24hour.csv')
-prj_2.time_cluster(read_cls='15day_24hour.csv')
+prj_2.time_cluster(nr_periods=15)
 
 # After clustering need to update the demand profiles and storage assumptions.
 for bld in prj_2.building_list:
@@ -198,8 +196,7 @@ prj_3.add_building(bld_6)
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
 # and other information are stored in Environment objects.
-# prj_2.time_cluster(nr_periods=12, save_cls='12day_24hour.csv')
-prj_3.time_cluster(read_cls='15day_24hour.csv')
+prj_3.time_cluster(nr_periods=15)
 
 # After clustering need to update the demand profiles and storage assumptions.
 for bld in prj_3.building_list:
@@ -46,7 +46,9 @@ project.add_building(bld_5)
 ################################################################################
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
-# and other information are stored in Environment objects.
+# and other information are stored in Environment objects. The result is
+# stored in the cluster cache in data/cluster_cache and reused in the next
+# runs with the same profiles and settings.
 project.time_cluster(nr_periods=12)
 # project.time_cluster(read_cls='3day_24hour.csv')
 
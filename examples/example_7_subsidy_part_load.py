@@ -76,8 +76,7 @@ for item in bld_4.components:
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
 # and other information are stored in Environment objects.
-# prj.time_cluster(nr_periods=15, save_cls='15day_24hour.csv')
-prj.time_cluster(read_cls='15day_24hour.csv')
+prj.time_cluster(nr_periods=15)
 
 # After clustering need to update the demand profiles and storage assumptions.
 for bld in prj.building_list:
@@ -170,8 +169,7 @@ for item in bld_5.components:
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
 # and other information are stored in Environment objects.
-# prj_2.time_cluster(nr_periods=12, save_cls='12day_24hour.csv')
-prj_2.time_cluster(read_cls='15day_24hour.csv')
+prj_2.time_cluster(nr_periods=15)
 
 # After clustering need to update the demand profiles and storage assumptions.
 for bld in prj_2.building_list:
@@ -237,8 +235,7 @@ for item in bld_6.components:
 # The profiles could be clustered are: demand profiles, weather profiles and
 # prices profiles (if necessary). demand profiles are stored in buildings
 # and other information are stored in Environment objects.
-# prj_2.time_cluster(nr_periods=12, save_cls='12day_24hour.csv')
-prj_3.time_cluster(read_cls='15day_24hour.csv')
+prj_3.time_cluster(nr_periods=15)
 
 # After clustering need to update the demand profiles and storage assumptions.
 for bld in prj_3.building_list:
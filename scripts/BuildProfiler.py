@@ -0,0 +1,117 @@
+"""
+The build profiler records the wall time, the allocated memory and the size
+of the pyomo components, which are created in each step of the model build.
+It helps to find the component or subsidy, which makes the build slow or the
+MILP huge. The profiler is attached to the model as model.profiler, if the
+model is built with profile=True in Project.build_model.
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+import pyomo.environ as pyo
+from pyomo.gdp import Disjunct
+
+
+class BuildProfiler(object):
+    """
+    Each record is one step of the build with owner and stage, for example
+    ('heat_pump', 'add_cons'). The records are nested: the record of the
+    building contains its components and the record of a component contains
+    its subsidies. The counts are the numbers of indexed elements, which are
+    created in the step, including the entries in model.cons. The
+    constraints in the disjuncts are counted in add_cons, the gdp
+    transformation deactivates them and adds the relaxed constraints.
+    """
+
+    columns = ['level', 'owner', 'stage', 'time', 'memory', 'vars',
+               'binaries', 'constraints', 'disjuncts']
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+
+    @contextmanager
+    def record(self, model, owner, stage, level='component'):
+        """Record the step in the with block."""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        names = set(model.component_map().keys())
+        cons = set(model.cons.keys())
+        memory = tracemalloc.get_traced_memory()[0] if \
+            tracemalloc.is_tracing() else 0
+        start = time.perf_counter()
+        yield
+        duration = time.perf_counter() - start
+        if tracemalloc.is_tracing():
+            memory = tracemalloc.get_traced_memory()[0] - memory
+
+        new_components = [component for name, component in
+                          model.component_map().items() if name not in names]
+        counts = _count(new_components)
+        counts['constraints'] += len([index for index in model.cons.keys()
+                                      if index not in cons])
+        self.records.append({'level': level, 'owner': owner, 'stage': stage,
+                             'time': duration,
+                             'memory': memory / 1024 ** 2, **counts})
+
+    def stop(self):
+        """Stop tracing the memory allocation, which slows down the build."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def to_dataframe(self):
+        """The time is given in second and the memory in MB."""
+        return pd.DataFrame(self.records, columns=self.columns)
+
+    def save(self, path):
+        """Save the records as csv and json file, the path is without file
+        extension."""
+        self.to_dataframe().to_csv(path + '.csv')
+        with open(path + '.json', 'w') as f:
+            json.dump(self.records, f, indent=2)
+
+
+def _count(components):
+    """Count the indexed elements in the components and in the blocks of the
+    disjuncts."""
+    counts = {'vars': 0, 'binaries': 0, 'constraints': 0, 'disjuncts': 0}
+    for component in components:
+        if component.ctype is pyo.Var:
+            counts['vars'] += len(component)
+            counts['binaries'] += len([v for v in component.values() if
+                                       v.is_binary()])
+        elif component.ctype is pyo.Constraint:
+            counts['constraints'] += len(component)
+        elif isinstance(component, pyo.Block):
+            # Disjuncts and the blocks from gdp transformation.
+            for block in component.values():
+                if block.ctype is Disjunct:
+                    counts['disjuncts'] += 1
+                # The references in the gdp transformation blocks point to
+                # the existing variables, so they are not counted.
+                for var in block.component_objects(pyo.Var,
+                                                   descend_into=True):
+                    if var.is_reference():
+                        continue
+                    counts['vars'] += len(var)
+                    counts['binaries'] += len([v for v in var.values() if
+                                               v.is_binary()])
+                counts['constraints'] += len(list(
+                    block.component_data_objects(pyo.Constraint, active=True,
+                                                 descend_into=True)))
+    return counts
+
+
+@contextmanager
+def profile(model, owner, stage, level='component'):
+    """Record the with block, if the model has a profiler. Otherwise nothing
+    is done."""
+    profiler = getattr(model, 'profiler', None)
+    if profiler is None or not model.is_constructed():
+        yield
+        return
+    with profiler.record(model, owner, stage, level):
+        yield
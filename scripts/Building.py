@@ -1,15 +1,22 @@
 import warnings
+import numpy as np
 import pyomo.environ as pyo
 from pyomo.gdp import Disjunct, Disjunction
 
+from scripts.Component import Component
 from scripts.components.Storage import Storage
 from scripts.subsidies.PurchaseSubsidy import PurchaseSubsidy
 from scripts.subsidies.OperateSubsidy import OperateSubsidy
+from scripts.VarRegistry import get_registry
+from scripts.BuildProfiler import profile
+from scripts.MatrixModel import MatrixVar
 from utils.gen_heat_profile import *
 from utils.gen_elec_profile import gen_elec_profile
 from utils import get_all_class
 from utils.gen_hot_water_profile import gen_hot_water_profile
 from utils.get_subsidy import check_subsidy
+from utils.weighted_sum import time_weights, time_durations, \
+    period_length, weighted_sum
 
 
 module_dict = get_all_class.run()
@@ -288,24 +295,35 @@ class Building(object):
         storage should take additional assumption.
         The operation subsidy are also updated, since the operation subsidy is
         related to the energy demand for each time step.
+        If several buildings are clustered together, the demand profiles of
+        the building are taken from the columns with the building name, see
+        cluster_column.
+        The number of time steps in a typical period and the durations of the
+        time steps of segmented periods are given to all components, e.g.
+        for the energy balance of storages and the status of CHP.
         """
         for item in self.topology.index:
             comp_name = self.topology['comp_name'][item]
+            self.components[comp_name].period_length = period_length(cluster)
+            self.components[comp_name].durations = time_durations(cluster)
             if self.topology['comp_type'][item] in ['HeatConsumption']:
                 # cluster_profile = pd.Series(cluster.clusterPeriodDict[
                 #     'heat_demand']).tolist()
-                cluster_profile = cluster['heat_demand'].tolist()
+                cluster_profile = self._cluster_profile(cluster,
+                                                         'heat_demand')
                 self.components[comp_name].update_profile(
                     consum_profile=cluster_profile)
             if self.topology['comp_type'][item] in ['ElectricalConsumption']:
-                cluster_profile = cluster['elec_demand'].tolist()
+                cluster_profile = self._cluster_profile(cluster,
+                                                         'elec_demand')
                 self.components[comp_name].update_profile(
                     consum_profile=cluster_profile)
             if self.topology['comp_type'][item] in ['HotWaterConsumption'
                                                     ]:
                 # cluster_profile = pd.Series(cluster.clusterPeriodDict[
                 #                                 'hot_water_demand']).tolist()
-                cluster_profile = cluster['hot_water_demand'].tolist()
+                cluster_profile = self._cluster_profile(cluster,
+                                                         'hot_water_demand')
                 self.components[comp_name].update_profile(
                     consum_profile=cluster_profile)
             if self.topology['comp_type'][item] in ['HeatPump',
@@ -335,6 +353,18 @@ class Building(object):
                 # The indicator cluster in storage could determine if the
                 # cluster function should be called.
                 self.components[comp_name].cluster = cluster['Occur'].tolist()
+                self.components[comp_name].cluster_order = cluster.attrs.get(
+                    'cluster_order')
+
+    def cluster_column(self, profile):
+        """The name of the demand profile of the building in the joint
+        clustering of several buildings, see Project.time_cluster."""
+        return self.name + '.' + profile
+
+    def _cluster_profile(self, cluster, profile):
+        if self.cluster_column(profile) in cluster.columns:
+            return cluster[self.cluster_column(profile)].tolist()
+        return cluster[profile].tolist()
 
     def update_subsidy(self, cluster):
         """Update the operation subsidy, which is related to the energy demand
@@ -384,6 +414,144 @@ class Building(object):
             self.components[index].add_energy_flows(
                 'input', energy_type, (input_comp, index))
 
+    def prune_topology(self, report=True):
+        """
+        Analyse the topology before the variables are created and remove the
+        parts, which could never carry energy:
+            zero capacity: components with max_size 0, their outputs are
+                limited to 0 by the constraint maxpower.
+            no source: energy flows, which could not be reached from any
+                energy source (grids, solar components).
+            no sink: energy flows, which could not reach any consumption or
+                the grid for feed-in, including the flows into components
+                without the matching input energy type.
+            unused: components without any remaining energy flow.
+        The consumptions are never removed. The method should be called after
+        add_components and before Project.build_model.
+        :return: dataframe with the pruned items and reasons.
+        """
+        flow_types = list(self.energy_flows.keys())
+        # The grids have no conversion, they supply energy and take the
+        # energy for feed-in.
+        grid_types = ['ElectricityGrid', 'GasGrid', 'HeatGrid',
+                      'BiomassSource']
+        consumption_types = ['HeatConsumption', 'ElectricalConsumption',
+                             'HotWaterConsumption']
+
+        flows = [(energy, flow[0], flow[1]) for energy in self.energy_flows
+                 for flow in self.energy_flows[energy]]
+
+        zero_capacity = []
+        for name, comp in self.components.items():
+            limited = (isinstance(comp, Storage) or
+                       type(comp)._constraint_maxpower is
+                       Component._constraint_maxpower)
+            if comp.max_size == 0 and limited and \
+                    comp.component_type not in consumption_types:
+                zero_capacity.append(name)
+
+        # Forward search from sources: (component, energy) pairs, which could
+        # provide energy.
+        supply = set()
+        for name, comp in self.components.items():
+            if name in zero_capacity or comp.outputs is None:
+                continue
+            if comp.component_type in grid_types or not comp.inputs or \
+                    any(item not in flow_types for item in comp.inputs):
+                supply |= {(name, energy) for energy in comp.outputs}
+        changed = True
+        while changed:
+            changed = False
+            for energy, src, dst in flows:
+                comp = self.components[dst]
+                if (src, energy) in supply and dst not in zero_capacity and \
+                        comp.inputs is not None and energy in comp.inputs \
+                        and comp.outputs is not None:
+                    new = {(dst, item) for item in comp.outputs} - supply
+                    if new:
+                        supply |= new
+                        changed = True
+
+        # Backward search from sinks: (component, energy) pairs, which could
+        # take energy.
+        demand = set()
+        for name, comp in self.components.items():
+            if comp.inputs is None:
+                continue
+            if comp.component_type in grid_types or not comp.outputs:
+                demand |= {(name, energy) for energy in comp.inputs}
+        changed = True
+        while changed:
+            changed = False
+            for energy, src, dst in flows:
+                comp = self.components[src]
+                if (dst, energy) in demand and src not in zero_capacity and \
+                        comp.outputs is not None and energy in comp.outputs \
+                        and comp.inputs is not None:
+                    new = {(src, item) for item in comp.inputs} - demand
+                    if new:
+                        demand |= new
+                        changed = True
+
+        pruned = []
+        kept_flows = []
+        for energy, src, dst in flows:
+            if (src, energy) not in supply:
+                reason = 'zero capacity' if src in zero_capacity else \
+                    'no source'
+                pruned.append(('flow', energy + '_' + src + '_' + dst,
+                               reason))
+            elif (dst, energy) not in demand:
+                pruned.append(('flow', energy + '_' + src + '_' + dst,
+                               'no sink'))
+            else:
+                kept_flows.append((energy, src, dst))
+
+        used_comps = {item for flow in kept_flows for item in flow[1:]}
+        removed_comps = []
+        for name, comp in self.components.items():
+            if name in used_comps:
+                continue
+            if comp.component_type in consumption_types:
+                warn('The consumption ' + name + ' could not be supplied by '
+                     'any source in the topology.')
+                continue
+            removed_comps.append(name)
+            pruned.append(('component', name, 'zero capacity' if name in
+                           zero_capacity else 'unused'))
+
+        # Rebuild the energy flows with the remaining flows. The removed
+        # flows between remaining components are still in the simp_matrix,
+        # so the constraints sum_input and sum_output keep the related
+        # inputs and outputs at 0.
+        for energy in self.energy_flows:
+            self.energy_flows[energy] = {}
+        for name, comp in self.components.items():
+            comp.energy_flows = {'input': {}, 'output': {}}
+        for energy, src, dst in kept_flows:
+            self.energy_flows[energy][(src, dst)] = None
+            self.components[src].add_energy_flows('output', energy,
+                                                  (src, dst))
+            self.components[dst].add_energy_flows('input', energy,
+                                                  (src, dst))
+
+        for name in removed_comps:
+            del self.components[name]
+        self.topology = self.topology[~self.topology['comp_name'].isin(
+            removed_comps)].drop(removed_comps, axis=1)
+        self.simp_matrix = self.simp_matrix.drop(removed_comps, axis=0).drop(
+            removed_comps, axis=1)
+
+        pruned_df = pd.DataFrame(pruned, columns=['item', 'name', 'reason'])
+        if report:
+            print('Topology pruning for ' + self.name + ': ' +
+                  str(len(removed_comps)) + ' components and ' +
+                  str(len(flows) - len(kept_flows)) + ' energy flows are '
+                  'removed.')
+            if len(pruned_df.index) > 0:
+                print(pruned_df.to_string(index=False))
+        return pruned_df
+
     def add_subsidy(self, subsidy_df, building='all'):
         # todo(yni): the current version doesn't consider the building type
         #  and user condition for the subsidy, which should be added later.
@@ -433,6 +601,14 @@ class Building(object):
                                              building=building,
                                              require_name=elec_grid_name)
 
+    def _add_var(self, model, key, var):
+        """Add the variable into the model and register it with the building
+        name as owner."""
+        return get_registry(model).add(model, self.name, key, var)
+
+    def _get_var(self, model, key):
+        return get_registry(model).get(model, self.name, key)
+
     def add_vars(self, model):
         """Add Pyomo variables into the ConcreteModel, which is defined in
         project object. So the model should be given in project object
@@ -445,20 +621,22 @@ class Building(object):
             assigned in each component object. For each time step.
             Component size: should be assigned in component object, for once.
         """
+        registry = get_registry(model)
         for energy in self.energy_flows.keys():
             for flow in self.energy_flows[energy]:
                 self.energy_flows[energy][flow] = pyo.Var(
                     model.time_step, bounds=(0, 10 ** 8))
-                model.add_component(energy + '_' + flow[0] + '_' + flow[1],
-                                    self.energy_flows[energy][flow])
+                registry.add_flow(model, energy, flow[0], flow[1],
+                                  self.energy_flows[energy][flow])
 
         if self.bilevel:
             building_connection = pyo.Var(within=pyo.Binary) # yso: the
             # connection status of the building to the heating network
-            model.add_component('building_connection', building_connection)
+            registry.add(model, None, 'building_connection',
+                         building_connection)
             max_heat_power = pyo.Var(bounds=(0, None)) # the maximum power of the
             # building from the heating network
-            model.add_component('max_heat_power', max_heat_power)
+            registry.add(model, None, 'max_heat_power', max_heat_power)
             # yso: the fixed price categories will be differentiated based
             # on the use of heat from the heat grid
             if (hasattr(self, 'fixed_price_different_by_demand')
@@ -469,10 +647,12 @@ class Building(object):
                 consider_power_price = pyo.Var(within=pyo.Binary)
                 bc_cbp_product = pyo.Var(within=pyo.Binary)  # consider_basic_price和building_connection的乘积
                 bc_cpp_product = pyo.Var(within=pyo.Binary) # consider_power_price和building_connection的乘积
-                model.add_component('consider_basic_price', consider_basic_price)
-                model.add_component('consider_power_price', consider_power_price)
-                model.add_component('bc_cbp_product', bc_cbp_product)
-                model.add_component('bc_cpp_product', bc_cpp_product)
+                registry.add(model, None, 'consider_basic_price',
+                             consider_basic_price)
+                registry.add(model, None, 'consider_power_price',
+                             consider_power_price)
+                registry.add(model, None, 'bc_cbp_product', bc_cbp_product)
+                registry.add(model, None, 'bc_cpp_product', bc_cpp_product)
 
         # total_annual_cost = pyo.Var(bounds=(0, None)) # this definition
         # might cause infeasible solution, since the following definition
@@ -484,14 +664,15 @@ class Building(object):
         total_elec_pur = pyo.Var(bounds=(0, None))
         # Attention. The building name should be unique, not same as the comp
         # or project or other buildings.
-        model.add_component('annual_cost_' + self.name, total_annual_cost)
-        model.add_component('operation_cost_' + self.name, total_operation_cost)
-        model.add_component('total_revenue_' + self.name, total_annual_revenue)
-        model.add_component('other_op_cost_' + self.name, total_other_op_cost)
-        model.add_component('total_elec_pur_' + self.name, total_elec_pur)
+        self._add_var(model, 'annual_cost', total_annual_cost)
+        self._add_var(model, 'operation_cost', total_operation_cost)
+        self._add_var(model, 'total_revenue', total_annual_revenue)
+        self._add_var(model, 'other_op_cost', total_other_op_cost)
+        self._add_var(model, 'total_elec_pur', total_elec_pur)
 
         for comp in self.components:
-            self.components[comp].add_vars(model)
+            with profile(model, comp, 'add_vars'):
+                self.components[comp].add_vars(model)
 
         for sub in self.subsidy_list:
             sub.add_vars(model, self.name)
@@ -525,10 +706,17 @@ class Building(object):
 
         if len(self.subsidy_list) >= 1:
             for subsidy in self.subsidy_list:
-                subsidy.add_cons(model)
+                with profile(model, subsidy.name + '_' + self.name,
+                             'add_cons', level='subsidy'):
+                    subsidy.add_cons(model)
 
+        # The pyomo components created by each component are recorded, so
+        # that the component could be rebuilt alone, see Component.rebuild.
+        registry = get_registry(model)
         for comp in self.components:
-            self.components[comp].add_cons(model)
+            with registry.track(model, comp), \
+                    profile(model, comp, 'add_cons'):
+                self.components[comp].add_cons(model)
 
         constraint_solar_area = False
         for item in self.topology.index:
@@ -572,87 +760,123 @@ class Building(object):
     def _constraint_solar_area(self, model):
         """The total available solar area should be shared by PV and solar
         thermal collector."""
+        registry = get_registry(model)
         # 'solar_area_PV' means the area for PV, 'size_PV' means the peak power.
         #  'size_solar_coll' means the area of solar collector.
         solar_area_var_list = []
         for component in self.components:
             if isinstance(self.components[component], module_dict['PV']):
-                solar_area_var_list.append(model.find_component('solar_area_' +
-                                                                component))
+                solar_area_var_list.append(registry.get(model, component,
+                                                        'solar_area'))
             elif isinstance(self.components[component],
                             module_dict['SolarThermalCollector']):
-                solar_area_var_list.append(model.find_component('solar_area_' +
-                                                                component))
+                solar_area_var_list.append(registry.get(model, component,
+                                                        'solar_area'))
             elif isinstance(self.components[component],
                             module_dict['SolarThermalCollectorFlatPlate']):
-                solar_area_var_list.append(model.find_component('solar_area_' +
-                                                                component))
+                solar_area_var_list.append(registry.get(model, component,
+                                                        'solar_area'))
             elif isinstance(self.components[component],
                             module_dict['SolarThermalCollectorTube']):
-                solar_area_var_list.append(model.find_component('solar_area_' +
-                                                                component))
+                solar_area_var_list.append(registry.get(model, component,
+                                                        'solar_area'))
         model.cons.add(sum(item for item in solar_area_var_list) <=
                        self.solar_area)
 
     def _constraint_total_cost(self, model):
         """Calculate the total annual cost for the building energy system."""
-        bld_annual_cost = model.find_component('annual_cost_' + self.name)
-        bld_operation_cost = model.find_component('operation_cost_' + self.name)
-        bld_other_op_cost = model.find_component('other_op_cost_' + self.name)
-        bld_revenue = model.find_component('total_revenue_' + self.name)
+        registry = get_registry(model)
+        bld_annual_cost = self._get_var(model, 'annual_cost')
+        bld_operation_cost = self._get_var(model, 'operation_cost')
+        bld_other_op_cost = self._get_var(model, 'other_op_cost')
+        bld_revenue = self._get_var(model, 'total_revenue')
 
         comp_cost_list = []
         comp_subsidy_list = []
         for comp in self.components:
-            comp_cost_list.append(model.find_component('annual_cost_' + comp))
+            comp_cost_list.append(registry.get(model, comp, 'annual_cost'))
             for sub in self.components[comp].subsidy_list:
                 if sub.sub_type == 'purchase':
-                    comp_subsidy_list.append(model.find_component(
-                        'sub_annuity_' + sub.name + '_' + comp))
+                    comp_subsidy_list.append(registry.get(
+                        model, comp, 'sub_annuity_' + sub.name))
 
         model.cons.add(bld_annual_cost == sum(item for item in comp_cost_list) +
                        bld_operation_cost - bld_revenue -
                        sum(item for item in comp_subsidy_list))
 
+    @staticmethod
+    def _get_price(model, env, key):
+        """Return the mutable parameter of the price, which is added in
+        Project.build_model with mutable_prices=True. If the model has no
+        such parameter, the value in environment is used."""
+        registry = get_registry(model)
+        if registry.has('env', key):
+            return registry.get(model, 'env', key)
+        return getattr(env, key)
+
+    def _energy_vars(self, model, comp, io, energy_type):
+        """Return the variables for the input or output of the component as
+        list. If the input or output is an expression over the energy flows
+        (see flow_expression in Project.build_model), the variables of the
+        energy flows are returned, so that the annual sums are built over
+        variables."""
+        registry = get_registry(model)
+        var = registry.get(model, comp, io + '_' + energy_type)
+        if var is None:
+            return []
+        if isinstance(var, pyo.Var):
+            return [var]
+        return [registry.flow(model, energy_type, flow[0], flow[1]) for flow
+                in self.components[comp].energy_flows[io][energy_type]]
+
+    @staticmethod
+    def _priced_sum(model, variables, weights, price):
+        """The annual cost or revenue of the energy in variables. A constant
+        price is multiplied into the coefficients, a mutable price parameter
+        is kept as factor, so that it could be updated in the model."""
+        if not variables:
+            return 0
+        if isinstance(price, (int, float)):
+            return weighted_sum(variables, model.time_step, weights * price)
+        return price * weighted_sum(variables, model.time_step, weights)
+
     def _constraint_operation_cost(self, model, env, cluster=None):
         """Calculate the total operation cost for the building energy system."""
+        registry = get_registry(model)
         # fixme (yni): the operation cost should consider the revenue and
         #  operate subsidies.
-        bld_operation_cost = model.find_component('operation_cost_' + self.name)
-        bld_other_op_cost = model.find_component('other_op_cost_' + self.name)
+        bld_operation_cost = self._get_var(model, 'operation_cost')
+        bld_other_op_cost = self._get_var(model, 'other_op_cost')
 
         if self.bilevel:
-            max_heat_power = model.find_component('max_heat_power')
+            max_heat_power = registry.get(model, None, 'max_heat_power')
             if hasattr(self, 'fixed_price_different_by_demand') \
                     and self.fixed_price_different_by_demand == True:
-                bc_cbp_product = model.find_component('bc_cbp_product')
-                bc_cpp_product = model.find_component('bc_cpp_product')
+                bc_cbp_product = registry.get(model, None, 'bc_cbp_product')
+                bc_cpp_product = registry.get(model, None, 'bc_cpp_product')
             else:
-                building_connection = model.find_component('building_connection')
-
-        # The following elements (buy_elec, ...) are the energy purchase and
-        # sale volume in time series and used to avoid that the constraint
-        # added is not executed properly if there is a None. The reason for
-        # 8761 steps is the different index of python list and pyomo.
-        buy_elec = [0] * (env.time_step + 1)  # unmatched index for python and
-        # pyomo
-        # sell_elec = [0] * (env.time_step + 1)
-        buy_gas = [0] * (env.time_step + 1)
-        buy_heat = [0] * (env.time_step + 1)
-        buy_biomass = [0] * (env.time_step + 1)
+                building_connection = registry.get(model, None,
+                                                   'building_connection')
+
+        # The following elements (buy_elec, ...) are the variables of energy
+        # purchase in time series. If the component doesn't exist, the list
+        # is empty and the purchase makes no cost.
+        buy_elec = []
+        buy_gas = []
+        buy_heat = []
+        buy_biomass = []
 
         # comp_cost_list = []
         for comp in self.components:
             # comp_cost_list.append(model.find_component('annual_cost_' + comp))
             if isinstance(self.components[comp],
                           module_dict['ElectricityGrid']):
-                if 'elec' in self.components[comp].energy_flows['input'].keys():
-                    sell_elec = model.find_component('input_elec_' + comp)
                 if 'elec' in self.components[comp].energy_flows[
-                    'output'].keys():
-                    buy_elec = model.find_component('output_elec_' + comp)
+                        'output'].keys():
+                    buy_elec = self._energy_vars(model, comp, 'output',
+                                                 'elec')
             elif isinstance(self.components[comp], module_dict['GasGrid']):
-                buy_gas = model.find_component('output_gas_' + comp)
+                buy_gas = self._energy_vars(model, comp, 'output', 'gas')
             elif isinstance(self.components[comp], module_dict['HeatGrid']):
                 # todo (yni): take care of the situation for variable mass
                 #  flow. the calculation of heat price take the amount of
@@ -662,9 +886,14 @@ class Building(object):
                 #  energy of energy, is that the energy loss of heat grid could
                 #  be seen as part of the heat exchanger, so it could reduce the
                 #  model complexity.
-                buy_heat = model.find_component('output_heat_' + comp)
+                buy_heat = self._energy_vars(model, comp, 'output', 'heat')
             elif isinstance(self.components[comp], module_dict['BiomassSource']):
-                buy_biomass = model.find_component('output_biomass_' + comp)
+                buy_biomass = self._energy_vars(model, comp, 'output',
+                                                'biomass')
+
+        # The weight of each time step is the number of occurrence of the
+        # typical period, if the time series is clustered.
+        weights = time_weights(model.time_step, cluster)
 
         if self.type == 'EnergyHub':
             # yso: Here are the industrial energy prices
@@ -672,29 +901,17 @@ class Building(object):
             heat_price = env.heat_price_hub
             gas_price = env.gas_price_hub
 
-            if cluster is None:
-                model.cons.add(
-                    bld_operation_cost == sum(buy_elec[t] * elec_price +
-                                              buy_gas[t] * gas_price +
-                                              buy_heat[t] * heat_price
-                                              for t in model.time_step) +
-                    bld_other_op_cost)
-            else:
-                nr_hour_occur = cluster['Occur']
-
-                model.cons.add(
-                    bld_operation_cost == sum(buy_elec[t] * elec_price *
-                                              nr_hour_occur[t - 1] + buy_gas[t] *
-                                              gas_price * nr_hour_occur[t - 1] +
-                                              buy_heat[t] * heat_price *
-                                              nr_hour_occur[t - 1]
-                                              for t in model.time_step) +
-                    bld_other_op_cost)
+            model.cons.add(
+                bld_operation_cost ==
+                self._priced_sum(model, buy_elec, weights, elec_price) +
+                self._priced_sum(model, buy_gas, weights, gas_price) +
+                self._priced_sum(model, buy_heat, weights, heat_price) +
+                bld_other_op_cost)
         else:
             if self.bilevel:
                 elec_price = model.elec_price
             else:
-                elec_price = env.elec_price
+                elec_price = self._get_price(model, env, 'elec_price')
 
             if model.find_component('heat_price'):
                 if len(model.heat_price.index_set()) == 1:
@@ -703,7 +920,7 @@ class Building(object):
                     heat_price = None
                     warn('The dynamic heat price is not developed, please check')
             else:
-                heat_price = env.heat_price
+                heat_price = self._get_price(model, env, 'heat_price')
 
             if model.find_component('heat_basic_price'):
                 if len(model.heat_basic_price.index_set()) == 1:
@@ -723,51 +940,22 @@ class Building(object):
             else:
                 heat_power_price = 0
 
-            gas_price = env.gas_price
+            gas_price = self._get_price(model, env, 'gas_price')
+
+            energy_cost = (
+                self._priced_sum(model, buy_elec, weights, elec_price) +
+                self._priced_sum(model, buy_gas, weights, gas_price) +
+                self._priced_sum(model, buy_heat, weights, heat_price))
 
             if hasattr(self, 'fixed_price_different_by_demand') \
                     and self.fixed_price_different_by_demand == True:
-                if cluster is None:
-                    model.cons.add(
-                        bld_operation_cost == sum(buy_elec[t] * elec_price +
-                                                  buy_gas[t] * gas_price +
-                                                  buy_heat[t] *
-                                                  heat_price
-                                                  for t in model.time_step) +
-                        bld_other_op_cost + heat_basic_price * bc_cbp_product +
-                        max_heat_power * heat_power_price * bc_cpp_product)
-                else:
-                    nr_hour_occur = cluster['Occur']
-
-                    model.cons.add(
-                        bld_operation_cost == sum(buy_elec[t] * elec_price *
-                                                  nr_hour_occur[t - 1] + buy_gas[t] *
-                                                  gas_price * nr_hour_occur[t - 1] +
-                                                  buy_heat[t] * heat_price *
-                                                  nr_hour_occur[t - 1]
-                                                  for t in model.time_step) +
-                        bld_other_op_cost + heat_basic_price * bc_cbp_product +
-                        max_heat_power * heat_power_price * bc_cpp_product)
+                model.cons.add(
+                    bld_operation_cost == energy_cost +
+                    bld_other_op_cost + heat_basic_price * bc_cbp_product +
+                    max_heat_power * heat_power_price * bc_cpp_product)
             else:
-                if cluster is None:
-                    model.cons.add(
-                        bld_operation_cost == sum(buy_elec[t] * elec_price +
-                                                buy_gas[t] * gas_price +
-                                                buy_heat[t] *
-                                                heat_price
-                                                for t in model.time_step) +
-                        bld_other_op_cost )
-                else:
-                    nr_hour_occur = cluster['Occur']
-
-                    model.cons.add(
-                        bld_operation_cost == sum(buy_elec[t] * elec_price *
-                                                nr_hour_occur[t - 1] + buy_gas[t] *
-                                                gas_price * nr_hour_occur[t - 1] +
-                                                buy_heat[t] * heat_price *
-                                                nr_hour_occur[t - 1]
-                                                for t in model.time_step) +
-                        bld_other_op_cost)
+                model.cons.add(
+                    bld_operation_cost == energy_cost + bld_other_op_cost)
 
         # if cluster is None:
         #     model.cons.add(
@@ -803,7 +991,8 @@ class Building(object):
         """The total revenue of the building is the sum of the revenue of
         supplied electricity. The operation subsidies are also considered in
         the revenue."""
-        bld_revenue = model.find_component('total_revenue_' + self.name)
+        registry = get_registry(model)
+        bld_revenue = self._get_var(model, 'total_revenue')
         # bld_op_subsidy = model.find_component('total_op_subsidy_' + self.name)
         # bld_op_sub_quantity = model.find_component(
         #     'total_op_sub_quantity_' + self.name)
@@ -814,26 +1003,25 @@ class Building(object):
         for comp in self.components:
             for sub in self.components[comp].subsidy_list:
                 if sub.sub_type == 'operate':
-                    op_subsidy_list.append(model.find_component(
-                        'sub_annuity_' + sub.name + '_' + sub.sbj_name))
-                    op_subsiy_quantity_list.append(model.find_component(
-                        'sub_quantity_' + sub.name + '_' + sub.sbj_name))
-
-        # The following elements (buy_elec, ...) are the energy purchase and
-        # sale volume in time series and used to avoid that the constraint
-        # added is not executed properly if there is a None. The reason for
-        # 8761 steps is the different index of python list and pyomo.
-        sell_elec = [0] * (env.time_step + 1)
+                    op_subsidy_list.append(registry.get(
+                        model, sub.sbj_name, 'sub_annuity_' + sub.name))
+                    op_subsiy_quantity_list.append(registry.get(
+                        model, sub.sbj_name, 'sub_quantity_' + sub.name))
+
+        # The following elements (sell_elec, ...) are the variables of energy
+        # sale in time series. If the component doesn't exist, the list is
+        # empty and makes no revenue.
+        sell_elec = []
         # selling heat is not considered in the current version.
-        sell_heat = [0] * (env.time_step + 1)
+        sell_heat = []
 
         for comp in self.components:
             if isinstance(self.components[comp],
                           module_dict['ElectricityGrid']):
                 if 'elec' in self.components[comp].energy_flows['input'].keys():
-                    sell_elec = model.find_component('input_elec_' + comp)
+                    sell_elec = self._energy_vars(model, comp, 'input', 'elec')
             elif isinstance(self.components[comp], module_dict['HeatGrid']):
-                sell_heat = model.find_component('input_heat_' + comp)
+                sell_heat = self._energy_vars(model, comp, 'input', 'heat')
 
         # This part is for the AbstractModel, which is used for the bilevel.
         # For building part, which would just use the given value from the
@@ -841,44 +1029,31 @@ class Building(object):
         if model.find_component('elec_feed_price'):
             elec_feed_price = model.elec_feed_price
         else:
-            elec_feed_price = env.elec_feed_price
-
-        if cluster is None:
-            model.cons.add(bld_revenue == sum((sell_elec[t]) * elec_feed_price
-                                              for t in model.time_step) +
-                           sum(item for item in op_subsidy_list) -
-                           sum(item for item in op_subsiy_quantity_list) *
-                           elec_feed_price)
-        else:
-            # Attention! The period only for 24 hours is developed,
-            # other segments are not considered.
-            # period_length = 24
-            #
-            # nr_day_occur = pd.Series(cluster.clusterPeriodNoOccur).tolist()
-            # nr_hour_occur = []
-            # for nr_occur in nr_day_occur:
-            #     nr_hour_occur += [nr_occur] * 24
-            nr_hour_occur = cluster['Occur']
-
-            model.cons.add(bld_revenue == sum((sell_elec[t]) * elec_feed_price *
-                                              nr_hour_occur[t - 1] for t in
-                                              model.time_step) +
-                           sum(item for item in op_subsidy_list) -
-                           sum(item for item in op_subsiy_quantity_list) *
-                           elec_feed_price)
+            elec_feed_price = self._get_price(model, env, 'elec_feed_price')
+
+        # Attention! The period only for 24 hours is developed, other
+        # segments are not considered.
+        weights = time_weights(model.time_step, cluster)
+
+        model.cons.add(bld_revenue ==
+                       self._priced_sum(model, sell_elec, weights,
+                                        elec_feed_price) +
+                       sum(item for item in op_subsidy_list) -
+                       sum(item for item in op_subsiy_quantity_list) *
+                       elec_feed_price)
 
     def _constraint_other_op_cost(self, model):
         """Other operation costs includes the costs except the fuel cost. One
         of the most common form ist the start-up cost for CHPs."""
+        registry = get_registry(model)
         # todo (qli&yni): the other operation cost should be tested with
         #  cluster methods
-        bld_other_op_cost = model.find_component('other_op_cost_' + self.name)
+        bld_other_op_cost = self._get_var(model, 'other_op_cost')
 
         other_op_comp_list = []
         for comp in self.components:
             if self.components[comp].other_op_cost:
-                comp_other_op_cost = model.find_component('other_op_cost_' +
-                                                          comp)
+                comp_other_op_cost = registry.get(model, comp, 'other_op_cost')
                 other_op_comp_list.append(comp_other_op_cost)
 
         model.cons.add(bld_other_op_cost == sum(comp_op for comp_op
@@ -888,33 +1063,32 @@ class Building(object):
         """The electricity purchase constraint is added to the model. The
         constraint is added to the model if the electricity is purchased
         from the grid."""
-        buy_elec = [0] * len(model.time_step)
-        elec_pur = model.find_component('total_elec_pur_' + self.name)
+        registry = get_registry(model)
+        buy_elec = []
+        elec_pur = self._get_var(model, 'total_elec_pur')
         for comp in self.components:
             if isinstance(self.components[comp],
                           module_dict['ElectricityGrid']):
                 if 'elec' in self.components[comp].energy_flows[
                     'output'].keys():
-                    buy_elec = model.find_component('output_elec_' + comp)
+                    buy_elec = self._energy_vars(model, comp, 'output',
+                                                 'elec')
 
-        if cluster is None:
-            model.cons.add(elec_pur == sum(buy_elec[t] for t in model.time_step))
-        else:
-            nr_hour_occur = cluster['Occur']
-            model.cons.add(elec_pur == sum(buy_elec[t] *  nr_hour_occur[t - 1]
-                                            for t in model.time_step))
+        model.cons.add(elec_pur == weighted_sum(
+            buy_elec, model.time_step, time_weights(model.time_step, cluster)))
 
     def _constraint_building_connection(self, model, env):
         """This constraint is used to determine the connection status of
         the building and the heating pipe network."""
-        building_connection = model.find_component('building_connection')
+        registry = get_registry(model)
+        building_connection = registry.get(model, None, 'building_connection')
 
         M = 1e9
 
         buy_heat = [0] * (len(model.time_step))
         for comp in self.components:
             if isinstance(self.components[comp], module_dict['HeatGrid']):
-                buy_heat = model.find_component('output_heat_' + comp)
+                buy_heat = registry.get(model, comp, 'output_heat')
 
         def _building_connection_rule(model,t):
             return buy_heat[t] <= M * building_connection
@@ -926,12 +1100,13 @@ class Building(object):
         """This constraint is used to determine the maximum heat output from heating
         network to building.This value represents the building's peak power, which is
         employed in calculating the heat power price."""
-        max_heat_power = model.find_component('max_heat_power')
+        registry = get_registry(model)
+        max_heat_power = registry.get(model, None, 'max_heat_power')
 
         buy_heat = [0] * (len(model.time_step))
         for comp in self.components:
             if isinstance(self.components[comp], module_dict['HeatGrid']):
-                buy_heat = model.find_component('output_heat_' + comp)
+                buy_heat = registry.get(model, comp, 'output_heat')
 
         def _max_heat_power_rule(model, t):
             return max_heat_power >= buy_heat[t]
@@ -940,15 +1115,17 @@ class Building(object):
                                                         rule=_max_heat_power_rule)
 
     def _constraint_fixed_price_different(self, model, env, cluster):
-        consider_basic_price = model.find_component('consider_basic_price')
-        consider_power_price = model.find_component('consider_power_price')
+        registry = get_registry(model)
+        consider_basic_price = registry.get(model, None, 'consider_basic_price')
+        consider_power_price = registry.get(model, None, 'consider_power_price')
 
         if (hasattr(self, 'fixed_price_different_by_demand')
             and self.fixed_price_different_by_demand):
-            buy_heat = [0] * len(model.time_step)
+            buy_heat = []
             for comp in self.components:
                 if isinstance(self.components[comp], module_dict['HeatGrid']):
-                    buy_heat = model.find_component('output_heat_' + comp)
+                    buy_heat = self._energy_vars(model, comp, 'output',
+                                                 'heat')
 
             if model.find_component('price_demand_threshold'):
                 if len(model.price_demand_threshold.index_set()) == 1:
@@ -959,11 +1136,8 @@ class Building(object):
             else:
                 price_demand_threshold = 0
 
-            if cluster is None:
-                sum_buy_heat = sum(buy_heat[t] for t in model.time_step)
-            else:
-                nr_hour_occur = cluster['Occur']
-                sum_buy_heat = sum(buy_heat[t] * nr_hour_occur[t - 1] for t in model.time_step)
+            sum_buy_heat = weighted_sum(buy_heat, model.time_step,
+                                        time_weights(model.time_step, cluster))
 
             epsilon = 1e-12  # 一个非常小的数值，用于近似严格的不等式
 
@@ -984,7 +1158,7 @@ class Building(object):
 
         elif (hasattr(self, 'fixed_price_different_by_power')
             and self.fixed_price_different_by_power):
-            max_heat_power = model.find_component('max_heat_power')
+            max_heat_power = registry.get(model, None, 'max_heat_power')
 
             if model.find_component('price_power_threshold'):
                 if len(model.price_power_threshold.index_set()) == 1:
@@ -1015,11 +1189,12 @@ class Building(object):
         pyo.TransformationFactory('gdp.bigm').apply_to(model, bigM={None: 1e12})
 
     def _constraint_bc_cbp_cpp_product(self, model):
-        consider_basic_price = model.find_component('consider_basic_price')
-        consider_power_price = model.find_component('consider_power_price')
-        building_connection = model.find_component('building_connection')
-        bc_cbp_product = model.find_component('bc_cbp_product')
-        bc_cpp_product = model.find_component('bc_cpp_product')
+        registry = get_registry(model)
+        consider_basic_price = registry.get(model, None, 'consider_basic_price')
+        consider_power_price = registry.get(model, None, 'consider_power_price')
+        building_connection = registry.get(model, None, 'building_connection')
+        bc_cbp_product = registry.get(model, None, 'bc_cbp_product')
+        bc_cpp_product = registry.get(model, None, 'bc_cpp_product')
 
         model.cons.add(bc_cpp_product <= building_connection)
         model.cons.add(bc_cpp_product <= consider_power_price)
@@ -1027,3 +1202,141 @@ class Building(object):
         model.cons.add(bc_cbp_product <= building_connection)
         model.cons.add(bc_cbp_product <= consider_basic_price)
         model.cons.add(bc_cbp_product >= building_connection + consider_basic_price - 1)
+
+    # The following methods build the building model for the matrix backend
+    # (scripts/MatrixModel.py), which has the same variables and constraints
+    # as the pyomo model without bilevel and subsidies.
+    def add_matrix_vars(self, model):
+        """Same as add_vars for matrix model."""
+        if self.bilevel:
+            raise NotImplementedError('The bilevel model is not developed for '
+                                      'matrix model.')
+        if len(self.subsidy_list) > 0:
+            raise NotImplementedError('The subsidies are not developed for '
+                                      'matrix model.')
+
+        registry = get_registry(model)
+        for energy in self.energy_flows.keys():
+            for flow in self.energy_flows[energy]:
+                self.energy_flows[energy][flow] = MatrixVar(
+                    model.time_step, bounds=(0, 10 ** 8))
+                registry.add_flow(model, energy, flow[0], flow[1],
+                                  self.energy_flows[energy][flow])
+
+        self._add_var(model, 'annual_cost', MatrixVar())
+        self._add_var(model, 'operation_cost', MatrixVar(bounds=(0, None)))
+        self._add_var(model, 'total_revenue', MatrixVar(bounds=(0, None)))
+        self._add_var(model, 'other_op_cost', MatrixVar(bounds=(0, None)))
+        self._add_var(model, 'total_elec_pur', MatrixVar(bounds=(0, None)))
+
+        for comp in self.components:
+            self.components[comp].add_matrix_vars(model)
+
+    def add_matrix_cons(self, model, env, cluster=None):
+        """Same as add_cons for matrix model."""
+        self._matrix_energy_balance(model)
+        self._matrix_total_cost(model)
+        self._matrix_operation_cost(model, env, cluster)
+        self._matrix_total_revenue(model, env, cluster)
+        self._matrix_other_op_cost(model)
+
+        for comp in self.components:
+            self.components[comp].add_matrix_cons(model)
+
+        solar_area_list = []
+        for comp in self.components:
+            if isinstance(self.components[comp],
+                          (module_dict['PV'],
+                           module_dict['SolarThermalCollector'])):
+                solar_area_list.append(
+                    (self.components[comp]._get_var(model, 'solar_area').col,
+                     1))
+        if len(solar_area_list) > 0:
+            model.add_row('solar_area_' + self.name, solar_area_list,
+                          ub=self.solar_area)
+
+    def _matrix_energy_balance(self, model):
+        for index, row in self.simp_matrix.items():
+            if self.components[index].inputs is not None:
+                for energy_type in self.components[index].inputs:
+                    if len(row[row > 0].index.tolist() +
+                           row[row.isnull()].index.tolist()) > 0:
+                        self.components[index].matrix_sum_inputs(
+                            model=model, energy_type=energy_type)
+
+        for index, row in self.simp_matrix.iterrows():
+            if self.components[index].outputs is not None:
+                for energy_type in self.components[index].outputs:
+                    if len(row[row > 0].index.tolist() +
+                           row[row.isnull()].index.tolist()) > 0:
+                        self.components[index].matrix_sum_outputs(
+                            model=model, energy_type=energy_type)
+
+    def _matrix_total_cost(self, model):
+        registry = get_registry(model)
+        terms = [(self._get_var(model, 'annual_cost').col, 1),
+                 (self._get_var(model, 'operation_cost').col, -1),
+                 (self._get_var(model, 'total_revenue').col, 1)]
+        for comp in self.components:
+            terms.append((registry.get(model, comp, 'annual_cost').col, -1))
+        model.add_row('total_cost_' + self.name, terms, lb=0, ub=0)
+
+    def _matrix_operation_cost(self, model, env, cluster=None):
+        """The energy purchase in each time step is weighted with the
+        occurrence of typical periods, if cluster is used."""
+        registry = get_registry(model)
+        nr_hour_occur = self._matrix_weight(model, cluster)
+
+        if self.type == 'EnergyHub':
+            prices = {'elec': env.elec_price_hub, 'gas': env.gas_price_hub,
+                      'heat': env.heat_price_hub}
+        else:
+            prices = {'elec': env.elec_price, 'gas': env.gas_price,
+                      'heat': env.heat_price}
+
+        terms = [(self._get_var(model, 'operation_cost').col, 1),
+                 (self._get_var(model, 'other_op_cost').col, -1)]
+        for comp in self.components:
+            if isinstance(self.components[comp],
+                          module_dict['ElectricityGrid']):
+                if 'elec' in self.components[comp].energy_flows[
+                        'output'].keys():
+                    buy_elec = registry.get(model, comp, 'output_elec')
+                    terms.append((buy_elec.cols,
+                                  -prices['elec'] * nr_hour_occur))
+            elif isinstance(self.components[comp], module_dict['GasGrid']):
+                buy_gas = registry.get(model, comp, 'output_gas')
+                terms.append((buy_gas.cols, -prices['gas'] * nr_hour_occur))
+            elif isinstance(self.components[comp], module_dict['HeatGrid']):
+                buy_heat = registry.get(model, comp, 'output_heat')
+                terms.append((buy_heat.cols,
+                              -prices['heat'] * nr_hour_occur))
+        model.add_row('operation_cost_' + self.name, terms, lb=0, ub=0)
+
+    def _matrix_total_revenue(self, model, env, cluster=None):
+        registry = get_registry(model)
+        nr_hour_occur = self._matrix_weight(model, cluster)
+
+        terms = [(self._get_var(model, 'total_revenue').col, 1)]
+        for comp in self.components:
+            if isinstance(self.components[comp],
+                          module_dict['ElectricityGrid']):
+                if 'elec' in self.components[comp].energy_flows['input'].keys():
+                    sell_elec = registry.get(model, comp, 'input_elec')
+                    terms.append((sell_elec.cols,
+                                  -env.elec_feed_price * nr_hour_occur))
+        model.add_row('total_revenue_' + self.name, terms, lb=0, ub=0)
+
+    def _matrix_other_op_cost(self, model):
+        registry = get_registry(model)
+        terms = [(self._get_var(model, 'other_op_cost').col, 1)]
+        for comp in self.components:
+            if self.components[comp].other_op_cost:
+                terms.append((registry.get(model, comp, 'other_op_cost').col,
+                              -1))
+        model.add_row('other_op_cost_' + self.name, terms, lb=0, ub=0)
+
+    @staticmethod
+    def _matrix_weight(model, cluster=None):
+        """The weight of each time step in the annual sum."""
+        return time_weights(model.time_step, cluster)
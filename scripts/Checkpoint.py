@@ -0,0 +1,64 @@
+"""
+The checkpoint writes each improved incumbent of a running solve to disk, so
+that a long design run, which is interrupted by a crash or a preemption on a
+shared node, could be resumed from the last incumbent as MIP start. The
+incumbents are received with the callbacks of the persistent solver, see
+PersistentSolver.set_checkpoint.
+"""
+
+import os
+import json
+import time
+from scripts.SolutionCache import save_values, load_values
+
+
+class Checkpoint(object):
+    """
+    The folder contains checkpoint.csv with the values of all variables in
+    the format of result.csv and checkpoint.json with the objective, bound,
+    relative gap and time of the incumbent. Both files are replaced atomically, so a
+    crash during writing keeps the previous checkpoint.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.values_path = os.path.join(path, 'checkpoint.csv')
+        self.info_path = os.path.join(path, 'checkpoint.json')
+        self.count = 0
+
+    def exists(self):
+        return os.path.exists(self.values_path) and \
+            os.path.exists(self.info_path)
+
+    def info(self):
+        """Return the information of the last incumbent."""
+        with open(self.info_path) as f:
+            return json.load(f)
+
+    def save(self, model, values=None, objective=None, bound=None, gap=None,
+             solve_time=None, finished=False):
+        """
+        Save the incumbent.
+        values: dict with the labels of variables and the values of the
+            incumbent, see SolutionCache.save_values. If None, the current
+            values in the model are saved.
+        finished: True, if the solve is finished and the incumbent is the
+            final solution.
+        """
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        self.count += 1
+        save_values(model, self.values_path + '.tmp', values)
+        with open(self.info_path + '.tmp', 'w') as f:
+            json.dump({'objective': objective, 'bound': bound, 'gap': gap,
+                       'solve_time': solve_time, 'incumbent': self.count,
+                       'finished': finished,
+                       'saved': time.strftime('%Y-%m-%d %H:%M:%S')}, f,
+                      indent=2)
+        os.replace(self.values_path + '.tmp', self.values_path)
+        os.replace(self.info_path + '.tmp', self.info_path)
+
+    def load(self, model):
+        """Set the values of the last incumbent as start values of the
+        model. Returns the number of set values."""
+        return load_values(model, self.values_path)
@@ -0,0 +1,165 @@
+"""
+The cluster cache stores the typical periods of Project.time_cluster, so that
+repeated runs on the same building do not run tsam again. The results are
+addressed by the hash of the clustered profiles (demand, weather and price
+series) and the settings of the clustering (number of periods, hours per
+period, tsam settings and version), so a result is never applied to another
+building or to changed profiles. The least recently used results are removed,
+if the size of the cache exceeds the limit.
+"""
+
+import os
+import json
+import time
+import hashlib
+from importlib.metadata import version, PackageNotFoundError
+import numpy as np
+import pandas as pd
+
+# The maximal size of all cached files in byte. The result for 15 typical days
+# of a building with six profiles needs about 10 kB.
+default_max_size = 50 * 1024 ** 2
+
+
+class ClusterCache(object):
+    """
+    The cache folder contains index.json and one compressed npz file for
+    each result, which is named by the key. The index records the size, the
+    settings, the time of the last use, the number of hits and the errors of
+    the reconstructed profiles (if evaluated) of each result. The hits and
+    misses of the session are counted in self.hits and self.misses.
+    """
+
+    def __init__(self, path, max_size=default_max_size):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, profiles, settings):
+        """
+        Return the hash of the profiles and the settings.
+        profiles: DataFrame with one column for each clustered profile.
+        settings: dict of the settings of the clustering, which is
+            serializable with json.
+        """
+        digest = hashlib.sha1()
+        for name in sorted(profiles.columns):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(
+                profiles[name].to_numpy(dtype=np.float64)).tobytes())
+        digest.update(json.dumps({**settings, 'tsam': _tsam_version()},
+                                 sort_keys=True).encode())
+        return digest.hexdigest()[:20]
+
+    def _load_index(self):
+        index_path = os.path.join(self.path, 'index.json')
+        if not os.path.exists(index_path):
+            return {}
+        with open(index_path) as f:
+            return json.load(f)
+
+    def _save_index(self, index):
+        index_path = os.path.join(self.path, 'index.json')
+        with open(index_path + '.tmp', 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(index_path + '.tmp', index_path)
+
+    def load(self, key):
+        """Return the cached typical periods for the key or None, if the
+        key is not in the cache."""
+        index = self._load_index()
+        file_path = os.path.join(self.path, key + '.npz')
+        if key not in index or not os.path.exists(file_path):
+            self.misses += 1
+            return None
+        with np.load(file_path, allow_pickle=False) as data:
+            typ_periods = pd.DataFrame(
+                {column: data['c' + str(nr)] for nr, column in
+                 enumerate(data['columns'].tolist())})
+            if 'cluster_order' in data:
+                typ_periods.attrs['cluster_order'] = \
+                    data['cluster_order'].tolist()
+        self.hits += 1
+        index[key]['last_used'] = time.time()
+        index[key]['hits'] += 1
+        self._save_index(index)
+        return typ_periods
+
+    def errors(self, key):
+        """Return the errors of the reconstructed profiles for the key, see
+        utils/time_series_cluster.py, or None, if the errors are not
+        cached."""
+        entry = self._load_index().get(key)
+        if entry is None or entry.get('errors') is None or \
+                not os.path.exists(os.path.join(self.path, key + '.npz')):
+            return None
+        return pd.DataFrame.from_dict(entry['errors'], orient='index')
+
+    def store(self, key, typ_periods, settings, errors=None):
+        """Store the typical periods and remove the least recently used
+        results, if the cache is larger than max_size. errors: DataFrame of
+        the errors of the reconstructed profiles, which is stored in the
+        index."""
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        file_path = os.path.join(self.path, key + '.npz')
+        # The columns are saved as separate arrays, so that the integer
+        # columns of the periods and time steps keep their type. The order
+        # of the typical periods is saved as extra array.
+        arrays = {'c' + str(nr): typ_periods[column].to_numpy() for
+                  nr, column in enumerate(typ_periods.columns)}
+        if 'cluster_order' in typ_periods.attrs:
+            arrays['cluster_order'] = np.asarray(
+                typ_periods.attrs['cluster_order'], dtype=int)
+        with open(file_path + '.tmp', 'wb') as f:
+            np.savez_compressed(
+                f, columns=np.array(typ_periods.columns, dtype=str), **arrays)
+        os.replace(file_path + '.tmp', file_path)
+
+        index = self._load_index()
+        index[key] = {'size': os.path.getsize(file_path),
+                      'settings': settings, 'created': time.time(),
+                      'last_used': time.time(), 'hits': 0,
+                      'errors': None if errors is None else
+                      errors.to_dict(orient='index')}
+        self._evict(index, keep=key)
+        self._save_index(index)
+
+    def _evict(self, index, keep=None):
+        total = sum(entry['size'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_used']):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            total -= index[key]['size']
+            del index[key]
+            file_path = os.path.join(self.path, key + '.npz')
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def report(self):
+        """Return the hits and misses of the session and the number and
+        size of the cached results."""
+        index = self._load_index()
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(index),
+                'size': sum(entry['size'] for entry in index.values())}
+
+    def clear(self):
+        """Remove all cached results."""
+        if not os.path.exists(self.path):
+            return
+        for key in self._load_index():
+            file_path = os.path.join(self.path, key + '.npz')
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        self._save_index({})
+
+
+def _tsam_version():
+    try:
+        return version('tsam')
+    except PackageNotFoundError:
+        return None
@@ -13,6 +13,9 @@ from pyomo.gdp import Disjunct, Disjunction
 from scripts.subsidies.PurchaseSubsidy import PurchaseSubsidy
 from scripts.subsidies.OperateSubsidy import OperateSubsidy
 from scripts.subsidies.EEG import EEG
+from scripts.VarRegistry import get_registry
+from scripts.BuildProfiler import profile
+from scripts.MatrixModel import MatrixVar, big_m
 from utils.calc_annuity_vdi2067 import calc_annuity
 from utils.get_subsidy import find_dependent_vars
 from utils.get_subsidy import find_sub_modes
@@ -109,6 +112,13 @@ class Component(object):
 
         self.min_part_load = None
 
+        # The number of time steps in a typical period and the duration of
+        # each time step in hours (None for hourly time steps), which are set
+        # by Building.update_components after the clustering. Without
+        # clustering the period is one day.
+        self.period_length = 24
+        self.durations = None
+
     def get_properties(self, model):
         model_property_file = os.path.join(base_path, 'data',
                                            'component_database',
@@ -297,6 +307,75 @@ class Component(object):
         subsidy.add_rules(user=user, building=building)
         self.subsidy_list.append(subsidy)
 
+    def _add_var(self, model, key, var):
+        """Add the variable into the model and register it with the component
+        name as owner."""
+        return get_registry(model).add(model, self.name, key, var)
+
+    def _get_var(self, model, key):
+        """Return the variable of the component from the registry."""
+        return get_registry(model).get(model, self.name, key)
+
+    @staticmethod
+    def _fix_profile(model):
+        """Return True, if the variables determined by a profile should be
+        fixed or substituted instead of adding an equality constraint for
+        each time step. The option is set in Project.build_model."""
+        return getattr(model, 'fix_profile', False)
+
+    def _add_profile_param(self, model, key, profile):
+        """Add the profile as mutable parameter for all time steps, so that it
+        could be updated with update_parameters without rebuilding the
+        model."""
+        ########################################################################
+        # ATTENTION!!! The time_step in pyomo is from 1 to 8760 and python list
+        # is from 0 to 8759, so the index should be modified.
+        ########################################################################
+        param = pyo.Param(model.time_step, mutable=True,
+                          initialize={t: profile[t - 1] for t in
+                                      model.time_step})
+        return self._add_var(model, key, param)
+
+    def _set_profile_param(self, model, key, profile):
+        """Set the new values of the profile into the mutable parameter."""
+        param = self._get_var(model, key)
+        param.store_values({t: profile[t - 1] for t in model.time_step})
+        return param
+
+    def update_parameters(self, model):
+        """
+        Update the mutable parameters in the built model with the current
+        attributes of the component, for example the profiles after
+        update_profile. The method is called by Project.update_parameters and
+        should be rewritten by the components with parameters.
+        """
+        pass
+
+    @staticmethod
+    def _flow_expression(model):
+        """Return True, if the inputs and outputs of components should be
+        expressions over the energy flows instead of variables with the
+        constraints sum_input and sum_output. The option is set in
+        Project.build_model."""
+        return getattr(model, 'flow_expression', False)
+
+    def _add_flow_expression(self, model, io, energy_type):
+        """Add the input or output of the component as the sum of the energy
+        flows from or to the other components. The expression is registered
+        with the same key as the variable, so the constraints could use it in
+        the same way.
+        io: 'input' or 'output'
+        """
+        registry = get_registry(model)
+        flows = [registry.flow(model, energy_type, item[0], item[1]) for item
+                 in self.energy_flows[io][energy_type]]
+
+        def sum_flows_rule(m, t):
+            return sum(flow[t] for flow in flows)
+
+        self._add_var(model, io + '_' + energy_type,
+                      pyo.Expression(model.time_step, rule=sum_flows_rule))
+
     def _constraint_conver(self, model):
         """
         This constraint shows the energy conversion of the component.
@@ -307,21 +386,25 @@ class Component(object):
         #  and hydrogen, or special electrolyzer, which need heat and
         #  electricity at the same time)
 
+        if self.inputs is None:
+            return
+        elif len(self.inputs) == 1:
+            input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        else:
+            input_energy = None  # for more than 1 input, should be
+            # developed
+
+        output_energy = {}
         for output in self.outputs:
-            output_energy = model.find_component('output_' + output + '_' +
-                                                 self.name)
-            if self.inputs is None:
-                break
-            elif len(self.inputs) == 1:
-                input_energy = model.find_component('input_' + self.inputs[0] +
-                                                    '_' + self.name)
-            else:
-                input_energy = None  # for more than 1 input, should be
-                # developed
+            output_energy[output] = self._get_var(model, 'output_' + output)
 
-            for t in model.time_step:
-                model.cons.add(output_energy[t] == input_energy[t] *
-                               self.efficiency[output])
+        def conver_rule(m, output, t):
+            return output_energy[output][t] == input_energy[t] * \
+                self.efficiency[output]
+
+        conver = pyo.Constraint(self.outputs, model.time_step,
+                                rule=conver_rule)
+        model.add_component('conver_' + self.name, conver)
 
     def _constraint_maxpower(self, model):
         """
@@ -332,24 +415,24 @@ class Component(object):
          version is only input power considered. Check it for heat pump and CHP!
         """
         if self.outputs is not None:
-            size = model.find_component('size_' + self.name)
+            size = self._get_var(model, 'size')
             if len(self.outputs) == 1:
-                output_powers = model.find_component('output_' +
-                                                     self.outputs[0] + '_' +
-                                                     self.name)
+                output_powers = self._get_var(model,
+                                              'output_' + self.outputs[0])
             else:
                 if 'elec' in self.outputs:
                     # The size of CHP and fuel cell are define with electric
                     # capacity
-                    output_powers = model.find_component('output_elec_' +
-                                                         self.name)
+                    output_powers = self._get_var(model, 'output_elec')
                 else:
-                    output_powers = model.find_component('output_' +
-                                                         self.outputs[0] + '_' +
-                                                         self.name)
+                    output_powers = self._get_var(model,
+                                                  'output_' + self.outputs[0])
+
+            def max_power_rule(m, t):
+                return output_powers[t] <= size
 
-            for t in model.time_step:
-                model.cons.add(output_powers[t] <= size)
+            max_power = pyo.Constraint(model.time_step, rule=max_power_rule)
+            model.add_component('max_power_' + self.name, max_power)
 
     def _constraint_vdi2067(self, model):
         """
@@ -358,9 +441,9 @@ class Component(object):
         q: interest factor
         n: number of replacements
         """
-        size = model.find_component('size_' + self.name)
-        invest = model.find_component('invest_' + self.name)
-        annual_cost = model.find_component('annual_cost_' + self.name)
+        size = self._get_var(model, 'size')
+        invest = self._get_var(model, 'invest')
+        annual_cost = self._get_var(model, 'annual_cost')
 
         # Take the fixed cost for investment into account and use dgp model to
         # indicate that, if component size is equal to zero, the investment
@@ -436,9 +519,8 @@ class Component(object):
     def _constraint_sub_annuity(self, model, sub_name):
         """add the constraints of the subsidy. sub_name is the name of the
         subject to which the subsidy is applied."""
-        sub_annuity = model.find_component('sub_annuity_' + sub_name + '_' +
-                                           self.name)
-        subsidy = model.find_component('subsidy_' + sub_name + '_' + self.name)
+        sub_annuity = self._get_var(model, 'sub_annuity_' + sub_name)
+        subsidy = self._get_var(model, 'subsidy_' + sub_name)
 
         model.cons.add(sub_annuity == calc_annuity(self.life, subsidy,
                                                    self.f_inst, self.f_w,
@@ -458,20 +540,28 @@ class Component(object):
                 spacial components, dict
         Returns: None
         """
+        if not isinstance(self._get_var(model, 'input_' + energy_type),
+                          pyo.Var):
+            # The input is already the expression over the energy flows.
+            return
+
+        registry = get_registry(model)
         input_flows = []
         for energy, flow in self.energy_flows['input'].items():
             if energy == energy_type:
                 for item in flow:
-                    input_flows.append(model.find_component(energy + '_' +
-                                                            item[0] + '_' +
-                                                            item[1]))
-        input_energy = model.find_component('input_' + energy_type + '_' +
-                                            self.name)
+                    input_flows.append(registry.flow(model, energy, item[0],
+                                                     item[1]))
+        input_energy = self._get_var(model, 'input_' + energy_type)
 
         # Sum up all the inputs
-        for t in model.time_step:
-            model.cons.add(input_energy[t] == sum(input_flow[t] for
-                                                  input_flow in input_flows))
+        def sum_inputs_rule(m, t):
+            return input_energy[t] == sum(input_flow[t] for input_flow in
+                                          input_flows)
+
+        sum_inputs = pyo.Constraint(model.time_step, rule=sum_inputs_rule)
+        model.add_component('sum_input_' + energy_type + '_' + self.name,
+                            sum_inputs)
 
     def constraint_sum_outputs(self, model, energy_type):
         """
@@ -483,33 +573,40 @@ class Component(object):
             energy_flows: the energy flows from building object, dict
         Returns: None
         """
+        if not isinstance(self._get_var(model, 'output_' + energy_type),
+                          pyo.Var):
+            # The output is already the expression over the energy flows.
+            return
+
+        registry = get_registry(model)
         output_flows = []
         for energy, flow in self.energy_flows['output'].items():
             if energy == energy_type:
                 for item in flow:
-                    output_flows.append(model.find_component(energy + '_' +
-                                                             item[0] + '_' +
-                                                             item[1]))
-        output_energy = model.find_component('output_' + energy_type + '_' +
-                                             self.name)
+                    output_flows.append(registry.flow(model, energy, item[0],
+                                                      item[1]))
+        output_energy = self._get_var(model, 'output_' + energy_type)
 
-        # Sum up all the inputs
-        for t in model.time_step:
-            model.cons.add(output_energy[t] == sum(output_flow[t] for
-                                                   output_flow in output_flows))
+        # Sum up all the outputs
+        def sum_outputs_rule(m, t):
+            return output_energy[t] == sum(output_flow[t] for output_flow in
+                                           output_flows)
+
+        sum_outputs = pyo.Constraint(model.time_step, rule=sum_outputs_rule)
+        model.add_component('sum_output_' + energy_type + '_' + self.name,
+                            sum_outputs)
 
     def _constraint_part_load(self, model):
         """The part-load constraint of the boiler."""
         # model.not_work_state = Disjunct(model.time_step)
         # model.work_state = Disjunct(model.time_step)
         # model.work_or_not = Disjunction(model.time_step)
-        not_work_state = model.find_component('not_work_state_' + self.name)
-        work_state = model.find_component('work_state_' + self.name)
-        work_or_not = model.find_component('work_or_not_' + self.name)
+        not_work_state = self._get_var(model, 'not_work_state')
+        work_state = self._get_var(model, 'work_state')
+        work_or_not = self._get_var(model, 'work_or_not')
 
-        output_heat = model.find_component('output_'+self.outputs[0] + '_' +
-                                           self.name)
-        size = model.find_component('size_' + self.name)
+        output_heat = self._get_var(model, 'output_' + self.outputs[0])
+        size = self._get_var(model, 'size')
 
         for t in model.time_step:
             @not_work_state[t].Constraint()
@@ -531,7 +628,9 @@ class Component(object):
             self._constraint_part_load(model)
 
         for subsidy in self.subsidy_list:
-            subsidy.add_cons(model)
+            with profile(model, subsidy.name + '_' + self.name, 'add_cons',
+                         level='subsidy'):
+                subsidy.add_cons(model)
             if isinstance(subsidy, PurchaseSubsidy):
                 self._constraint_sub_annuity(model, subsidy.name)
 
@@ -547,39 +646,241 @@ class Component(object):
         """
 
         comp_size = pyo.Var(bounds=(self.min_size, self.max_size))
-        model.add_component('size_' + self.name, comp_size)
+        self._add_var(model, 'size', comp_size)
 
         annual_cost = pyo.Var(bounds=(0, 10 ** 10))
-        model.add_component('annual_cost_' + self.name, annual_cost)
+        self._add_var(model, 'annual_cost', annual_cost)
 
         invest = pyo.Var(bounds=(0, 10 ** 10))
-        model.add_component('invest_' + self.name, invest)
+        self._add_var(model, 'invest', invest)
+
+        self._add_part_load_vars(model)
+
+        if self.inputs is not None:
+            for energy_type in self.inputs:
+                if self._flow_expression(model) and \
+                        energy_type in self.energy_flows['input']:
+                    self._add_flow_expression(model, 'input', energy_type)
+                    continue
+                input_energy = pyo.Var(model.time_step, bounds=(0, 10 ** 10))
+                self._add_var(model, 'input_' + energy_type, input_energy)
+
+        if self.outputs is not None:
+            for energy_type in self.outputs:
+                if self._flow_expression(model) and \
+                        energy_type in self.energy_flows['output']:
+                    self._add_flow_expression(model, 'output', energy_type)
+                    continue
+                output_energy = pyo.Var(model.time_step, bounds=(0, 10 ** 10))
+                self._add_var(model, 'output_' + energy_type, output_energy)
+
+        if self.other_op_cost:
+            other_op_cost = pyo.Var(bounds=(0, 10 ** 10))
+            self._add_var(model, 'other_op_cost', other_op_cost)
 
+        for subsidy in self.subsidy_list:
+            subsidy.add_vars(model)
+
+    def _add_part_load_vars(self, model):
         if self.min_part_load is not None:
             # The part-load variables in GDP model.
             not_work_state = Disjunct(model.time_step)
             work_state = Disjunct(model.time_step)
             work_or_not = Disjunction(model.time_step)
 
-            model.add_component('not_work_state_' + self.name, not_work_state)
-            model.add_component('work_state_' + self.name, work_state)
-            model.add_component('work_or_not_' + self.name, work_or_not)
+            self._add_var(model, 'not_work_state', not_work_state)
+            self._add_var(model, 'work_state', work_state)
+            self._add_var(model, 'work_or_not', work_or_not)
+
+    def _update_size_bounds(self, model):
+        """Set the bounds of the size variable with the current minimal and
+        maximal size. Should be rewritten in the components, whose size
+        variable is defined in other unit."""
+        self._get_var(model, 'size').setlb(self.min_size)
+        self._get_var(model, 'size').setub(self.max_size)
+
+    def rebuild(self, model):
+        """
+        Rebuild the component in the built model after the change of size
+        range, cost model or part load. The constraints, disjunctions and
+        parameters, which are added in add_cons of the component and its
+        subsidies, are deleted and added again. The variables used by the
+        building (size, cost, inputs and outputs) are kept, only their bounds
+        are updated, so the constraints of the building are still valid.
+        If the model is already transformed with gdp.bigm, the new
+        disjunctions are transformed in the next run_optimization.
+        """
+        registry = get_registry(model)
+        registry.remove_created(model, self.name)
+        for key in ['work_or_not', 'work_state', 'not_work_state']:
+            if registry.has(self.name, key):
+                registry.delete(model, self.name, key)
+        self._add_part_load_vars(model)
+        self._update_size_bounds(model)
+
+        with registry.track(model, self.name):
+            self.add_cons(model)
+
+    # The following methods build the same model as add_vars and add_cons for
+    # the matrix backend (scripts/MatrixModel.py). The variables and
+    # constraints are added for all time steps at once with numpy arrays.
+    def check_matrix_support(self):
+        """The matrix model is only developed for the linear components with
+        cost model 0 and 1. If a component class rewrites a method for the
+        pyomo model without rewriting the method for matrix model, the matrix
+        model would be wrong, so an error is raised."""
+        if self.cost_model == 2:
+            raise NotImplementedError('The cost model 2 of ' + self.name +
+                                      ' is not developed for matrix model.')
+        if self.min_part_load is not None:
+            raise NotImplementedError('The part load of ' + self.name +
+                                      ' is not developed for matrix model.')
+        if len(self.subsidy_list) > 0:
+            raise NotImplementedError('The subsidies of ' + self.name +
+                                      ' are not developed for matrix model.')
+        for pyomo_method, matrix_method in matrix_methods:
+            pyomo_cls = _defined_in(type(self), pyomo_method)
+            matrix_cls = _defined_in(type(self), matrix_method)
+            if pyomo_cls is not matrix_cls and issubclass(pyomo_cls,
+                                                          matrix_cls):
+                raise NotImplementedError(
+                    self.component_type + ' rewrites the method ' +
+                    pyomo_method + ', which is not developed for matrix model.')
+
+    def _matrix_conver(self, model):
+        if self.inputs is None:
+            return
+        elif len(self.inputs) != 1:
+            raise NotImplementedError('The component with more than 1 input '
+                                      'is not developed.')
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+
+        for output in self.outputs:
+            output_energy = self._get_var(model, 'output_' + output)
+            model.add_eq('conver_' + output + '_' + self.name,
+                         [(output_energy.cols, 1),
+                          (input_energy.cols, -self.efficiency[output])])
+
+    def _matrix_maxpower(self, model):
+        if self.outputs is not None:
+            size = self._get_var(model, 'size')
+            if len(self.outputs) == 1 or 'elec' not in self.outputs:
+                output_powers = self._get_var(model,
+                                              'output_' + self.outputs[0])
+            else:
+                output_powers = self._get_var(model, 'output_elec')
+            model.add_rows('max_power_' + self.name,
+                           [(output_powers.cols, 1), (size.col, -1)], ub=0)
+
+    def _matrix_vdi2067(self, model, size_key='size', size_factor=1):
+        """
+        The cost model 1 is formulated with a binary variable select, which
+        has the same meaning as the disjunct dis_select in pyomo model:
+            min_size * select <= size <= max_size * select
+            invest == size * unit_cost + (fixed_cost + install_cost) * select
+        size_key: the variable, which determines the investment, for example
+            'volume' for hot water storage.
+        size_factor: the factor from min_size to the variable size_key.
+        """
+        size = self._get_var(model, size_key)
+        invest = self._get_var(model, 'invest')
+        annual_cost = self._get_var(model, 'annual_cost')
+
+        if self.min_size == 0:
+            min_size = small_num * size_factor
+        else:
+            min_size = self.min_size * size_factor
+
+        if self.cost_model == 0:
+            model.add_eq('invest_' + self.name,
+                         [(invest.col, 1), (size.col, -self.unit_cost)])
+        elif self.cost_model == 1:
+            not_select = model.add_component(
+                'dis_not_select_' + self.name + '.binary_indicator_var',
+                MatrixVar(bounds=(0, 1), binary=True))
+            select = model.add_component(
+                'dis_select_' + self.name + '.binary_indicator_var',
+                MatrixVar(bounds=(0, 1), binary=True))
+            max_size = size.bounds[1] if size.bounds[1] is not None else big_m
+
+            model.add_eq('disjunction_size' + self.name,
+                         [(not_select.col, 1), (select.col, 1)], rhs=1)
+            model.add_rows('select_size_' + self.name,
+                           [(size.col, 1), (select.col, -min_size)], lb=0)
+            model.add_rows('max_size_' + self.name,
+                           [(size.col, 1), (select.col, -max_size)], ub=0)
+            model.add_eq('select_inv_' + self.name,
+                         [(invest.col, 1), (size.col, -self.unit_cost),
+                          (select.col, -(self.fixed_cost +
+                                         self.install_cost))])
+
+        # The annuity is linear to the investment.
+        annuity_factor = calc_annuity(self.life, 1, self.f_inst, self.f_w,
+                                      self.f_op)
+        model.add_eq('annuity_' + self.name,
+                     [(annual_cost.col, 1), (invest.col, -annuity_factor)])
+
+    def matrix_sum_inputs(self, model, energy_type):
+        """Same as constraint_sum_inputs for matrix model."""
+        registry = get_registry(model)
+        terms = [(self._get_var(model, 'input_' + energy_type).cols, 1)]
+        for item in self.energy_flows['input'].get(energy_type, []):
+            terms.append((registry.flow(model, energy_type, item[0],
+                                        item[1]).cols, -1))
+        model.add_eq('sum_input_' + energy_type + '_' + self.name, terms)
+
+    def matrix_sum_outputs(self, model, energy_type):
+        """Same as constraint_sum_outputs for matrix model."""
+        registry = get_registry(model)
+        terms = [(self._get_var(model, 'output_' + energy_type).cols, 1)]
+        for item in self.energy_flows['output'].get(energy_type, []):
+            terms.append((registry.flow(model, energy_type, item[0],
+                                        item[1]).cols, -1))
+        model.add_eq('sum_output_' + energy_type + '_' + self.name, terms)
+
+    def add_matrix_cons(self, model):
+        self._matrix_conver(model)
+        self._matrix_maxpower(model)
+        self._matrix_vdi2067(model)
+
+    def add_matrix_vars(self, model):
+        """Same variables as in add_vars for matrix model."""
+        self.check_matrix_support()
+
+        self._add_var(model, 'size',
+                      MatrixVar(bounds=(self.min_size, self.max_size)))
+        self._add_var(model, 'annual_cost', MatrixVar(bounds=(0, 10 ** 10)))
+        self._add_var(model, 'invest', MatrixVar(bounds=(0, 10 ** 10)))
 
         if self.inputs is not None:
             for energy_type in self.inputs:
-                input_energy = pyo.Var(model.time_step, bounds=(0, 10 ** 10))
-                model.add_component('input_' + energy_type + '_' + self.name,
-                                    input_energy)
+                self._add_var(model, 'input_' + energy_type,
+                              MatrixVar(model.time_step,
+                                        bounds=(0, 10 ** 10)))
 
         if self.outputs is not None:
             for energy_type in self.outputs:
-                output_energy = pyo.Var(model.time_step, bounds=(0, 10 ** 10))
-                model.add_component('output_' + energy_type + '_' + self.name,
-                                    output_energy)
+                self._add_var(model, 'output_' + energy_type,
+                              MatrixVar(model.time_step,
+                                        bounds=(0, 10 ** 10)))
 
         if self.other_op_cost:
-            other_op_cost = pyo.Var(bounds=(0, 10 ** 10))
-            model.add_component('other_op_cost_' + self.name, other_op_cost)
+            self._add_var(model, 'other_op_cost',
+                          MatrixVar(bounds=(0, 10 ** 10)))
 
-        for subsidy in self.subsidy_list:
-            subsidy.add_vars(model)
+
+# The pairs of methods for pyomo model and matrix model, which should be
+# rewritten together in the component classes.
+matrix_methods = [('add_vars', 'add_matrix_vars'),
+                  ('add_cons', 'add_matrix_cons'),
+                  ('_constraint_conver', '_matrix_conver'),
+                  ('_constraint_maxpower', '_matrix_maxpower'),
+                  ('_constraint_vdi2067', '_matrix_vdi2067')]
+
+
+def _defined_in(cls, method):
+    """Return the class in the method resolution order, which defines the
+    method."""
+    for item in cls.__mro__:
+        if method in item.__dict__:
+            return item
@@ -0,0 +1,208 @@
+"""
+The initial dispatch is a fast rule based operation of the heat generators
+in a building, which is used to seed the MILP with a first solution. The
+heat demand of the consumptions is served by the generators in merit order,
+each generator is sized for the peak of the remaining demand, which it could
+reach directly or over storages. The electrical demand of the consumptions
+and of the dispatched heat generators is imported from the electricity grids,
+which reach it directly or over storages. The sizes, the selection of the
+cost model and the states of the part load are fixed from the dispatch, the
+remaining variables (storages, PV, grids, energy flows) are completed by
+solving the model with these fixed decisions within completion_time_limit,
+see Project.run_optimization.
+"""
+
+from warnings import warn
+import numpy as np
+from scripts.components.Storage import Storage
+from scripts.VarRegistry import get_registry
+
+# The heat generators in the order of dispatch. The heat pumps are used first
+# for the base load and the grids last. The solar thermal collectors are
+# limited by irradiation and the CHP is sized with electric power, so they
+# are left to the completion like PV and the storages.
+merit_order = ['HeatPumpAirWater', 'HeatPumpBrineWater', 'HeatPump',
+               'GasHeatPump', 'BiomassBoiler', 'GasBoiler', 'HybridBoiler',
+               'ElectricBoiler', 'ElectricRadiator', 'HeatExchanger',
+               'HeatGrid']
+heat_consumptions = ['HeatConsumption', 'HotWaterConsumption']
+elec_consumptions = ['ElectricalConsumption']
+elec_sources = ['ElectricityGrid']
+# The time limit in seconds for the completion of the solution with the
+# fixed decisions. The completion only gives a start for the MILP, so it
+# should not take longer than a short cold solve.
+completion_time_limit = 10
+
+
+class InitialDispatch(object):
+    """
+    After run, self.sizes contains the size of each dispatched generator,
+    self.output its heat output and self.working the state of the part load
+    in each time step, if the generator has a minimal part load.
+    self.grid_import contains the electricity from each grid and
+    self.unserved the demand, which is not served, for 'heat' and 'elec'.
+    """
+
+    def __init__(self, building, sizes=None):
+        """
+        sizes: dict with the candidate sizes of the generators, the sizes of
+            the other generators are chosen by the dispatch.
+        """
+        self.building = building
+        self.sizes = dict(sizes or {})
+        self.output = {}
+        self.working = {}
+        self.grid_import = {}
+        self.unserved = {'heat': 0, 'elec': 0}
+
+    def _generators(self):
+        generators = [comp for comp in self.building.components.values()
+                      if comp.component_type in merit_order]
+        return sorted(generators,
+                      key=lambda comp: merit_order.index(comp.component_type))
+
+    def _reaches(self, comp, consumer, energy='heat'):
+        """Return True, if the energy of the component could flow to the
+        consumer directly or over storages."""
+        components = self.building.components
+        visited = set()
+        names = [comp.name]
+        while names:
+            name = names.pop()
+            for _, dst in components[name].energy_flows['output'].get(
+                    energy, []):
+                if dst == consumer.name:
+                    return True
+                if dst not in visited and isinstance(components[dst],
+                                                     Storage):
+                    visited.add(dst)
+                    names.append(dst)
+        return False
+
+    @staticmethod
+    def _snap_size(comp, size):
+        """Limit the size to the size range. For the cost model 2 the
+        smallest product, which is not smaller than the size, is chosen."""
+        size = min(max(size, comp.min_size), comp.max_size)
+        if comp.cost_model == 2 and size > 0:
+            products = sorted(float(pair.split(';')[0])
+                              for pair in comp.cost_pair)
+            larger = [product for product in products if product >= size]
+            size = larger[0] if larger else products[-1]
+        return size
+
+    def run(self, time_step):
+        """Dispatch the heat demand in all time steps of the model."""
+        consumers = [comp for comp in self.building.components.values()
+                     if comp.component_type in heat_consumptions]
+        residual = {consumer.name: np.asarray(
+            [consumer.consum_profile[t - 1] for t in time_step], dtype=float)
+            for consumer in consumers}
+
+        for comp in self._generators():
+            reachable = [consumer.name for consumer in consumers
+                         if self._reaches(comp, consumer)]
+            load = sum((residual[name] for name in reachable),
+                       np.zeros(len(time_step)))
+            if comp.name not in self.sizes:
+                self.sizes[comp.name] = self._snap_size(comp, load.max())
+            size = self.sizes[comp.name]
+            output = np.minimum(load, size)
+            if comp.min_part_load is not None:
+                # Below the minimal part load the generator is switched off
+                # and the demand is left for the next generators.
+                self.working[comp.name] = (output > 0) & \
+                    (output >= comp.min_part_load * size)
+                output = np.where(self.working[comp.name], output, 0)
+            self.output[comp.name] = output
+
+            # The output is shared by the consumers in the order of the
+            # topology.
+            for name in reachable:
+                served = np.minimum(residual[name], output)
+                residual[name] -= served
+                output = output - served
+
+        self.unserved['heat'] = float(sum(residual[name].sum() for name in
+                                          residual))
+        self._dispatch_elec(time_step)
+        for energy, unserved in self.unserved.items():
+            if unserved > 1e-6:
+                warn('The ' + energy + ' demand could not be served '
+                     'completely by the initial dispatch, the unserved '
+                     'energy is ' + str(round(unserved, 2)) + '.')
+
+    def _elec_input(self, comp, nr_time_steps):
+        """The electricity input of the dispatched heat generator."""
+        output = self.output[comp.name]
+        if hasattr(comp, '_calc_cop'):
+            return output / comp._calc_cop(nr_time_steps)
+        return output / comp.efficiency[comp.outputs[0]]
+
+    def _dispatch_elec(self, time_step):
+        """Import the electrical demand of the consumptions and the heat
+        generators from the grids, up to the maximal size of the grid. PV and
+        batteries are left to the completion."""
+        components = self.building.components
+        residual = {comp.name: np.asarray(
+            [comp.consum_profile[t - 1] for t in time_step], dtype=float)
+            for comp in components.values()
+            if comp.component_type in elec_consumptions}
+        for name in self.output:
+            comp = components[name]
+            if comp.inputs is not None and 'elec' in comp.inputs:
+                residual[name] = self._elec_input(comp, len(time_step))
+
+        for comp in components.values():
+            if comp.component_type not in elec_sources:
+                continue
+            capacity = np.full(len(time_step), float(comp.max_size))
+            imported = np.zeros(len(time_step))
+            for name in residual:
+                if not self._reaches(comp, components[name], 'elec'):
+                    continue
+                served = np.minimum(residual[name], capacity)
+                residual[name] -= served
+                capacity -= served
+                imported += served
+            self.grid_import[comp.name] = imported
+        self.unserved['elec'] = float(sum(residual[name].sum() for name in
+                                          residual))
+
+    def fix(self, model):
+        """Fix the sizes, the selection in the cost models and the part load
+        states of the dispatched generators. Returns the fixed variables,
+        which should be unfixed after the completion."""
+        registry = get_registry(model)
+        fixed = []
+
+        def fix_var(var, value):
+            if not var.fixed:
+                var.fix(value)
+                fixed.append(var)
+
+        for name, size in self.sizes.items():
+            comp = self.building.components[name]
+            fix_var(registry.get(model, name, 'size'), size)
+            if comp.cost_model == 1:
+                fix_var(model.component('dis_select_' + name)
+                        .binary_indicator_var, int(size > 0))
+                fix_var(model.component('dis_not_select_' + name)
+                        .binary_indicator_var, int(size == 0))
+            elif comp.cost_model == 2:
+                # The last disjunct of the pairs is the size 0.
+                products = [float(pair.split(';')[0])
+                            for pair in comp.cost_pair] + [0]
+                pair = model.component(name + '_cost_pair')
+                selected = products.index(size) + 1 if size in products \
+                    else len(products)
+                for nr in pair:
+                    fix_var(pair[nr].binary_indicator_var, int(nr == selected))
+            if name in self.working:
+                work_state = registry.get(model, name, 'work_state')
+                not_work_state = registry.get(model, name, 'not_work_state')
+                for t, working in zip(model.time_step, self.working[name]):
+                    fix_var(work_state[t].binary_indicator_var, int(working))
+                    fix_var(not_work_state[t].binary_indicator_var,
+                            int(not working))
+        return fixed
@@ -0,0 +1,333 @@
+"""
+An alternative model backend for the linear and mixed integer model of
+building energy systems. The constraints are assembled directly into sparse
+matrices with numpy arrays for all time steps, instead of building a pyomo
+expression for each time step. The model is handed to the HiGHS solver,
+either through scipy.optimize.milp or through highspy.
+
+The matrix model only covers the linear part of the building model: energy
+flows, conversions, storages and the cost models 0 and 1. Components,
+which are not developed for the matrix model, raise NotImplementedError in
+the build process, so that the pyomo backend could be used for them.
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# The big M value is only used for the cost model 1, if the size variable
+# has no upper bound.
+big_m = 10 ** 8
+
+# The options of scipy.optimize.milp, which are named as the HiGHS options.
+milp_options_names = ['mip_rel_gap', 'time_limit', 'presolve']
+
+
+class MatrixVar(object):
+    """
+    A variable in the matrix model, which could be a scalar or indexed with
+    the time steps. The columns in the constraint matrix are assigned,
+    when the variable is added into the model with add_component.
+    """
+
+    def __init__(self, index=None, bounds=(None, None), binary=False):
+        self.index = index
+        self.bounds = bounds
+        self.binary = binary
+        self.name = None
+        self.start = None
+        self.block = None
+
+    def __len__(self):
+        if self.index is None:
+            return 1
+        return len(self.index)
+
+    @property
+    def col(self):
+        """The column of a scalar variable."""
+        return self.start
+
+    @property
+    def cols(self):
+        """The columns of an indexed variable, the first column belongs to
+        the first time step."""
+        return np.arange(self.start, self.start + len(self))
+
+
+class MatrixModel(object):
+    """
+    The matrix model collects the variables as columns and the constraints as
+    rows in coordinate format. The names of the variables are the same as
+    in the pyomo model, so that the VarRegistry and the result file work in
+    the same way for both backends.
+    """
+
+    def __init__(self, name, nr_time_steps):
+        self.name = name
+        # The time_step starts from 1, same as the RangeSet in pyomo model.
+        self.time_step = np.arange(1, nr_time_steps + 1)
+
+        self.vars = {}
+        self.nr_cols = 0
+        self._col_lb = []
+        self._col_ub = []
+        self._col_int = []
+
+        self.constraints = {}
+        self.nr_rows = 0
+        self._rows = []
+        self._cols = []
+        self._vals = []
+        self._row_lb = []
+        self._row_ub = []
+
+        self.obj = None
+        self.solution = None
+        self.objective_value = None
+        self.status = None
+
+    def add_component(self, name, var):
+        """Assign the columns for the variable. The method has the same name
+        as in pyomo, so the variable registry could add variables into the
+        matrix model."""
+        if name in self.vars:
+            raise ValueError('The variable ' + name + ' already exists in '
+                             'the matrix model.')
+        var.name = name
+        var.start = self.nr_cols
+        var.block = len(self._col_lb)
+        nr = len(var)
+        lb = -np.inf if var.bounds[0] is None else var.bounds[0]
+        ub = np.inf if var.bounds[1] is None else var.bounds[1]
+        self._col_lb.append(np.full(nr, lb, dtype=float))
+        self._col_ub.append(np.full(nr, ub, dtype=float))
+        self._col_int.append(np.full(nr, int(var.binary)))
+        self.nr_cols += nr
+        self.vars[name] = var
+        return var
+
+    def del_component(self, name):
+        """The columns of a deleted variable could not be removed from the
+        matrix, so they are fixed to 0 and excluded from the result."""
+        var = self.vars.pop(name, None)
+        if var is not None:
+            self._col_lb[var.block][:] = 0
+            self._col_ub[var.block][:] = 0
+
+    def find_component(self, name):
+        return self.vars.get(name)
+
+    def fix(self, var, values):
+        """Fix the variable to the given values by setting the lower and upper
+        bounds of its columns, values could be float or array."""
+        self._col_lb[var.block][:] = values
+        self._col_ub[var.block][:] = values
+
+    def _add_entries(self, rows, terms):
+        for cols, coef in terms:
+            cols = np.broadcast_to(cols, rows.shape)
+            coef = np.broadcast_to(np.asarray(coef, dtype=float), rows.shape)
+            self._rows.append(rows)
+            self._cols.append(np.asarray(cols))
+            self._vals.append(coef)
+
+    def add_rows(self, name, terms, lb=-np.inf, ub=np.inf):
+        """
+        Add one row for each index, usually for each time step.
+        terms: list of (columns, coefficients). The columns could be an
+            array for indexed variables or an integer for scalar variables,
+            which would be broadcast to all rows. Same for the coefficients.
+        lb, ub: the lower and upper bound of rows, float or array.
+        """
+        nr = max(np.size(cols) for cols, coef in terms)
+        rows = np.arange(self.nr_rows, self.nr_rows + nr)
+        self._add_entries(rows, terms)
+        self._row_lb.append(np.broadcast_to(np.asarray(lb, dtype=float), nr))
+        self._row_ub.append(np.broadcast_to(np.asarray(ub, dtype=float), nr))
+        self.constraints[name] = (self.nr_rows, nr)
+        self.nr_rows += nr
+
+    def add_row(self, name, terms, lb=-np.inf, ub=np.inf):
+        """Add a single row, all the columns in terms are summed up in the
+        row, for example the total operation cost over all time steps."""
+        for cols, coef in terms:
+            cols = np.atleast_1d(cols)
+            self._add_entries(np.full(cols.shape, self.nr_rows),
+                              [(cols, coef)])
+        self._row_lb.append(np.asarray([lb], dtype=float))
+        self._row_ub.append(np.asarray([ub], dtype=float))
+        self.constraints[name] = (self.nr_rows, 1)
+        self.nr_rows += 1
+
+    def add_eq(self, name, terms, rhs=0):
+        self.add_rows(name, terms, lb=rhs, ub=rhs)
+
+    def set_objective(self, var):
+        """The objective is the minimization of the given scalar variable,
+        like annual cost or operation cost of the building."""
+        self.obj = np.zeros(self.nr_cols)
+        self.obj[var.col] = 1
+
+    def get_matrix(self):
+        """Return the constraint matrix in CSR format and the bounds of rows
+        and columns."""
+        if self._rows:
+            rows = np.concatenate(self._rows)
+            cols = np.concatenate(self._cols)
+            vals = np.concatenate(self._vals)
+        else:
+            rows = cols = vals = np.zeros(0)
+        matrix = sparse.csr_matrix((vals, (rows, cols)),
+                                   shape=(self.nr_rows, self.nr_cols))
+        return (matrix, np.concatenate(self._row_lb),
+                np.concatenate(self._row_ub), np.concatenate(self._col_lb),
+                np.concatenate(self._col_ub), np.concatenate(self._col_int))
+
+    def solve(self, solver_name='scipy', mip_gap=None, time_limit=None,
+              tee=False, options=None):
+        """
+        Solve the model with HiGHS. 'scipy' uses scipy.optimize.milp, which is
+        available from scipy 1.9. 'highs' uses the python interface highspy.
+        options: dict of HiGHS options, which overwrite mip_gap and
+        time_limit. scipy only accepts the options of scipy.optimize.milp
+        (mip_rel_gap, time_limit and presolve), the other options are ignored
+        with a warning.
+        """
+        if solver_name not in ['scipy', 'highs']:
+            warnings.warn('The solver ' + solver_name + ' is not available '
+                          'for the matrix model, HiGHS is used.')
+            solver_name = 'scipy'
+        if solver_name == 'scipy':
+            try:
+                from scipy.optimize import milp
+            except ImportError:
+                solver_name = 'highs'
+
+        matrix, row_lb, row_ub, col_lb, col_ub, col_int = self.get_matrix()
+        if solver_name == 'scipy':
+            from scipy.optimize import milp, Bounds, LinearConstraint
+            milp_options = {'disp': tee}
+            if mip_gap is not None:
+                milp_options['mip_rel_gap'] = mip_gap
+            if time_limit is not None:
+                milp_options['time_limit'] = time_limit
+            for key, value in (options or {}).items():
+                if key == 'presolve' and isinstance(value, str):
+                    # HiGHS uses 'on' and 'off', scipy a boolean.
+                    milp_options[key] = value != 'off'
+                elif key in milp_options_names:
+                    milp_options[key] = value
+                else:
+                    warnings.warn('The option ' + key + ' is not supported '
+                                  'by scipy.optimize.milp and is ignored, '
+                                  'use the solver highs for all HiGHS '
+                                  'options.')
+            result = milp(self.obj, integrality=col_int,
+                          bounds=Bounds(col_lb, col_ub),
+                          constraints=LinearConstraint(matrix, row_lb, row_ub),
+                          options=milp_options)
+            self.status = {0: 'optimal', 1: 'maxTimeLimit', 2: 'infeasible',
+                           3: 'unbounded'}.get(result.status, 'error')
+            self.solution = result.x
+            self.objective_value = result.fun
+        else:
+            import highspy
+
+            highs = self._to_highs(matrix, row_lb, row_ub, col_lb, col_ub,
+                                   col_int)
+            highs.setOptionValue('output_flag', tee)
+            if mip_gap is not None:
+                highs.setOptionValue('mip_rel_gap', mip_gap)
+            if time_limit is not None:
+                highs.setOptionValue('time_limit', float(time_limit))
+            for key, value in (options or {}).items():
+                if highs.setOptionValue(key, value) == \
+                        highspy.HighsStatus.kError:
+                    warnings.warn('The option ' + key + ' is not valid for '
+                                  'HiGHS and is ignored.')
+            highs.run()
+            status = highs.modelStatusToString(highs.getModelStatus())
+            self.status = {'Optimal': 'optimal',
+                           'Time limit reached': 'maxTimeLimit',
+                           'Infeasible': 'infeasible',
+                           'Unbounded': 'unbounded'}.get(status, status)
+            if highs.getInfo().primal_solution_status:
+                self.solution = np.asarray(highs.getSolution().col_value)
+                self.objective_value = highs.getInfo().objective_function_value
+            else:
+                self.solution = None
+                self.objective_value = None
+        return self.status
+
+    def _to_highs(self, matrix, row_lb, row_ub, col_lb, col_ub, col_int):
+        import highspy
+
+        lp = highspy.HighsLp()
+        lp.num_col_ = self.nr_cols
+        lp.num_row_ = self.nr_rows
+        lp.col_cost_ = self.obj
+        lp.col_lower_ = col_lb
+        lp.col_upper_ = col_ub
+        lp.row_lower_ = row_lb
+        lp.row_upper_ = row_ub
+        matrix = matrix.tocsc()
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.start_ = matrix.indptr
+        lp.a_matrix_.index_ = matrix.indices
+        lp.a_matrix_.value_ = matrix.data
+        lp.integrality_ = [highspy.HighsVarType.kInteger if item else
+                           highspy.HighsVarType.kContinuous for item in
+                           col_int]
+        highs = highspy.Highs()
+        highs.passModel(lp)
+        return highs
+
+    def write(self, path):
+        """Write the model into a file, the format is determined by the file
+        extension (.mps or .lp)."""
+        matrix, row_lb, row_ub, col_lb, col_ub, col_int = self.get_matrix()
+        highs = self._to_highs(matrix, row_lb, row_ub, col_lb, col_ub,
+                               col_int)
+        highs.setOptionValue('output_flag', False)
+        # The labels in the file follow the symbolic labels of pyomo, since
+        # brackets are not allowed in lp file.
+        for name, var in self.vars.items():
+            if var.index is None:
+                highs.passColName(int(var.col), name)
+            else:
+                for col, t in zip(var.cols, var.index):
+                    highs.passColName(int(col), name + '(' + str(t) + ')')
+        for name, (start, nr) in self.constraints.items():
+            if nr == 1:
+                highs.passRowName(start, name)
+            else:
+                for i in range(nr):
+                    highs.passRowName(start + i, name + '(' + str(i + 1) + ')')
+        highs.writeModel(path)
+
+    @staticmethod
+    def _labels(var):
+        if var.index is None:
+            return [var.name + '[None]']
+        return [var.name + '[' + str(t) + ']' for t in var.index]
+
+    def value(self, var):
+        """Return the solution of a variable, float for scalar variables and
+        numpy array for indexed variables."""
+        if isinstance(var, str):
+            var = self.vars[var]
+        if var.index is None:
+            return self.solution[var.col]
+        return self.solution[var.cols]
+
+    def to_dataframe(self):
+        """Results in the same format as the result file of pyomo model."""
+        var_list = []
+        value_list = []
+        for name, var in self.vars.items():
+            var_list += self._labels(var)
+            value_list += list(np.atleast_1d(self.value(var)))
+        return pd.DataFrame(list(zip(var_list, value_list)),
+                            columns=['var', 'value'])
@@ -0,0 +1,268 @@
+"""
+The persistent solver keeps the model loaded in the solver between the
+solves, for example in parameter sweeps with Project.update_parameters or
+after Project.rebuild_component. Only the changed parameters, bounds, fixed
+variables and constraints are sent to the solver again. The pyomo appsi
+interfaces are used, if the chosen solver is not available, HiGHS or CBC is
+used instead.
+"""
+
+import time
+from warnings import warn
+import pyomo.environ as pyo
+import pyomo.version
+from pyomo.common.collections import ComponentMap
+from pyomo.common.timing import HierarchicalTimer
+from pyomo.contrib.appsi.base import TerminationCondition
+from pyomo.contrib.appsi.solvers import Gurobi, Highs, Cbc, Cplex
+from pyomo.util.vars_from_expressions import get_vars_from_components
+from scripts.SolutionCache import var_label
+from utils.solver_options import get_profile, get_solver_options
+
+appsi_solvers = {'gurobi': Gurobi, 'highs': Highs, 'cbc': Cbc,
+                 'cplex': Cplex}
+# The solvers, which are tried in order, if the given solver is not
+# available.
+fallback_solvers = ['highs', 'cbc']
+
+
+class PersistentSolver(object):
+    """
+    The session is bound to one model. Each call of solve records the time,
+    the time for loading the model or the changes into the solver and the
+    objective in self.iterations, so that the cost of the first solve could
+    be compared with the following solves.
+    """
+
+    def __init__(self, model, solver_name='gurobi', profile='default',
+                 options=None, tee=False):
+        """
+        profile, options: the solver profile and the additional solver
+            options, see utils/solver_options.py.
+        """
+        self.model = model
+        self.solver_name, self.solver = self._create_solver(solver_name)
+        self.solver.config.stream_solver = tee
+        settings = get_profile(profile)
+        self.solver.config.time_limit = settings.get('time_limit')
+        if 'mip_gap' in self.solver.config:
+            self.solver.config.mip_gap = settings.get('mip_gap')
+        getattr(self.solver, self.solver_name + '_options').update(
+            get_solver_options(self.solver_name, profile, options))
+        # The solution is loaded after the check of termination condition.
+        self.solver.config.load_solution = False
+        self.iterations = []
+        # The model is loaded with set_instance in the first solve and after
+        # reset, the following solves only send the changes.
+        self._reload = True
+        # The incumbents are written into the checkpoint during the solve,
+        # see set_checkpoint. The variables, which are handed to the solver,
+        # are collected in the first callback of each solve.
+        self.checkpoint = None
+        self._checkpoint_highs = None
+        self._solver_vars = None
+
+    @staticmethod
+    def _create_solver(solver_name):
+        """Return the name and the appsi solver. The prefix 'appsi_' in the
+        name is allowed."""
+        solver_name = solver_name.replace('appsi_', '')
+        for name in [solver_name] + fallback_solvers:
+            if name not in appsi_solvers:
+                continue
+            solver = appsi_solvers[name]()
+            if solver.available():
+                if name != solver_name:
+                    warn('The persistent solver ' + solver_name + ' is not '
+                         'available, ' + name + ' is used.')
+                return name, solver
+        raise RuntimeError('No persistent solver is available, please '
+                           'install ' + solver_name + ' or one of ' +
+                           ', '.join(fallback_solvers) + '.')
+
+    def solve(self, model=None, warmstart=False):
+        """
+        Solve the model and load the solution into the model. The values of
+        the variables from the last solve are given to the solver as warm
+        start, if the solver supports it. With warmstart=True the current
+        values are also used in the first solve, e.g. a cached solution. The
+        gdp model should be transformed with gdp.bigm before, see
+        Project.run_optimization.
+        Returns the appsi results.
+        """
+        if model is not None and model is not self.model:
+            raise ValueError('The persistent solver is bound to another '
+                             'model, please create a new one.')
+        model = self.model
+
+        start = time.perf_counter()
+        if 'warmstart' in self.solver.config:
+            self.solver.config.warmstart = warmstart or \
+                len(self.iterations) > 0
+        timer = HierarchicalTimer()
+        if self._reload:
+            timer.start('set_instance')
+            self.solver.set_instance(model)
+            timer.stop('set_instance')
+            self._reload = False
+        if self.checkpoint is not None and self.solver_name == 'highs':
+            self._attach_highs_callback()
+        self._solver_vars = None
+        results = self.solver.solve(model, timer=timer)
+        if results.best_feasible_objective is not None:
+            results.solution_loader.load_vars()
+        duration = time.perf_counter() - start
+
+        # The time for loading the model into the solver in the first solve
+        # (set_instance) or for sending the changes in the following solves
+        # (update).
+        load_time = sum(timer.timers[key].total_time for key in
+                        ['set_instance', 'update'] if key in timer.timers)
+        self.iterations.append({
+            'iteration': len(self.iterations) + 1,
+            'time': duration,
+            'load_time': load_time,
+            'termination': str(results.termination_condition),
+            'objective': results.best_feasible_objective})
+        return results
+
+    def reset(self):
+        """Load the whole model into the solver again in the next solve. It
+        should be called after the structure of the model is changed, for
+        example by Component.rebuild. The update of removed and re-added
+        components is not reliable in all pyomo versions."""
+        self._reload = True
+
+    def set_checkpoint(self, checkpoint):
+        """Write each improved incumbent into the checkpoint during the
+        following solves. The callbacks are only supported for HiGHS and
+        Gurobi."""
+        if self.solver_name not in ['highs', 'gurobi']:
+            warn('The incumbents could not be received from the solver ' +
+                 self.solver_name + ', only the final solution is written '
+                 'into the checkpoint.')
+            return
+        self.checkpoint = checkpoint
+        if self.solver_name == 'gurobi':
+            self.solver.set_callback(self._gurobi_callback)
+
+    def _variables(self):
+        """Return the variables in the active constraints and the objective
+        of the model, which are handed to the solver, as ComponentMap with
+        the labels of the variables, see SolutionCache.var_label."""
+        if self._solver_vars is None:
+            self._solver_vars = ComponentMap(
+                (var, var_label(var)) for var in get_vars_from_components(
+                    self.model, (pyo.Constraint, pyo.Objective), active=True))
+        return self._solver_vars
+
+    def _stop_incumbents(self, reason):
+        """Stop writing the incumbents during the solve, the final solution
+        is still written into the checkpoint by Project.run_optimization."""
+        warn('The incumbents could not be received from the solver ' +
+             self.solver_name + ' (' + reason + '), only the final solution '
+             'is written into the checkpoint.')
+        self.checkpoint = None
+        if self.solver_name == 'gurobi':
+            self.solver.set_callback(None)
+
+    def _highs_compat(self):
+        """Compatibility shim for the private attributes of the appsi HiGHS
+        interface, which has no public access to the HiGHS object and to the
+        columns of the variables. Return the HiGHS object and the map from
+        the id of a variable to its column or None for each attribute, that
+        is not found, with a warning, so that a renamed attribute in other
+        pyomo versions is noticed. All private accesses of the appsi
+        interface have to be made here."""
+        highs = getattr(self.solver, '_solver_model', None)
+        columns = getattr(self.solver, '_pyomo_var_to_solver_var_map', None)
+        missing = [name for name, value in
+                   [('_solver_model', highs),
+                    ('_pyomo_var_to_solver_var_map', columns)]
+                   if value is None]
+        if missing:
+            warn('The attributes ' + ', '.join(missing) + ' of the appsi '
+                 'interface of HiGHS are not found in pyomo ' +
+                 pyomo.version.version + '.')
+        return highs, columns
+
+    def _attach_highs_callback(self):
+        """Subscribe the callback for improved solutions in the HiGHS object
+        of the appsi interface, which is created in set_instance. The HiGHS
+        object is given by the compatibility shim _highs_compat."""
+        highs, columns = self._highs_compat()
+        if highs is None or columns is None:
+            self._stop_incumbents('the HiGHS object or its columns are not '
+                                  'found')
+            return
+        if highs is self._checkpoint_highs:
+            return
+        self._checkpoint_highs = highs
+        if hasattr(highs, 'cbMipImprovingSolution'):
+            highs.cbMipImprovingSolution.subscribe(
+                lambda event: self._highs_callback(event.data_out))
+        elif hasattr(highs, 'setCallback'):
+            # The callback interface of older highspy versions.
+            import highspy
+            highs.setCallback(
+                lambda callback_type, message, data_out, data_in, user_data:
+                self._highs_callback(data_out), None)
+            highs.startCallback(
+                highspy.cb.HighsCallbackType.kCallbackMipImprovingSolution)
+        else:
+            self._stop_incumbents('highspy has no callbacks')
+
+    def _highs_labels(self):
+        """Return the labels of the variables in the order of the columns in
+        HiGHS or None, if the order is not known. The columns are given by
+        the compatibility shim _highs_compat."""
+        columns = self._highs_compat()[1]
+        if columns is None:
+            return None
+        labels = [None] * len(columns)
+        for var, label in self._variables().items():
+            col = columns.get(id(var))
+            if col is not None and col < len(labels):
+                labels[col] = label
+        if any(label is None for label in labels):
+            return None
+        return labels
+
+    def _highs_callback(self, data_out):
+        if self.checkpoint is None:
+            return
+        labels = self._highs_labels()
+        if labels is None:
+            self._stop_incumbents('the columns of HiGHS are not known')
+            return
+        self.checkpoint.save(
+            self.model, dict(zip(labels, data_out.mip_solution)),
+            objective=data_out.mip_primal_bound,
+            bound=data_out.mip_dual_bound, gap=data_out.mip_gap,
+            solve_time=data_out.running_time)
+
+    def _gurobi_callback(self, cb_model, cb_solver, cb_where):
+        from gurobipy import GRB
+        if cb_where != GRB.Callback.MIPSOL or self.checkpoint is None:
+            return
+        try:
+            # The solution of the callback is loaded into the variables of
+            # the model, the final solution is loaded after the solve.
+            cb_solver.cbGetSolution([var for var in self._variables() if
+                                     not var.fixed])
+            objective = cb_solver.cbGet(GRB.Callback.MIPSOL_OBJ)
+            bound = cb_solver.cbGet(GRB.Callback.MIPSOL_OBJBND)
+            solve_time = cb_solver.cbGet(GRB.Callback.RUNTIME)
+        except Exception as error:
+            # An error in the callback should not stop the solve.
+            self._stop_incumbents(str(error))
+            return
+        self.checkpoint.save(
+            self.model, objective=objective, bound=bound,
+            gap=abs(objective - bound) / max(abs(objective), 1e-10),
+            solve_time=solve_time)
+
+    @staticmethod
+    def infeasible(results):
+        return (results.termination_condition ==
+                TerminationCondition.infeasible)
@@ -4,15 +4,47 @@ optimization.
 """
 
 import os
+import json
+import time
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 from warnings import warn
 
 import pandas as pd
 import pyomo.environ as pyo
-import tsam.timeseriesaggregation as tsam
+from pyomo.gdp import Disjunction
+from scripts.VarRegistry import VarRegistry, get_registry
+from scripts.MatrixModel import MatrixModel
+from scripts.PersistentSolver import PersistentSolver
+from scripts.SolverRace import SolverRace
+from scripts.SolutionCache import SolutionCache
+from scripts.ClusterCache import ClusterCache
+from scripts.InitialDispatch import InitialDispatch, completion_time_limit
+from scripts.SolverTelemetry import SolverTelemetry
+from scripts.Checkpoint import Checkpoint
+from scripts.BuildProfiler import BuildProfiler, profile as profile_block
+from utils.model_writer import write_model
+from utils.relaxation import relax_integer_vars, restore_integer_vars
+from utils.bound_tightening import infer_bounds, restore_bounds
+from utils.solver_options import get_profile, get_solver_family, \
+    get_solver_options
+from utils.time_series_cluster import cluster_profiles, error_metrics, \
+    meets_tolerance
 
 
 base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# The scalar prices in environment, which are added into the pyomo model as
+# mutable parameters.
+price_params = ['elec_price', 'gas_price', 'heat_price', 'elec_feed_price']
+# The consumption components and their demand profiles in building.
+consumption_demands = {'HeatConsumption': 'heat_demand',
+                       'ElectricalConsumption': 'elec_demand',
+                       'HotWaterConsumption': 'hot_water_demand'}
+# The numbers of typical periods, which are evaluated in time_cluster with a
+# target error.
+period_candidates = list(range(4, 41, 4))
+
 
 class Project(object):
     def __init__(self, name, typ):
@@ -26,9 +58,34 @@ class Project(object):
 
         # The pyomo model
         self.model = None
+        # The persistent solver session, see run_optimization
+        self.solver = None
+        # The solver profile for the scenario, see utils/solver_options.py
+        self.solver_profile = 'default'
+        # The results of the last solver race, see run_optimization
+        self.race_results = None
+        # The cached solutions for warm start, see run_optimization
+        self.solution_cache = SolutionCache(os.path.join(base_path, 'data',
+                                                         'solution_cache'))
+        self.warmstart_info = None
+        # The result of the initial dispatch, see run_optimization
+        self.dispatch_info = None
+        # The parsed solver log of the last run, see run_optimization
+        self.telemetry = None
+        # The bound and the sizes of the last relaxed run, see
+        # run_optimization
+        self.relaxation_info = None
 
         # Infos about time series cluster, default value set to None
         self.cluster = None
+        # The cached results of time_cluster and the key and cache hit of the
+        # last clustering, see time_cluster
+        self.cluster_cache = ClusterCache(os.path.join(base_path, 'data',
+                                                       'cluster_cache'))
+        self.cluster_info = None
+        # The errors of the evaluated numbers of typical periods, see
+        # time_cluster
+        self.cluster_errors = None
 
     def add_environment(self, environment):
         """
@@ -53,77 +110,92 @@ class Project(object):
         self.building_list.append(building)
 
     def time_cluster(self, nr_periods=12, hours_period=24, save_cls=None,
-                     read_cls=None):
-        # The profiles could be clustered are: demand profiles, weather
-        # profiles and prices profiles (if necessary). demand profiles are
-        # stored in buildings and other information are stored in Environment
-        # objects.
+                     read_cls=None, use_cache=True, weights=None,
+                     target_error=None, candidates=None, processes=None,
+                     error_profiles=None, nr_segments=None):
+        """
+        Cluster the profiles of the year into typical periods with tsam, the
+        result is stored in self.cluster. The typical period of each original
+        period is given in self.cluster.attrs['cluster_order'], which is used
+        for the inter period storage, see Storage.inter_period.
+        The profiles could be clustered are: demand profiles, weather
+        profiles and prices profiles (if necessary). demand profiles are
+        stored in buildings and other information are stored in Environment
+        objects. With several buildings the demand profiles of all buildings
+        are clustered together with the shared weather and price profiles,
+        so all buildings get the same typical periods. The demand profiles
+        are then named with the building name in self.cluster, e.g.
+        'bld_1.heat_demand', see Building.cluster_column, and each building
+        takes its profiles in Building.update_components.
+        weights: dict of the weights of the profiles in the clustering, the
+            default weight is 1. The keys are the names of the profiles,
+            e.g. 'temp' or 'heat_demand', which is applied to the heat demand
+            of all buildings, or the names of the profiles of one building,
+            e.g. 'bld_1.heat_demand'. With several buildings the demand
+            profiles get the default weight 1 / number of buildings, so that
+            the weather and prices have the same share as for one building.
+        save_cls, read_cls: the file name of the cluster result in the folder
+            data/cls_file, which is saved after the clustering or read
+            instead of the clustering. The key of the profiles is saved in
+            the json file next to it, a warning is given, if the file is
+            read for other profiles.
+        use_cache: if True, the result is taken from the cluster cache, if
+            the same profiles were clustered with the same settings before,
+            otherwise tsam is run and the result is stored in the cache, see
+            ClusterCache. The key of the result and whether it was found in
+            the cache are recorded in self.cluster_info.
+        target_error: if given, nr_periods is chosen as the smallest number
+            in candidates, for which the errors of all profiles, which are
+            reconstructed from the typical periods, meet the tolerance. It
+            could be a float for all error metrics or a dict with the
+            tolerance of the metrics 'rmse', 'peak' and 'duration', the
+            errors are relative to the range of each profile, see
+            utils/time_series_cluster.py. The largest candidate is used with
+            a warning, if no candidate meets the tolerance. The maximal
+            errors of the evaluated candidates are stored in
+            self.cluster_errors.
+        candidates: the numbers of typical periods, which are evaluated in
+            ascending order, the default is 4, 8, ..., 40.
+        processes: the number of processes, in which the candidates are
+            clustered in parallel, the default is the number of cpus.
+        error_profiles: the names of the profiles, which are checked against
+            target_error, the default is all clustered profiles. The names
+            are given as for weights. E.g. the wind profile, which is not
+            used by the components, could be excluded.
+        nr_segments: if given, each typical period is divided into this
+            number of segments with variable duration instead of
+            hours_period hourly time steps (segmentation of tsam). The
+            duration of each time step in hours is given in the column
+            Duration of self.cluster, it is used as weight in the annual sums
+            and in the energy balance of storages, see
+            Building.update_components.
+        """
         # todo (yni): the cluster is developed only for whole year scenarios.
         #  Whether to adapt to other scenarios needs further consideration.
 
         # Allowing to read the cluster file from the data folder. If the file is
         # not found, the cluster will be generated and saved in the data folder.
         # For same building, the cluster could be reused.
+        start = time.perf_counter()
         if read_cls is None:
-            if self.environment is None:
-                warn("Can't find Environment object in Project")
-            if self.environment.time_step != 8760:
-                warn("The time_cluster is developed only for whole year "
-                     "scenarios")
-            if len(self.building_list) == 0:
-                warn("Can't find Building object in Project")
-            elif len(self.building_list) > 1:
-                warn("Number of Building object in Project is larger than 1")
-
-            demand_profiles = self.building_list[0].demand_profile
-            weather_profiles = {"temp": self.environment.temp_profile,
-                                "wind": self.environment.wind_profile,
-                                "irr": self.environment.irr_profile}
-            price_profiles = {}
-            if isinstance(self.environment.elec_price, list):
-                price_profiles["elec_price"] = self.environment.elec_price
-            if isinstance(self.environment.gas_price, list):
-                price_profiles["gas_price"] = self.environment.gas_price
-            if isinstance(self.environment.heat_price, list):
-                price_profiles["heat_price"] = self.environment.heat_price
-            if isinstance(self.environment.elec_feed_price, list):
-                price_profiles["elec_feed_price"] = self.environment.elec_feed_price
-            if isinstance(self.environment.co2_price, list):
-                price_profiles["co2_price"] = self.environment.co2_price
-
-            # Original profiles for mentioned series
-            orig_profiles = {**demand_profiles, **weather_profiles,
-                             **price_profiles}
-
-            # Delete empty elements before clustering
-            empty_element_list = []
-            for key in orig_profiles.keys():
-                if len(orig_profiles[key]) == 0:
-                    empty_element_list.append(key)
-
-            for empty_element in empty_element_list:
-                del orig_profiles[empty_element]
-
-            # Turn profiles from dict into pandas Dataframe and use package tsam
-            raw = pd.DataFrame(orig_profiles)
-            raw.index = pd.to_datetime(arg=raw.index, unit='h',
-                                       origin=pd.Timestamp('2021-01-01'))
-
-            aggregation = \
-                tsam.TimeSeriesAggregation(raw,
-                                           noTypicalPeriods=nr_periods,
-                                           hoursPerPeriod=hours_period,
-                                           clusterMethod='hierarchical',
-                                           extremePeriodMethod=
-                                           'new_cluster_center',
-                                           addPeakMin=['temp'],
-                                           addPeakMax=[
-                                               'heat_demand'])
-            typ_periods = aggregation.createTypicalPeriods()
-            period_occurs = aggregation.clusterPeriodNoOccur
-            typ_periods = typ_periods.reset_index()
-            typ_periods['Occur'] = typ_periods['level_0'].apply(
-                lambda x: period_occurs[x])
+            raw = self._cluster_profiles()
+            typ_periods = None
+            if target_error is not None:
+                nr_periods, typ_periods = self._select_nr_periods(
+                    raw, hours_period, weights, target_error, candidates,
+                    processes, use_cache, error_profiles, nr_segments)
+            settings = self._cluster_settings(nr_periods, hours_period,
+                                              raw.columns, weights,
+                                              nr_segments)
+            key = self.cluster_cache.key(raw, settings)
+            cache_hit = False
+            if use_cache and typ_periods is None:
+                typ_periods = self.cluster_cache.load(key)
+                cache_hit = typ_periods is not None
+            if typ_periods is None:
+                typ_periods = cluster_profiles(raw, settings)
+                if use_cache:
+                    self.cluster_cache.store(key, typ_periods, settings)
 
             if save_cls is not None:
                 if os.path.exists(os.path.join(base_path, 'data', 'cls_file')):
@@ -135,21 +207,253 @@ class Project(object):
                                               save_cls)
 
                 typ_periods.to_csv(cls_result)
+                # The key and the settings are saved next to the file, so
+                # that the file is checked against the profiles, when it is
+                # read.
+                with open(cls_result + '.json', 'w') as f:
+                    json.dump({'key': key, 'settings': settings,
+                               'cluster_order': typ_periods.attrs.get(
+                                   'cluster_order')}, f, indent=2)
         else:
-            typ_periods = pd.read_csv(os.path.join(base_path, 'data',
-                                                   'cls_file', read_cls))
+            cls_result = os.path.join(base_path, 'data', 'cls_file',
+                                      read_cls)
+            typ_periods = pd.read_csv(cls_result)
+            key = None
+            cache_hit = None
+            if os.path.exists(cls_result + '.json'):
+                with open(cls_result + '.json') as f:
+                    saved = json.load(f)
+                key = saved['key']
+                if saved.get('cluster_order') is not None:
+                    typ_periods.attrs['cluster_order'] = \
+                        saved['cluster_order']
+                if key != self.cluster_cache.key(self._cluster_profiles(),
+                                                 saved['settings']):
+                    warn('The cluster file ' + read_cls + ' was created for '
+                         'other profiles than the profiles of the project.')
 
         self.cluster = typ_periods
+        self.cluster_info = {'key': key, 'cache_hit': cache_hit,
+                             'nr_periods': nr_periods if read_cls is None
+                             else None,
+                             'time': time.perf_counter() - start}
+
+    def _select_nr_periods(self, raw, hours_period, weights, target_error,
+                           candidates, processes, use_cache,
+                           error_profiles=None, nr_segments=None):
+        """Return the smallest number of typical periods in candidates,
+        which meets target_error, and its typical periods. The typical
+        periods are None, if the errors are taken from the cluster cache.
+        The candidates are evaluated in batches of the number of processes,
+        the larger candidates are not evaluated, if one candidate in the
+        batch meets the tolerance."""
+        if isinstance(target_error, dict):
+            unknown = set(target_error) - set(error_metrics)
+            if unknown:
+                raise ValueError('The error metrics ' + str(sorted(unknown))
+                                 + ' are not allowed. The allowed metrics '
+                                 'are ' + ', '.join(error_metrics))
+        if error_profiles is None:
+            checked = list(raw.columns)
+        else:
+            checked = [column for name in error_profiles for column in
+                       _match_columns(name, raw.columns)]
+            if len(checked) == 0:
+                raise ValueError('The error_profiles are not clustered.')
+        candidates = sorted(set(candidates or period_candidates))
+        processes = processes or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(processes) if processes > 1 else None
+
+        records = []
+        results = {}
+        chosen = None
+        try:
+            for nr in range(0, len(candidates), processes):
+                jobs = {}
+                for nr_periods in candidates[nr:nr + processes]:
+                    settings = self._cluster_settings(
+                        nr_periods, hours_period, raw.columns, weights,
+                        nr_segments)
+                    key = self.cluster_cache.key(raw, settings)
+                    errors = self.cluster_cache.errors(key) if use_cache \
+                        else None
+                    if errors is not None:
+                        results[nr_periods] = (None, errors)
+                        continue
+                    if pool is None:
+                        job = cluster_profiles(raw, settings, errors=True)
+                    else:
+                        job = pool.submit(cluster_profiles, raw, settings,
+                                          errors=True)
+                    jobs[nr_periods] = (job, key, settings)
+                for nr_periods, (job, key, settings) in jobs.items():
+                    results[nr_periods] = job if pool is None else \
+                        job.result()
+                    if use_cache:
+                        typ_periods, errors = results[nr_periods]
+                        self.cluster_cache.store(key, typ_periods, settings,
+                                                 errors)
+                for nr_periods in candidates[nr:nr + processes]:
+                    errors = results[nr_periods][1].loc[checked]
+                    records.append({'nr_periods': nr_periods,
+                                    **errors.max().to_dict(),
+                                    'worst_profile': errors['rmse'].idxmax()})
+                    if chosen is None and meets_tolerance(errors,
+                                                          target_error):
+                        chosen = nr_periods
+                if chosen is not None:
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.cluster_errors = pd.DataFrame(records).set_index('nr_periods')
+        if chosen is None:
+            chosen = candidates[-1]
+            warn('No number of typical periods meets the target error, '
+                 + str(chosen) + ' typical periods are used.')
+        return chosen, results[chosen][0]
 
-    def build_model(self, obj_typ='annual_cost'):
+    def _cluster_profiles(self):
+        """Return the profiles of the buildings and the environment, which
+        are clustered, as DataFrame with an hourly index."""
+        if self.environment is None:
+            warn("Can't find Environment object in Project")
+        if self.environment.time_step != 8760:
+            warn("The time_cluster is developed only for whole year "
+                 "scenarios")
+        if len(self.building_list) == 0:
+            warn("Can't find Building object in Project")
+
+        if len(self.building_list) == 1:
+            demand_profiles = self.building_list[0].demand_profile
+        else:
+            demand_profiles = {bld.cluster_column(name): profile for bld in
+                               self.building_list for name, profile in
+                               bld.demand_profile.items()}
+        weather_profiles = {"temp": self.environment.temp_profile,
+                            "wind": self.environment.wind_profile,
+                            "irr": self.environment.irr_profile}
+        price_profiles = {}
+        if isinstance(self.environment.elec_price, list):
+            price_profiles["elec_price"] = self.environment.elec_price
+        if isinstance(self.environment.gas_price, list):
+            price_profiles["gas_price"] = self.environment.gas_price
+        if isinstance(self.environment.heat_price, list):
+            price_profiles["heat_price"] = self.environment.heat_price
+        if isinstance(self.environment.elec_feed_price, list):
+            price_profiles["elec_feed_price"] = self.environment.elec_feed_price
+        if isinstance(self.environment.co2_price, list):
+            price_profiles["co2_price"] = self.environment.co2_price
+
+        # Original profiles for mentioned series
+        orig_profiles = {**demand_profiles, **weather_profiles,
+                         **price_profiles}
+
+        # Delete empty elements before clustering
+        empty_element_list = []
+        for key in orig_profiles.keys():
+            if len(orig_profiles[key]) == 0:
+                empty_element_list.append(key)
+
+        for empty_element in empty_element_list:
+            del orig_profiles[empty_element]
+
+        # Turn profiles from dict into pandas Dataframe and use package tsam
+        raw = pd.DataFrame(orig_profiles)
+        raw.index = pd.to_datetime(arg=raw.index, unit='h',
+                                   origin=pd.Timestamp('2021-01-01'))
+        return raw
+
+    def _cluster_settings(self, nr_periods, hours_period, columns,
+                          weights=None, nr_segments=None):
+        """The arguments of tsam.TimeSeriesAggregation except the profiles,
+        which are also part of the key in the cluster cache. columns: the
+        names of the clustered profiles, see _cluster_profiles."""
+        settings = {'noTypicalPeriods': nr_periods,
+                    'hoursPerPeriod': hours_period,
+                    'clusterMethod': 'hierarchical',
+                    'extremePeriodMethod': 'new_cluster_center',
+                    'addPeakMin': ['temp'],
+                    'addPeakMax': ['heat_demand']}
+        if nr_segments is not None:
+            settings['segmentation'] = True
+            settings['noSegments'] = nr_segments
+        weight_dict = {}
+        if len(self.building_list) > 1:
+            # The peak heat demand of each building is kept as extreme period.
+            settings['addPeakMax'] = [
+                bld.cluster_column('heat_demand') for bld in
+                self.building_list if bld.cluster_column('heat_demand') in
+                columns]
+            weight_dict = {bld.cluster_column(name): 1 / len(
+                self.building_list) for bld in self.building_list for name in
+                bld.demand_profile if bld.cluster_column(name) in columns}
+        for name, weight in (weights or {}).items():
+            matched = _match_columns(name, columns)
+            if len(matched) == 0:
+                warn('The profile ' + name + ' for the weight is not '
+                     'clustered.')
+            for column in matched:
+                weight_dict[column] = weight
+        if weight_dict:
+            settings['weightDict'] = weight_dict
+        return settings
+
+    def build_model(self, obj_typ='annual_cost', backend='pyomo',
+                    fix_profile=True, flow_expression=True,
+                    prune_topology=False, profile=False,
+                    mutable_prices=False):
         """
         Build up a mathematical model (concrete model) using pyomo modeling
         language for optimization.
+        backend: 'pyomo' or 'matrix'. The matrix backend assembles the linear
+            model directly into sparse matrices, which is much faster for
+            long time series, but it is only developed for a single building
+            without subsidies, part load and the cost model 2.
+        fix_profile: if True, the variables, which are determined by a
+            profile (the input of consumptions and solar components), are
+            fixed or substituted instead of generating an equality constraint
+            for each time step. Set it to False to get the constraints in the
+            lp file for debugging.
+        flow_expression: if True, the inputs and outputs of components, which
+            are connected with other components, are expressions over the
+            energy flows instead of variables with the constraints sum_input
+            and sum_output. The result file is the same. Only used for the
+            pyomo backend.
+        prune_topology: if True, the components and energy flows, which could
+            never carry energy, are removed from the buildings before the
+            model is built, see Building.prune_topology. The removed
+            components are not in the result file.
+        profile: if True, the wall time, the allocated memory and the number
+            of variables, binaries, constraints and disjuncts are recorded
+            for the building, each component and subsidy and the gdp
+            transformation, see BuildProfiler. The records are saved as
+            build_profile.csv and build_profile.json next to result.csv.
+            Tracing the memory slows down the build, with profile='time' the
+            memory is not traced.
+        mutable_prices: if True, the scalar prices in environment are added
+            as mutable parameters, so that they could be changed with
+            update_parameters without rebuilding the model. Otherwise the
+            prices are multiplied into the coefficients, which is faster to
+            build and to hand to the solver. Only used for the pyomo backend.
         """
-        if self.typ == 'building' and len(self.building_list) == 1:
+        if prune_topology:
+            for bld in self.building_list:
+                bld.prune_topology()
+
+        if backend == 'matrix':
+            self._build_matrix_model(obj_typ, fix_profile)
+        elif self.typ == 'building' and len(self.building_list) == 1:
             # Initialisation of ConcreteModel
             self.model = pyo.ConcreteModel(self.name)
             self.model.cons = pyo.ConstraintList()
+            self.model.registry = VarRegistry()
+            self.model.fix_profile = fix_profile
+            self.model.flow_expression = flow_expression
+            if profile:
+                self.model.profiler = BuildProfiler(
+                    trace_memory=(profile != 'time'))
 
             if self.cluster is None:
                 self.model.time_step = pyo.RangeSet(self.environment.time_step)
@@ -158,18 +462,24 @@ class Project(object):
                 print(len(self.cluster.index))
                 self.model.time_step = pyo.RangeSet(len(self.cluster.index))
 
-            # Assign pyomo variables
+            # Assign pyomo variables and parameters
+            if mutable_prices:
+                self._add_price_params(self.model)
             bld = self.building_list[0]
-            bld.add_vars(self.model)
+            with profile_block(self.model, bld.name, 'add_vars',
+                               level='building'):
+                bld.add_vars(self.model)
 
             # Add pyomo constraints to model
-            bld.add_cons(self.model, self.environment, self.cluster)
+            with profile_block(self.model, bld.name, 'add_cons',
+                               level='building'):
+                bld.add_cons(self.model, self.environment, self.cluster)
 
             # Add pyomo objective
-            bld_annual_cost = self.model.find_component('annual_cost_' +
-                                                        bld.name)
-            bld_operation_cost = self.model.find_component(
-                'operation_cost_' + bld.name)
+            bld_annual_cost = self.model.registry.annual_cost(self.model,
+                                                              bld.name)
+            bld_operation_cost = self.model.registry.get(
+                self.model, bld.name, 'operation_cost')
 
             # If objective is annual cost, the components size should be
             # given in range, so that the dimensioning could be made. If
@@ -194,6 +504,7 @@ class Project(object):
             # which is not tested yet.
             self.model = pyo.AbstractModel(self.name)
             self.model.cons = pyo.ConstraintList()
+            self.model.registry = VarRegistry()
 
             self.model.elec_price = pyo.Param(within=pyo.PositiveReals)
 
@@ -209,10 +520,10 @@ class Project(object):
             bld.add_vars(self.model)
 
             # Add pyomo objective
-            bld_annual_cost = self.model.find_component('annual_cost_' +
-                                                        bld.name)
-            bld_operation_cost = self.model.find_component(
-                'operation_cost_' + bld.name)
+            bld_annual_cost = self.model.registry.annual_cost(self.model,
+                                                              bld.name)
+            bld_operation_cost = self.model.registry.get(
+                self.model, bld.name, 'operation_cost')
 
             # If objective is annual cost, the components size should be
             # given in range, so that the dimensioning could be made. If
@@ -238,12 +549,226 @@ class Project(object):
             # AbstractModel in this scenario. The constraints should be added
             # into the instance instead of the AbstractModel.
             # bld.add_cons(self.model, self.environment, self.cluster)
+        elif self.typ == 'building':
+            raise NotImplementedError(
+                'The model of several buildings is not developed, since the '
+                'components, energy flows and building variables are not '
+                'distinguished by the building in the model. Build the '
+                'project of each building from building_projects, which '
+                'share the typical periods of time_cluster.')
         else:
             print("Other project application scenario haven't been developed")
 
+    def building_projects(self):
+        """
+        Return a project for each building, which contains only this
+        building and shares the environment and the typical periods of this
+        project. The buildings of a project are clustered together with
+        time_cluster, but the model could only be built for a single
+        building, so each returned project is built and solved on its own.
+        """
+        projects = []
+        for bld in self.building_list:
+            project = Project(self.name + '_' + bld.name, self.typ)
+            project.add_environment(self.environment)
+            project.add_building(bld)
+            project.solver_profile = self.solver_profile
+            project.cluster = self.cluster
+            project.cluster_info = self.cluster_info
+            projects.append(project)
+        return projects
+
+    def _add_price_params(self, model):
+        """The scalar prices in environment are added as mutable parameters,
+        which could be changed with update_parameters. The prices given as
+        profile are kept as they are."""
+        for key in price_params:
+            value = getattr(self.environment, key, None)
+            if isinstance(value, (int, float)):
+                model.registry.add(model, 'env', key,
+                                   pyo.Param(initialize=value, mutable=True))
+
+    def update_parameters(self, prices=None, demand_profiles=None,
+                          temp_profile=None, irr_profile=None):
+        """
+        Update the parameters of the built pyomo model, so that the model
+        could be solved again with run_optimization without rebuilding it.
+        prices: dict with the price name in environment as key, e.g.
+            {'elec_price': 0.3, 'gas_price': 0.1}. The prices are only
+            updated in the model, if it is built with mutable_prices=True.
+        demand_profiles: dict with the keys 'heat_demand', 'elec_demand' or
+            'hot_water_demand', the profiles are given to the consumptions
+            of all buildings.
+        temp_profile, irr_profile: the weather profiles for heat pumps and
+            solar components.
+        Attention! The profiles should have the same length as the time steps
+        in model, for clustered model the clustered profiles should be given.
+        """
+        if not isinstance(self.model, pyo.ConcreteModel):
+            raise NotImplementedError('The parameters could only be updated '
+                                      'for pyomo ConcreteModel, the matrix '
+                                      'model should be built again.')
+        registry = self.model.registry
+
+        if prices is not None:
+            for key, value in prices.items():
+                setattr(self.environment, key, value)
+                if registry.has('env', key):
+                    registry.get(self.model, 'env', key).set_value(value)
+                else:
+                    warn('The price ' + key + ' is not a parameter in the '
+                         'model, it is only updated in environment. Build '
+                         'the model with mutable_prices=True to update it.')
+
+        profiles = {}
+        if demand_profiles is not None:
+            for comp_type, demand in consumption_demands.items():
+                if demand in demand_profiles:
+                    profiles[comp_type] = {'consum_profile':
+                                           demand_profiles[demand]}
+        if temp_profile is not None:
+            self.environment.temp_profile = temp_profile
+        if irr_profile is not None:
+            self.environment.irr_profile = irr_profile
+
+        for bld in self.building_list:
+            for comp in bld.components.values():
+                kwargs = dict(profiles.get(comp.component_type, {}))
+                if temp_profile is not None and hasattr(comp, 'temp_profile'):
+                    kwargs['temp_profile'] = temp_profile
+                if irr_profile is not None and hasattr(comp, 'irr_profile'):
+                    kwargs['irr_profile'] = irr_profile
+                if len(kwargs) > 0:
+                    comp.update_profile(**kwargs)
+                    comp.update_parameters(self.model)
+
+    def rebuild_component(self, comp_name):
+        """
+        Rebuild a single component in the built pyomo model after its
+        attributes are changed, e.g. with change_cost_model,
+        set_min_part_load or new min_size and max_size. The other parts of
+        the model are kept, so it is much faster than build_model.
+        """
+        if not isinstance(self.model, pyo.ConcreteModel):
+            raise NotImplementedError('Only the components in pyomo '
+                                      'ConcreteModel could be rebuilt, the '
+                                      'matrix model should be built again.')
+        for bld in self.building_list:
+            if comp_name in bld.components:
+                bld.components[comp_name].rebuild(self.model)
+                if self.solver is not None:
+                    self.solver.reset()
+                return
+        warn("Can't find the component " + comp_name + ' in buildings.')
+
+    def _build_matrix_model(self, obj_typ='annual_cost', fix_profile=True):
+        if self.typ != 'building' or len(self.building_list) != 1:
+            raise NotImplementedError('The matrix model is only developed for '
+                                      'a single building.')
+        if self.cluster is None:
+            self.model = MatrixModel(self.name, self.environment.time_step)
+        else:
+            self.model = MatrixModel(self.name, len(self.cluster.index))
+        self.model.registry = VarRegistry()
+        self.model.fix_profile = fix_profile
+
+        bld = self.building_list[0]
+        bld.add_matrix_vars(self.model)
+        bld.add_matrix_cons(self.model, self.environment, self.cluster)
+
+        if obj_typ == 'annual_cost':
+            self.model.set_objective(
+                self.model.registry.annual_cost(self.model, bld.name))
+        elif obj_typ == 'operation_cost':
+            self.model.set_objective(self.model.registry.get(
+                self.model, bld.name, 'operation_cost'))
+        else:
+            warn('The obj_typ is not allowed. The allowed typ is '
+                 'annual_cost or operation_cost')
+
     def run_optimization(self, solver_name='gurobi', save_lp=False,
-                         save_result=False, instance=None):
+                         save_result=False, instance=None, persistent=False,
+                         solver_profile=None, solver_options=None,
+                         race=False, warmstart=False,
+                         initial_dispatch=False, checkpoint=False,
+                         resume=False, mode='milp', tighten_bounds=False,
+                         hull=None, cache_solution=False,
+                         telemetry=False):
         """
+        solver_name: the name of the solver or a list of solver names for
+        the race.
+        save_lp: if True, the model is saved as model.lp with compact labels
+        and the names of the labels in model_labels.csv, see
+        utils/model_writer.py.
+        solver_profile: the name of the performance profile, e.g.
+        'fast-screening', 'design-quality' or 'operation-only', which is
+        translated into the options of the solver, see
+        utils/solver_options.py. If None, self.solver_profile of the project
+        is used.
+        solver_options: dict of solver specific options, which overwrite the
+        options from the profile.
+        The matrix model (build_model with backend='matrix') is solved with
+        HiGHS, only save_lp, save_result, solver_profile (mip gap and time
+        limit) and solver_options (HiGHS options) are used, the other options
+        are ignored with a warning.
+        persistent: if True, the model is kept loaded in a persistent solver
+        (self.solver), so that the following calls only send the changes
+        after update_parameters or rebuild_component to the solver and warm
+        start from the last solution. If the solver is not available as
+        persistent solver, HiGHS or CBC is used, see PersistentSolver.
+        race: if True, the model is solved with all solvers in solver_name in
+        parallel processes and the first solver, which proves optimality,
+        wins, see SolverRace. The results are saved in self.race_results and
+        appended to data/opt_output/race_log.csv with the topology of the
+        buildings, if save_lp or save_result is True.
+        warmstart: if True, the cached solution of the same topology with the
+        nearest prices and component sizes is given to the solver as start,
+        see SolutionCache. The solutions are cached after each run with
+        warmstart or cache_solution. The used solution and the objective and
+        solve time compared with the cached run are saved in
+        self.warmstart_info.
+        cache_solution: if True, the solution is stored in the solution
+        cache for the warm start of the following runs, also without
+        warmstart.
+        initial_dispatch: if True or a dict with candidate sizes of the heat
+        generators, a rule based dispatch in merit order gives the sizes and
+        part load states, the rest of the solution is completed by solving
+        the model with the fixed decisions within a short time limit. The
+        solution is given to the solver as start, see InitialDispatch. The
+        sizes, the unserved heat and electricity, the objective and the time
+        of the completion are saved in self.dispatch_info.
+        telemetry: if True, the solver log is captured and parsed into
+        presolve reductions, root bound, the progress of incumbent, bound and
+        gap over time, nodes and termination, see SolverTelemetry. The data
+        is saved in self.telemetry and as telemetry.json next to result.csv,
+        if save_lp or save_result is True. The telemetry is also captured
+        with checkpoint, which saves the final bound and gap.
+        checkpoint: if True, each improved incumbent is written into
+        data/opt_output/<project name>/checkpoint during the solve, see
+        Checkpoint. The model is solved with the persistent solver, the
+        incumbents are received with the callbacks of HiGHS and Gurobi.
+        resume: if True, the last incumbent in the checkpoint is given to the
+        solver as start, e.g. after the run was interrupted.
+        mode: 'milp' or 'relaxed'. In the relaxed mode all binary and
+        integer variables are relaxed and the LP is solved, which gives a
+        lower bound of the objective for screening, see utils/relaxation.py.
+        The bound, the relaxed sizes of the components and the solve time
+        are saved in self.relaxation_info, the results are saved as
+        relaxed_result.csv in the format of result.csv. The relaxed
+        solutions are not cached or checkpointed.
+        tighten_bounds: if True, the bounds of the variables are inferred
+        from the maximal sizes, e2p ratios, peak demands and cost
+        coefficients before the gdp transformation, so that the big-Ms are
+        small, see utils/bound_tightening.py. The big-Ms are only valid for
+        the current parameters, after update_parameters with larger demands
+        the model should be built again.
+        hull: the disjunctions, which are transformed with gdp.hull instead
+        of gdp.bigm. A list of names of disjunctions or components (all
+        disjunctions created by the component and its subsidies) or True for
+        all disjunctions. The hull gives a tighter relaxation with more
+        variables and constraints, the variables in the disjuncts should
+        have finite bounds, so it should be used with tighten_bounds.
+
         solver.options['Heuristics'] = 0.05
         solver.options['MIPGap'] = 0.01
         solver.options['ImproveStartGap'] = 0.04
@@ -255,6 +780,16 @@ class Project(object):
         solvers:
         glpk(bad for milp), cbc(good for milp), gurobi: linear, ipopt: nonlinear
         """
+        if mode not in ['milp', 'relaxed']:
+            raise ValueError('The mode ' + str(mode) + ' is not allowed, '
+                             'the allowed modes are milp and relaxed.')
+        relaxed = mode == 'relaxed'
+        if relaxed and (warmstart or initial_dispatch or checkpoint or
+                        resume):
+            warn('The warm start, initial dispatch and checkpoint are not '
+                 'used in the relaxed mode.')
+            warmstart = initial_dispatch = checkpoint = resume = False
+
         if save_lp or save_result:
             if not os.path.exists(os.path.join(base_path, 'data',
                                                'opt_output')):
@@ -273,17 +808,314 @@ class Project(object):
             model = self.model
         else:
             model = instance
+
+        if solver_profile is None:
+            solver_profile = self.solver_profile
+
+        if isinstance(model, MatrixModel):
+            unsupported = {'relaxed': relaxed, 'persistent': persistent,
+                           'race': race, 'warmstart': warmstart,
+                           'initial_dispatch': initial_dispatch,
+                           'checkpoint': checkpoint, 'resume': resume,
+                           'tighten_bounds': tighten_bounds, 'hull': hull,
+                           'cache_solution': cache_solution,
+                           'telemetry': telemetry}
+            unsupported = [key for key, value in unsupported.items() if value]
+            if unsupported:
+                warn('The options ' + ', '.join(unsupported) + ' are not '
+                     'supported for the matrix model and are ignored, the '
+                     'MILP is solved with HiGHS.')
+            self._run_matrix_optimization(model, solver_name, save_lp,
+                                          save_result, solver_profile,
+                                          solver_options)
+            return
         # The following transformation could be used for pyomo gdp model.
         # This makes no influence for existing MILP model.
-        pyo.TransformationFactory('gdp.bigm').apply_to(model)
-        # pyo.TransformationFactory('gdp.hull').apply_to(model)
+        saved_bounds = None
+        if tighten_bounds:
+            with profile_block(model, 'infer_bounds', 'transformation',
+                               level='transformation'):
+                saved_bounds = infer_bounds(model)
+        if hull:
+            with profile_block(model, 'gdp.hull', 'transformation',
+                               level='transformation'):
+                targets = self._hull_targets(model, hull)
+                if targets:
+                    pyo.TransformationFactory('gdp.hull').apply_to(
+                        model, targets=targets)
+        with profile_block(model, 'gdp.bigm', 'transformation',
+                           level='transformation'):
+            pyo.TransformationFactory('gdp.bigm').apply_to(model)
+        if saved_bounds is not None:
+            # The big-Ms are derived from the tight bounds, the original
+            # bounds are kept in the model for the following parameter
+            # updates.
+            restore_bounds(saved_bounds)
+        profiler = getattr(model, 'profiler', None)
+        if profiler is not None:
+            profiler.stop()
+        relaxed_vars = relax_integer_vars(model) if relaxed else []
+        if warmstart:
+            self._load_warmstart(model)
+        solution_checkpoint = None
+        resumed = False
+        if checkpoint or resume:
+            solution_checkpoint = Checkpoint(os.path.join(
+                base_path, 'data', 'opt_output', self.name, 'checkpoint'))
+        if resume:
+            if solution_checkpoint.exists():
+                solution_checkpoint.load(model)
+                resumed = True
+            else:
+                warn('No checkpoint is found for the project ' + self.name +
+                     ', the model is solved from the beginning.')
+        if checkpoint:
+            persistent = True
+            telemetry = True
+        seeded = False
+        if initial_dispatch:
+            seeded = self._seed_dispatch(
+                model, solver_name, solver_profile, solver_options,
+                initial_dispatch if isinstance(initial_dispatch, dict)
+                else None)
+        start = time.perf_counter()
+        if race:
+            if isinstance(solver_name, str):
+                solver_name = [solver_name]
+            solver_race = SolverRace(solver_name, solver_profile,
+                                     solver_options)
+            # The lp file of save_lp is written once and read by the
+            # solvers.
+            model_infeas = solver_race.run(model, lp_path=os.path.join(
+                base_path, 'data', 'opt_output', self.name, 'model.lp')
+                if save_lp else None)
+            self.race_results = solver_race.results
+            if save_lp or save_result:
+                self._save_race_log(solver_race.results)
+        else:
+            solver_telemetry = SolverTelemetry(
+                solver_name, get_profile(solver_profile).get('time_limit'))
+            with solver_telemetry.capture() if telemetry else nullcontext():
+                if persistent:
+                    if self.solver is None or self.solver.model is not model:
+                        self.solver = PersistentSolver(
+                            model, solver_name, solver_profile,
+                            solver_options, tee=True)
+                    if checkpoint:
+                        self.solver.set_checkpoint(solution_checkpoint)
+                    results = self.solver.solve(
+                        model, warmstart=warmstart or seeded or resumed)
+                    model_infeas = self.solver.infeasible(results)
+                else:
+                    model_infeas = self._solve(
+                        model, solver_name, solver_profile, solver_options,
+                        warmstart or seeded or resumed)
+            self.telemetry = None
+            if telemetry:
+                self.telemetry = solver_telemetry.parse()
+                if save_lp or save_result:
+                    solver_telemetry.save(os.path.join(
+                        base_path, 'data', 'opt_output', self.name,
+                        'telemetry.json'))
+        solve_time = time.perf_counter() - start
+        if relaxed:
+            restore_integer_vars(relaxed_vars)
+            self.relaxation_info = self._relaxation_info(
+                model, model_infeas, solve_time, len(relaxed_vars))
+        if checkpoint and not model_infeas:
+            # The gap in telemetry is given in percent.
+            telemetry_data = self.telemetry or {}
+            gap = telemetry_data.get('gap')
+            solution_checkpoint.save(
+                model, objective=pyo.value(model.obj),
+                bound=telemetry_data.get('bound'),
+                gap=None if gap is None else gap / 100,
+                solve_time=solve_time, finished=True)
+
+        if (cache_solution or warmstart) and not model_infeas and not relaxed:
+            if self.warmstart_info is not None and warmstart:
+                self.warmstart_info['time'] = solve_time
+                self.warmstart_info['objective'] = pyo.value(model.obj)
+            self.solution_cache.store(model, self.name, self._cache_params(),
+                                      solve_time)
+
+        # Save model in lp file, this only works with linear model. That is
+        # not necessary. The file is written once with compact labels, the
+        # names are saved in model_labels.csv, which is also used to turn
+        # the ilp file of gurobi into a readable file, see
+        # utils/interprete_gurobi_iis.py.
+        if save_lp and not race:
+            model_output_path = os.path.join(base_path, 'data',
+                                             'opt_output', self.name,
+                                             'model.lp')
+            write_model(model, model_output_path)
+
+        # Save results in csv file.
+        if save_result and not model_infeas:
+            result_output_path = os.path.join(
+                base_path, 'data', 'opt_output', self.name,
+                'relaxed_result.csv' if relaxed else 'result.csv')
+
+            # Get results for all variable.
+            var_list = []
+            value_list = []
+            for v in model.component_objects(pyo.Var, active=True):
+                var_list += [v.name + '[' + str(nr) + ']' for nr in list(v)]
+                value_list += list(v[:].value)
+            # The variables substituted by expressions (see fix_profile in
+            # build_model) are saved in the same way as variables.
+            for e in model.component_objects(pyo.Expression, active=True):
+                var_list += [e.name + '[' + str(nr) + ']' for nr in list(e)]
+                value_list += [pyo.value(e[nr]) for nr in e]
+            result_df = pd.DataFrame(list(zip(var_list, value_list)),
+                                     columns=['var', 'value'])
+            result_df.to_csv(result_output_path)
+
+        if (save_lp or save_result) and profiler is not None:
+            profiler.save(os.path.join(base_path, 'data', 'opt_output',
+                                       self.name, 'build_profile'))
+
+    @staticmethod
+    def _hull_targets(model, hull):
+        """Return the not transformed disjunctions for gdp.hull."""
+        if hull is True:
+            return [disjunction for disjunction in model.component_objects(
+                Disjunction, active=True)]
+        registry = get_registry(model)
+        targets = []
+        for name in hull:
+            component = model.find_component(name)
+            if component is not None and component.ctype is Disjunction:
+                targets.append(component)
+                continue
+            # The disjunctions created by the component in add_cons and the
+            # part load disjunction.
+            names = registry.created.get(name, {}).get('names', []) + \
+                [registry.full_name(name, key) for key in
+                 registry.owners.get(name, {})]
+            found = [model.find_component(item) for item in names]
+            found = [item for item in found if item is not None and
+                     item.ctype is Disjunction]
+            if not found:
+                warn('No disjunction is found for ' + name + ' in hull.')
+            targets += found
+        return [target for target in targets if target.active]
+
+    def _relaxation_info(self, model, model_infeas, solve_time,
+                         nr_relaxed):
+        """The lower bound of the objective and the relaxed sizes of the
+        components in all buildings."""
+        sizes = {}
+        if not model_infeas:
+            for bld in self.building_list:
+                for comp in bld.components.values():
+                    if model.registry.has(comp.name, 'size'):
+                        sizes[comp.name] = pyo.value(
+                            model.registry.size(model, comp.name),
+                            exception=False)
+        return {'bound': None if model_infeas else pyo.value(model.obj),
+                'sizes': sizes, 'time': solve_time,
+                'relaxed_vars': nr_relaxed}
+
+    def _save_race_log(self, race_results):
+        """Append the results of the race to the race log of all projects.
+        The topology is given as the sorted component types of each
+        building."""
+        log_path = os.path.join(base_path, 'data', 'opt_output',
+                                'race_log.csv')
+        topology = ';'.join(
+            '+'.join(sorted(set(bld.topology['comp_type'])))
+            for bld in self.building_list if bld.topology is not None)
+        log_df = race_results.copy()
+        log_df.insert(0, 'project', self.name)
+        log_df.insert(1, 'topology', topology)
+        log_df.to_csv(log_path, mode='a', index=False,
+                      header=not os.path.exists(log_path))
+
+    def _cache_params(self):
+        """The parameters of the run, which are compared to find the nearest
+        cached solution: the prices in environment (the mean for profiles)
+        and the sizes of all components."""
+        params = {}
+        for key in price_params:
+            value = getattr(self.environment, key, None)
+            if value is not None:
+                params[key] = float(pd.Series(value).mean())
+        for bld in self.building_list:
+            for comp in bld.components.values():
+                for size in ['min_size', 'max_size', 'current_size']:
+                    params[comp.name + '_' + size] = float(getattr(comp, size))
+        return params
+
+    def _load_warmstart(self, model):
+        """Load the nearest cached solution into the model as start."""
+        self.warmstart_info = None
+        entry, distance = self.solution_cache.nearest(model,
+                                                      self._cache_params())
+        if entry is None:
+            warn('No cached solution is found for the topology, the model '
+                 'is solved without warm start.')
+            return
+        count = self.solution_cache.load(model, entry)
+        self.warmstart_info = {
+            'project': entry['project'], 'file': entry['file'],
+            'distance': distance, 'values': count,
+            'cached_objective': entry['objective'],
+            'cached_time': entry['time'], 'time': None, 'objective': None}
+
+    def _seed_dispatch(self, model, solver_name, solver_profile,
+                       solver_options, sizes=None):
+        """Dispatch the heat generators with InitialDispatch and complete the
+        solution with the fixed sizes and part load states. Return True, if
+        a feasible solution is loaded into the model."""
+        self.dispatch_info = None
+        if self.typ != 'building' or len(self.building_list) != 1:
+            warn('The initial dispatch is only developed for a single '
+                 'building.')
+            return False
+        start = time.perf_counter()
+        dispatch = InitialDispatch(self.building_list[0], sizes)
+        dispatch.run(model.time_step)
+        fixed = dispatch.fix(model)
+        dispatch_time = time.perf_counter() - start
+        # Only a few binaries of storages and solar components are left, the
+        # first solution is good enough as start. The completion is stopped
+        # after a short time, so that the seed is not slower than a cold
+        # solve.
+        settings = get_profile(solver_profile)
+        settings['mip_gap'] = 1
+        settings['time_limit'] = min(settings.get('time_limit') or
+                                     completion_time_limit,
+                                     completion_time_limit)
+        infeas = self._solve(model, solver_name, settings, solver_options)
+        for var in fixed:
+            var.unfix()
+        # No solution is loaded, if the time limit is reached before the
+        # first solution.
+        if not infeas and pyo.value(model.obj, exception=False) is None:
+            infeas = True
+        self.dispatch_info = {
+            'sizes': dispatch.sizes, 'unserved': dispatch.unserved,
+            'feasible': not infeas, 'dispatch_time': dispatch_time,
+            'time': time.perf_counter() - start,
+            'objective': None if infeas else pyo.value(model.obj)}
+        if infeas:
+            warn('The initial dispatch is infeasible or not completed within '
+                 + str(completion_time_limit) + ' s, the model is solved '
+                 'without start.')
+        return not infeas
+
+    @staticmethod
+    def _solve(model, solver_name, solver_profile='default',
+               solver_options=None, warmstart=False):
+        """Solve the model with a new solver. Return True, if the model is
+        infeasible."""
         solver = pyo.SolverFactory(solver_name)
         # Attention! The option for solver could be set before solving the
-        # model. The following options are for gurobi solver and could be
-        # used for most scenarios.
-        solver.options['NonConvex'] = 2
-        solver.options['MIPGap'] = 0.01
-        solver.options['TimeLimit'] = 90000
+        # model. The options are translated from the profile into the option
+        # names of the solver, e.g. MIPGap and TimeLimit for gurobi.
+        solver.options.update(get_solver_options(solver_name, solver_profile,
+                                                 solver_options))
 
         # solver.options['Heuristics'] = 0.001
 
@@ -296,43 +1128,58 @@ class Project(object):
         #                                      'iis.ilp')
         # solver.options['ResultFile'] = iis_model_output_path
 
-        results = solver.solve(model, tee=True)
+        if warmstart and getattr(solver, 'warm_start_capable',
+                                 lambda: False)():
+            results = solver.solve(model, tee=True, warmstart=True)
+        else:
+            if warmstart:
+                warn('The solver ' + solver_name + ' does not support warm '
+                     'start, the cached solution is not used.')
+            results = solver.solve(model, tee=True)
 
         if (results.solver.termination_condition ==
                 pyo.TerminationCondition.infeasible):
             model_infeas = True
         else:
             model_infeas = False
+        return model_infeas
+
+    def _run_matrix_optimization(self, model, solver_name, save_lp,
+                                 save_result, solver_profile='default',
+                                 solver_options=None):
+        """The matrix model is solved with HiGHS, the solver_name could be
+        'scipy' or 'highs' (or a pyomo interface of HiGHS like appsi_highs).
+        The other solvers are replaced by scipy with a warning. The status
+        is saved in model.status, the results are saved in the same format
+        as the results of pyomo model."""
+        if isinstance(solver_name, list):
+            solver_name = solver_name[0]
+        if get_solver_family(solver_name) == 'highs':
+            solver_name = 'highs'
+        elif solver_name not in ['scipy', 'highs']:
+            warn('The solver ' + str(solver_name) + ' is not available for '
+                 'the matrix model, HiGHS in scipy is used.')
+            solver_name = 'scipy'
+        settings = get_profile(solver_profile)
+        model.solve(solver_name, mip_gap=settings.get('mip_gap'),
+                    time_limit=settings.get('time_limit'), tee=True,
+                    options=solver_options)
 
-        # Save model in lp file, this only works with linear model. That is
-        # not necessary.
         if save_lp:
             model_output_path = os.path.join(base_path, 'data',
                                              'opt_output', self.name,
                                              'model.lp')
-            model.write(model_output_path,
-                        io_options={'symbolic_solver_labels': True})
-            if model_infeas:
-                # save raw model to turn ilp file to a readable file with label.
-                raw_model_output_path = os.path.join(base_path, 'data',
-                                                     'opt_output',
-                                                     self.name,
-                                                     'raw_model.lp')
-                model.write(raw_model_output_path,
-                            io_options={'symbolic_solver_labels': False})
+            model.write(model_output_path)
 
-        # Save results in csv file.
-        if save_result and not model_infeas:
+        if save_result and model.solution is not None:
             result_output_path = os.path.join(base_path, 'data',
                                               'opt_output', self.name,
                                               'result.csv')
+            model.to_dataframe().to_csv(result_output_path)
 
-            # Get results for all variable.
-            var_list = []
-            value_list = []
-            for v in model.component_objects(pyo.Var, active=True):
-                var_list += [v.name + '[' + str(nr) + ']' for nr in list(v)]
-                value_list += list(v[:].value)
-            result_df = pd.DataFrame(list(zip(var_list, value_list)),
-                                     columns=['var', 'value'])
-            result_df.to_csv(result_output_path)
+
+def _match_columns(name, columns):
+    """The clustered profiles for the name of a profile, e.g. the heat demand
+    of all buildings for 'heat_demand', see Project.time_cluster."""
+    return [column for column in columns if column == name or
+            column.endswith('.' + name)]
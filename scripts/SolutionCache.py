@@ -0,0 +1,209 @@
+"""
+The solution cache stores the values of all variables of solved models, so
+that a following run with the same topology and slightly changed parameters,
+e.g. other prices or one changed component bound, could start from the
+cached solution. The solutions are grouped by the fingerprint of the model,
+which is built from the names and lengths of the variables, so only the
+models with exactly the same variables share their solutions. In each group
+the solution with the nearest parameters is used as start. The least recently
+used solutions are removed, if the size of the cache exceeds the limit, like
+in ClusterCache.
+"""
+
+import os
+import json
+import time
+import hashlib
+import pandas as pd
+import pyomo.environ as pyo
+from pyomo.gdp import Disjunct
+
+# The maximal size of all cached solutions in byte. The solution of a
+# building with 15 typical days needs about 0.5 MB, with 8760 hours about
+# 20 MB.
+default_max_size = 200 * 1024 ** 2
+
+
+class SolutionCache(object):
+    """
+    The cache folder contains one sub folder for each fingerprint with the
+    file index.json and one csv file for each solution. The csv files have
+    the same format as result.csv of Project.run_optimization, but they
+    contain also the binary variables of the disjunctions. The index records
+    the size and the time of the last use of each solution.
+    """
+
+    def __init__(self, path, max_size=default_max_size):
+        self.path = path
+        self.max_size = max_size
+
+    def fingerprint(self, model):
+        """Return the hash of the names and lengths of the variables."""
+        structure = sorted([v.name, len(v)] for v in all_variables(model))
+        return hashlib.sha1(json.dumps(structure).encode()).hexdigest()[:16]
+
+    def _load_index(self, fingerprint):
+        index_path = os.path.join(self.path, fingerprint, 'index.json')
+        if not os.path.exists(index_path):
+            return []
+        with open(index_path) as f:
+            return json.load(f)
+
+    def _save_index(self, fingerprint, entries):
+        index_path = os.path.join(self.path, fingerprint, 'index.json')
+        with open(index_path + '.tmp', 'w') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(index_path + '.tmp', index_path)
+
+    def store(self, model, project_name, params, solve_time=None):
+        """
+        Store the current values of the variables in the model.
+        params: dict of the parameters of the run, e.g. prices and component
+            sizes, which are used to find the nearest solution.
+        solve_time: the time of the solve in second, which is compared with
+            the time of the runs with warm start.
+        """
+        fingerprint = self.fingerprint(model)
+        folder = os.path.join(self.path, fingerprint)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        entries = self._load_index(fingerprint)
+        # The file is named by the time of storing, so that the names of the
+        # removed solutions are not used again.
+        nr = time.time_ns() // 1000
+        while os.path.exists(os.path.join(folder, project_name + '_' +
+                                          str(nr) + '.csv')):
+            nr += 1
+        file_name = project_name + '_' + str(nr) + '.csv'
+        save_values(model, os.path.join(folder, file_name))
+
+        entries.append({'file': file_name, 'project': project_name,
+                        'params': params,
+                        'objective': _objective_value(model),
+                        'time': solve_time,
+                        'size': os.path.getsize(os.path.join(folder,
+                                                             file_name)),
+                        'last_used': time.time()})
+        self._save_index(fingerprint, entries)
+        self._evict(keep=(fingerprint, file_name))
+
+    def _evict(self, keep=None):
+        """Remove the least recently used solutions of all fingerprints,
+        until the cache is not larger than max_size."""
+        indexes = {fingerprint: self._load_index(fingerprint) for fingerprint
+                   in os.listdir(self.path) if
+                   os.path.isdir(os.path.join(self.path, fingerprint))}
+        cached = [(entry.get('last_used', 0), fingerprint, entry) for
+                  fingerprint, entries in indexes.items() for entry in
+                  entries]
+        total = sum(entry.get('size', 0) for _, _, entry in cached)
+        changed = set()
+        for _, fingerprint, entry in sorted(cached, key=lambda x: x[0]):
+            if total <= self.max_size:
+                break
+            if (fingerprint, entry['file']) == keep:
+                continue
+            total -= entry.get('size', 0)
+            indexes[fingerprint].remove(entry)
+            changed.add(fingerprint)
+            file_path = os.path.join(self.path, fingerprint, entry['file'])
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        for fingerprint in changed:
+            self._save_index(fingerprint, indexes[fingerprint])
+
+    def nearest(self, model, params):
+        """Return the index entry of the cached solution with the same
+        fingerprint and the nearest parameters and its distance, or
+        (None, None) if there is no solution for the model."""
+        entries = self._load_index(self.fingerprint(model))
+        if not entries:
+            return None, None
+        distances = [param_distance(params, entry['params'])
+                     for entry in entries]
+        nr = min(range(len(entries)), key=lambda i: distances[i])
+        return entries[nr], distances[nr]
+
+    def load(self, model, entry):
+        """Set the values of the cached solution as start values of the not
+        fixed variables. Returns the number of set values."""
+        fingerprint = self.fingerprint(model)
+        count = load_values(model, os.path.join(self.path, fingerprint,
+                                                entry['file']))
+        entries = self._load_index(fingerprint)
+        for item in entries:
+            if item['file'] == entry['file']:
+                item['last_used'] = time.time()
+        self._save_index(fingerprint, entries)
+        return count
+
+
+def all_variables(model):
+    """All variables of the model including the variables in the disjuncts,
+    which are deactivated by the gdp transformation. The references of the
+    transformation blocks are skipped."""
+    return [v for v in model.component_objects(
+        pyo.Var, active=None, descend_into=(pyo.Block, Disjunct))
+        if not v.is_reference()]
+
+
+def var_label(var):
+    """The label of the variable in the solution files, which is the same as
+    in result.csv."""
+    return var.parent_component().name + '[' + str(var.index()) + ']'
+
+
+def save_values(model, path, values=None):
+    """Save the values of all variables into the csv file in the format of
+    result.csv. values: dict with the labels and values, which are saved
+    instead of the current values in the model, e.g. the solution in a
+    callback of the solver."""
+    var_list = []
+    value_list = []
+    for v in all_variables(model):
+        for nr in v:
+            label = v.name + '[' + str(nr) + ']'
+            var_list.append(label)
+            value_list.append(v[nr].value if values is None else
+                              values.get(label, v[nr].value))
+    pd.DataFrame(list(zip(var_list, value_list)),
+                 columns=['var', 'value']).to_csv(path)
+
+
+def load_values(model, path):
+    """Set the values in the csv file as values of the not fixed variables.
+    The binary and integer values are rounded. Returns the number of set
+    values."""
+    result_df = pd.read_csv(path, index_col=0)
+    values = dict(zip(result_df['var'], result_df['value']))
+    count = 0
+    for v in all_variables(model):
+        for nr in v:
+            value = values.get(v.name + '[' + str(nr) + ']')
+            if value is None or pd.isna(value) or v[nr].fixed:
+                continue
+            if v[nr].is_integer() or v[nr].is_binary():
+                value = round(value)
+            v[nr].set_value(value, skip_validation=True)
+            count += 1
+    return count
+
+
+def param_distance(params, other):
+    """The sum of the relative differences of all parameters. A parameter,
+    which is only given in one of both, counts as difference 1."""
+    distance = 0
+    for key in set(params) | set(other):
+        if key not in params or key not in other:
+            distance += 1
+            continue
+        a, b = params[key], other[key]
+        if a != b:
+            distance += abs(a - b) / max(abs(a), abs(b))
+    return distance
+
+
+def _objective_value(model):
+    for obj in model.component_data_objects(pyo.Objective, active=True):
+        return pyo.value(obj, exception=False)
+    return None
@@ -0,0 +1,228 @@
+"""
+The solver race writes the model once as lp file with compact labels, see
+utils/model_writer.py, and solves it with several solvers in parallel
+processes. The available threads are split between the solvers. The first
+solver, which proves the optimality within the mip gap of the profile, wins
+and the other processes are stopped. If no solver proves the optimality
+within the time limit, the best solution wins. The results of all solvers
+are recorded, so that the fastest solver for each topology could be chosen
+as default later, see the race log in Project.run_optimization.
+"""
+
+import os
+import queue
+import shutil
+import tempfile
+import time
+import multiprocessing
+from warnings import warn
+import pandas as pd
+import pyomo.environ as pyo
+from utils.model_writer import write_model, set_values
+from utils.solver_options import get_profile, get_solver_family, \
+    get_solver_options
+
+
+class SolverRace(object):
+    """
+    After run, self.results contains one row for each solver with status,
+    objective, time and winner. The status is 'optimal', 'feasible' (time
+    limit reached with a solution), 'infeasible', 'stopped' (stopped after
+    another solver has won) or 'error'.
+    """
+
+    columns = ['solver', 'threads', 'status', 'objective', 'time', 'winner']
+
+    def __init__(self, solver_names, profile='default', options=None):
+        """
+        solver_names: list of solver names, e.g. ['highs', 'cbc', 'glpk'].
+        profile, options: the solver profile and the additional solver
+            options, see utils/solver_options.py. The threads of the profile
+            are replaced by the share of each solver.
+        """
+        self.solver_names = list(dict.fromkeys(solver_names))
+        self.profile = profile
+        self.options = options
+        self.threads = max(1, (os.cpu_count() or 1) //
+                           len(self.solver_names))
+        self.winner = None
+        self.results = pd.DataFrame(columns=self.columns)
+
+    def _get_options(self, solver_name):
+        settings = get_profile(self.profile)
+        settings['threads'] = self.threads
+        return get_solver_options(solver_name, settings, self.options)
+
+    def run(self, model, lp_path=None):
+        """
+        Solve the model with all solvers and load the solution of the winner
+        into the model. The gdp model should be transformed with gdp.bigm
+        before, see Project.run_optimization. Returns True, if no solver has
+        found a solution.
+        lp_path: if given, the lp file and its label map are written there
+            and kept, e.g. as model.lp of the project, otherwise they are
+            written into a temporary folder.
+        """
+        folder = None
+        if lp_path is None:
+            folder = tempfile.mkdtemp(prefix='race_')
+            lp_path = os.path.join(folder, 'model.lp')
+        try:
+            symbol_map = write_model(model, lp_path,
+                                     save_labels=folder is None)
+            outcomes = self._race(lp_path)
+        finally:
+            if folder is not None:
+                shutil.rmtree(folder, ignore_errors=True)
+
+        records = []
+        for name in self.solver_names:
+            outcome = outcomes[name]
+            records.append({'solver': name, 'threads': self.threads,
+                            'status': outcome['status'],
+                            'objective': outcome['objective'],
+                            'time': outcome['time'],
+                            'winner': name == self.winner})
+        self.results = pd.DataFrame(records, columns=self.columns)
+
+        if self.winner is None:
+            return True
+        set_values(symbol_map, outcomes[self.winner]['values'])
+        return False
+
+    def _race(self, lp_path):
+        """Start one process for each solver and wait for the winner."""
+        result_queue = multiprocessing.Queue()
+        processes = {}
+        outcomes = {}
+        start = time.perf_counter()
+        for name in self.solver_names:
+            processes[name] = multiprocessing.Process(
+                target=_solve_lp, daemon=True,
+                args=(name, lp_path, self._get_options(name), result_queue))
+            processes[name].start()
+
+        # The processes get a short time after the time limit for writing
+        # the solution, then they are stopped.
+        time_limit = get_profile(self.profile).get('time_limit')
+        deadline = None if time_limit is None else start + time_limit + 60
+        while len(outcomes) < len(processes):
+            timeout = 1 if deadline is None else \
+                min(1, max(deadline - time.perf_counter(), 0))
+            try:
+                outcome = result_queue.get(timeout=timeout)
+            except queue.Empty:
+                for name, process in processes.items():
+                    # A process, which died without result, e.g. the solver
+                    # crashed.
+                    if name not in outcomes and not process.is_alive() and \
+                            process.exitcode != 0:
+                        outcomes[name] = _outcome('error',
+                                                  time.perf_counter() - start)
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                continue
+            outcome['time'] = time.perf_counter() - start
+            outcomes[outcome.pop('solver')] = outcome
+            if outcome['status'] == 'optimal':
+                break
+
+        for name, process in processes.items():
+            if process.is_alive():
+                process.terminate()
+            process.join()
+            if name not in outcomes:
+                outcomes[name] = _outcome('stopped',
+                                          time.perf_counter() - start)
+        result_queue.close()
+
+        optimal = [name for name in self.solver_names
+                   if outcomes[name]['status'] == 'optimal']
+        feasible = [name for name in self.solver_names if
+                    outcomes[name]['status'] == 'feasible' and
+                    outcomes[name]['objective'] is not None]
+        if optimal:
+            self.winner = optimal[0]
+        elif feasible:
+            # All objectives of the models in this project are minimized.
+            self.winner = min(feasible,
+                              key=lambda name: outcomes[name]['objective'])
+        else:
+            warn('No solver in the race has found a solution: ' +
+                 ', '.join(name + ' ' + outcomes[name]['status']
+                           for name in self.solver_names))
+        return outcomes
+
+
+def _outcome(status, duration=None, objective=None, values=None):
+    return {'status': status, 'time': duration, 'objective': objective,
+            'values': values or {}}
+
+
+def _solve_lp(solver_name, lp_path, options, result_queue):
+    """Solve the lp file in the process of the solver and put the status,
+    the objective and the values by variable name into the queue."""
+    try:
+        if get_solver_family(solver_name) == 'highs':
+            outcome = _solve_lp_highs(lp_path, options)
+        else:
+            outcome = _solve_lp_pyomo(solver_name, lp_path, options)
+    except Exception as error:
+        warn('The solver ' + solver_name + ' failed in the race: ' +
+             str(error))
+        outcome = _outcome('error')
+    outcome['solver'] = solver_name
+    result_queue.put(outcome)
+
+
+def _solve_lp_highs(lp_path, options):
+    """HiGHS is called with highspy, since the pyomo interfaces of HiGHS
+    could not read lp files."""
+    import highspy
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+    for name, value in options.items():
+        highs.setOptionValue(name, value)
+    highs.readModel(lp_path)
+    highs.run()
+    status = highs.getModelStatus()
+    info = highs.getInfo()
+    if status == highspy.HighsModelStatus.kOptimal:
+        status = 'optimal'
+    elif status == highspy.HighsModelStatus.kInfeasible:
+        status = 'infeasible'
+    elif info.primal_solution_status == 2:
+        status = 'feasible'
+    else:
+        return _outcome('no solution')
+    if status == 'infeasible':
+        return _outcome(status)
+    names = highs.getLp().col_names_
+    values = highs.getSolution().col_value
+    return _outcome(status, objective=info.objective_function_value,
+                    values=dict(zip(names, values)))
+
+
+def _solve_lp_pyomo(solver_name, lp_path, options):
+    """The other solvers read the lp file with the pyomo shell interfaces."""
+    solver = pyo.SolverFactory(solver_name)
+    if not solver.available(exception_flag=False):
+        return _outcome('not available')
+    solver.options.update(options)
+    results = solver.solve(lp_path)
+    condition = results.solver.termination_condition
+    if condition == pyo.TerminationCondition.optimal:
+        status = 'optimal'
+    elif condition in [pyo.TerminationCondition.infeasible,
+                       pyo.TerminationCondition.infeasibleOrUnbounded]:
+        return _outcome('infeasible')
+    elif len(results.solution) > 0:
+        status = 'feasible'
+    else:
+        return _outcome(str(condition))
+    solution = results.solution(0)
+    objective = [item['Value'] for item in solution.objective.values()]
+    values = {name: item['Value'] for name, item in
+              solution.variable.items()}
+    return _outcome(status, objective=objective[0] if objective else None,
+                    values=values)
@@ -0,0 +1,287 @@
+"""
+The solver telemetry captures the log of the solver, which is streamed to
+stdout with tee=True, and parses it into structured data: the reductions of
+presolve, the bound of the root relaxation, the incumbent, bound and gap
+over time, the number of nodes and the termination. The log formats of
+HiGHS, Gurobi, CBC and GLPK are supported. The data is saved as
+telemetry.json next to result.csv, so that the convergence could be plotted
+and the projects, which need a longer time limit, could be found.
+"""
+
+import io
+import os
+import re
+import sys
+import json
+from contextlib import contextmanager
+from warnings import warn
+from pyomo.common.tee import capture_output, TeeStream
+from utils.solver_options import get_solver_family
+
+# The solvers, for which the missing parser is already warned.
+_unparsed_solvers = set()
+
+_number = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[-+]?inf'
+
+
+class SolverTelemetry(object):
+    """
+    The log is captured in the with block of capture and parsed with parse.
+    The parsed data is saved in self.data.
+    """
+
+    def __init__(self, solver_name, time_limit=None):
+        self.solver_name = solver_name
+        self.family = get_solver_family(solver_name)
+        self.time_limit = time_limit
+        self.log = ''
+        self.data = None
+
+    @contextmanager
+    def capture(self):
+        """Capture the output in the with block, the output is still shown
+        in stdout. The output of the solver libraries, which write directly
+        into the file descriptor (e.g. HiGHS and gurobipy), is also
+        captured."""
+        buffer = io.StringIO()
+        try:
+            # The output is written into a copy of the original stdout,
+            # since stdout itself is redirected into the capture.
+            stdout = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+            capture_fd = True
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            # For example in jupyter, there is no file descriptor.
+            stdout = sys.stdout
+            capture_fd = False
+        try:
+            with TeeStream(stdout, buffer) as tee:
+                with capture_output(tee.STDOUT, capture_fd=capture_fd):
+                    yield
+        finally:
+            if capture_fd:
+                stdout.close()
+            self.log = buffer.getvalue()
+
+    def parse(self):
+        """Parse the captured log and return the data as dict."""
+        parsers = {'highs': _parse_highs, 'gurobi': _parse_gurobi,
+                   'cbc': _parse_cbc, 'glpk': _parse_glpk}
+        self.data = {'solver': self.solver_name, 'termination': None,
+                     'presolve': {}, 'root_bound': None, 'progress': [],
+                     'nodes': None, 'solve_time': None}
+        if self.family in parsers:
+            parsers[self.family](self.log, self.data)
+        elif self.solver_name not in _unparsed_solvers:
+            # The warning is only given once for each solver.
+            _unparsed_solvers.add(self.solver_name)
+            warn('The log of solver ' + str(self.solver_name) + ' could not '
+                 'be parsed, the telemetry is empty.')
+        progress = self.data['progress']
+        last = progress[-1] if progress else {}
+        self.data['incumbent'] = last.get('incumbent')
+        self.data['bound'] = last.get('bound')
+        self.data['gap'] = last.get('gap')
+        self.data['time_limit'] = self.time_limit
+        # The projects, which stopped at the time limit, should be solved
+        # with a longer time limit.
+        self.data['time_limit_reached'] = \
+            self.data['termination'] == 'time limit'
+        return self.data
+
+    def save(self, path):
+        """Save the parsed data as json file."""
+        if self.data is None:
+            self.parse()
+        with open(path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+
+
+def _float(text):
+    """Convert the number in log into float, None for missing values."""
+    try:
+        return float(text.rstrip('%'))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _gap(incumbent, bound):
+    """The relative gap in percent, if the solver doesn't print it."""
+    if incumbent is None or bound is None:
+        return None
+    return abs(incumbent - bound) / max(abs(incumbent), 1e-10) * 100
+
+
+def _add_point(data, time, incumbent, bound, gap, nodes):
+    # The infinite values are saved as None, which is valid in json.
+    incumbent, bound, gap = [None if value is None or abs(value) ==
+                             float('inf') else value
+                             for value in [incumbent, bound, gap]]
+    if gap is None:
+        gap = _gap(incumbent, bound)
+    data['progress'].append({'time': time, 'incumbent': incumbent,
+                             'bound': bound, 'gap': gap, 'nodes': nodes})
+
+
+def _parse_highs(log, data):
+    reductions = re.search(r'[Rr]eductions: rows (\d+)\((-?\d+)\); columns '
+                           r'(\d+)\((-?\d+)\); (?:elements|nonzeros) (\d+)'
+                           r'\((-?\d+)\)', log)
+    if reductions:
+        values = [int(value) for value in reductions.groups()]
+        data['presolve'] = {'rows': values[0], 'rows_removed': -values[1],
+                            'columns': values[2],
+                            'columns_removed': -values[3],
+                            'nonzeros': values[4],
+                            'nonzeros_removed': -values[5]}
+    # The rows of the branch and bound table, e.g.
+    #  L   0   0   0   0.00%   2078.08   2639.71   21.28%   ...   33.2s
+    row = re.compile(r'^\s*[A-Za-z]?\s+(\d+)\s+\d+\s+\d+\s+[\d.]+%\s+(' +
+                     _number + r')\s+(' + _number + r')\s+(' + _number +
+                     r'|Large)%?\s.*?([\d.]+)s\s*$')
+    for line in log.splitlines():
+        match = row.match(line)
+        if match:
+            nodes, bound, incumbent, gap, time = match.groups()
+            _add_point(data, _float(time), _float(incumbent), _float(bound),
+                       _float(gap), int(nodes))
+    status = re.findall(r'Model\s+status\s*:?\s+(.+)|^\s*Status\s+(.+)$',
+                        log, re.M)
+    if status:
+        data['termination'] = _termination(''.join(status[-1]))
+    root = [point['bound'] for point in data['progress']
+            if point['nodes'] == 0 and point['bound'] is not None]
+    if root:
+        data['root_bound'] = root[-1]
+    nodes = re.findall(r'^\s*Nodes\s+(\d+)', log, re.M)
+    if nodes:
+        data['nodes'] = int(nodes[-1])
+    timing = re.findall(r'^\s*Timing\s+([\d.]+)', log, re.M)
+    if timing:
+        data['solve_time'] = float(timing[-1])
+
+
+def _parse_gurobi(log, data):
+    presolved = re.search(r'Presolved: (\d+) rows, (\d+) columns, (\d+) '
+                          r'nonzeros', log)
+    original = re.search(r'Optimize a model with (\d+) rows, (\d+) columns '
+                         r'and (\d+) nonzeros', log)
+    if presolved:
+        values = [int(value) for value in presolved.groups()]
+        data['presolve'] = {'rows': values[0], 'columns': values[1],
+                            'nonzeros': values[2]}
+        if original:
+            before = [int(value) for value in original.groups()]
+            data['presolve'].update({
+                'rows_removed': before[0] - values[0],
+                'columns_removed': before[1] - values[1],
+                'nonzeros_removed': before[2] - values[2]})
+    root = re.search(r'Root relaxation: objective (' + _number + ')', log)
+    if root:
+        data['root_bound'] = float(root.group(1))
+    # The rows of the node log end with incumbent, bound, gap, it/node and
+    # time, e.g. H    0     0     4753.1052 2014.77  57.6%     -    7s
+    row = re.compile(r'^[H* ]\s*(\d+)\+?\s+\d+\s.*?(' + _number + r'|-)\s+(' +
+                     _number + r')\s+([\d.]+%|-)\s+\S+\s+(\d+)s\s*$')
+    for line in log.splitlines():
+        match = row.match(line)
+        if match:
+            nodes, incumbent, bound, gap, time = match.groups()
+            _add_point(data, _float(time), _float(incumbent), _float(bound),
+                       _float(gap), int(nodes))
+    explored = re.search(r'Explored (\d+) nodes .* in ([\d.]+) seconds', log)
+    if explored:
+        data['nodes'] = int(explored.group(1))
+        data['solve_time'] = float(explored.group(2))
+    for pattern in ['Optimal solution found', 'Time limit reached',
+                    'Model is infeasible', 'Solution limit reached',
+                    'Interrupt request received']:
+        if pattern in log:
+            data['termination'] = _termination(pattern)
+
+
+def _parse_cbc(log, data):
+    processed = re.search(r'processed model has (\d+) rows, (\d+) columns '
+                          r'.*? and (\d+) elements', log)
+    if processed:
+        data['presolve'] = {'rows': int(processed.group(1)),
+                            'columns': int(processed.group(2)),
+                            'nonzeros': int(processed.group(3))}
+    root = re.search(r'Continuous objective value is (' + _number + ')', log)
+    if root:
+        data['root_bound'] = float(root.group(1))
+    bound = data['root_bound']
+    incumbent = None
+    for line in log.splitlines():
+        found = re.search(r'Integer solution of (' + _number + r') found .*? '
+                          r'(\d+) nodes \(([\d.]+) seconds\)', line)
+        after = re.search(r'After (\d+) nodes, \d+ on tree, (' + _number +
+                          r') best solution, best possible (' + _number +
+                          r') \(([\d.]+) seconds\)', line)
+        if found:
+            incumbent = float(found.group(1))
+            _add_point(data, float(found.group(3)), incumbent, bound, None,
+                       int(found.group(2)))
+        elif after:
+            # CBC prints 1e+50 as best solution, before a solution is found.
+            if float(after.group(2)) < 1e49:
+                incumbent = float(after.group(2))
+            bound = float(after.group(3))
+            _add_point(data, float(after.group(4)), incumbent, bound, None,
+                       int(after.group(1)))
+    result = re.search(r'Result - (.+)', log)
+    if result:
+        data['termination'] = _termination(result.group(1))
+    nodes = re.search(r'Enumerated nodes:\s+(\d+)', log)
+    if nodes:
+        data['nodes'] = int(nodes.group(1))
+    wall = re.search(r'Total time \(CPU seconds\):\s+([\d.]+)', log)
+    if wall:
+        data['solve_time'] = float(wall.group(1))
+
+
+def _parse_glpk(log, data):
+    # The size is printed for the original and the preprocessed problem.
+    sizes = re.findall(r'(\d+) rows, (\d+) columns, (\d+) non-zeros', log)
+    if sizes:
+        data['presolve'] = {'rows': int(sizes[-1][0]),
+                            'columns': int(sizes[-1][1]),
+                            'nonzeros': int(sizes[-1][2])}
+    # The lines of the branch and bound, e.g.
+    # +  1234: mip =   4.753105226e+03 >=   2.014769572e+03  57.6% (12; 0)
+    row = re.compile(r'^\+\s*\d+: mip =\s+(' + _number + r'|not found yet)'
+                     r'\s+[<>]=\s+(' + _number + r'|tree is empty)\s+'
+                     r'([\d.]+%|-*)\s+\((\d+);\s*(\d+)\)')
+    for line in log.splitlines():
+        match = row.match(line)
+        if match:
+            incumbent, bound, gap, active, done = match.groups()
+            _add_point(data, None, _float(incumbent), _float(bound),
+                       _float(gap), int(active) + int(done))
+    if data['progress']:
+        data['nodes'] = data['progress'][-1]['nodes']
+        bounds = [point['bound'] for point in data['progress']
+                  if point['bound'] is not None]
+        if bounds:
+            data['root_bound'] = bounds[0]
+    for pattern in ['INTEGER OPTIMAL SOLUTION FOUND', 'TIME LIMIT EXCEEDED',
+                    'PROBLEM HAS NO PRIMAL FEASIBLE SOLUTION',
+                    'PROBLEM HAS NO INTEGER FEASIBLE SOLUTION']:
+        if pattern in log:
+            data['termination'] = _termination(pattern)
+    used = re.search(r'Time used:\s+([\d.]+) secs', log)
+    if used:
+        data['solve_time'] = float(used.group(1))
+
+
+def _termination(text):
+    """Translate the termination message of the solver into 'optimal',
+    'time limit', 'infeasible' or the message in lower case."""
+    text = text.strip().lower()
+    if 'optimal' in text:
+        return 'optimal'
+    if 'time limit' in text or 'stopped on time' in text:
+        return 'time limit'
+    if 'infeasible' in text or 'no primal feasible' in text or \
+            'no integer feasible' in text:
+        return 'infeasible'
+    return text
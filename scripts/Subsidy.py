@@ -1,6 +1,7 @@
 import pyomo.environ as pyo
 from utils.get_subsidy import find_sub_rules
 from utils.calc_annuity_vdi2067 import calc_annuity
+from scripts.VarRegistry import get_registry
 
 
 class Subsidy(object):
@@ -33,9 +34,18 @@ class Subsidy(object):
         # The subsidy for PV in EEG is for generated energy, so the subsidies
         # is added to each time step.
         subsidy = pyo.Var(bounds=(0, 10e8))
-        model.add_component('subsidy_' + self.name + '_' + self.sbj_name,
-                            subsidy)
+        self._add_var(model, 'subsidy', subsidy)
 
         sub_annuity = pyo.Var(bounds=(0, 10e8))
-        model.add_component('sub_annuity_' + self.name + '_' + self.sbj_name,
-                            sub_annuity)
+        self._add_var(model, 'sub_annuity', sub_annuity)
+
+    def _add_var(self, model, key, var):
+        """The variables of subsidy are registered with the subject name as
+        owner, the key is extended with the subsidy name, for example
+        'subsidy_' + self.name."""
+        return get_registry(model).add(model, self.sbj_name,
+                                       key + '_' + self.name, var)
+
+    def _get_var(self, model, key):
+        return get_registry(model).get(model, self.sbj_name,
+                                       key + '_' + self.name)
@@ -0,0 +1,160 @@
+"""
+The variable registry keeps direct references to the pyomo variables, which
+are created by buildings, components and subsidies in their add_vars methods.
+The constraints could take the variables from the registry instead of
+searching them in the model with string-built names.
+"""
+
+import warnings
+from contextlib import contextmanager
+from pyomo.gdp import Disjunct, Disjunction
+
+
+class VarRegistry(object):
+    """
+    The registry is attached to the pyomo model as model.registry. The
+    variables are grouped by their owner, which is the name of the building,
+    the component or the subject of a subsidy. The key is the prefix of the
+    pyomo name, so the variable 'input_elec_heat_pump' is registered with
+    owner 'heat_pump' and key 'input_elec'. The energy flows between
+    components are registered separately with (energy type, source,
+    destination).
+    """
+
+    def __init__(self):
+        self.owners = {}
+        self.flows = {}
+        # The names of pyomo components and the indexes in model.cons, which
+        # are created by the owner in the blocks recorded with track.
+        self.created = {}
+
+    @staticmethod
+    def full_name(owner, key):
+        """The name of the pyomo component in the model. Components without
+        owner (for example the variables for bilevel model) only use the
+        key."""
+        if owner is None:
+            return key
+        return key + '_' + owner
+
+    def add(self, model, owner, key, component):
+        """Add the pyomo component into the model and register it."""
+        model.add_component(self.full_name(owner, key), component)
+        self.owners.setdefault(owner, {})[key] = component
+        return component
+
+    def add_flow(self, model, energy_type, source, destination, var):
+        """Add the variable for energy flow from source component to
+        destination component into the model and register it."""
+        model.add_component(energy_type + '_' + source + '_' + destination,
+                            var)
+        self.flows[(energy_type, source, destination)] = var
+        return var
+
+    def delete(self, model, owner, key):
+        """Remove the component from model and registry."""
+        component = model.find_component(self.full_name(owner, key))
+        if component is not None:
+            _deactivate_transformed(component)
+        model.del_component(self.full_name(owner, key))
+        if owner in self.owners:
+            self.owners[owner].pop(key, None)
+
+    @contextmanager
+    def track(self, model, owner):
+        """Record the pyomo components and the entries of model.cons, which
+        are added into the model inside the with block, as created by the
+        owner. They could be removed with remove_created."""
+        if not model.is_constructed():
+            # The AbstractModel for bilevel model is not tracked.
+            yield
+            return
+        names = set(model.component_map().keys())
+        cons = set(model.cons.keys())
+        yield
+        created = self.created.setdefault(owner, {'names': [], 'cons': []})
+        created['names'] += [name for name in model.component_map().keys()
+                             if name not in names]
+        created['cons'] += [index for index in model.cons.keys()
+                            if index not in cons]
+
+    def remove_created(self, model, owner):
+        """Delete the pyomo components and the entries of model.cons, which
+        are recorded for the owner, from model and registry. If the model is
+        already transformed with gdp.bigm, the transformed constraints of the
+        deleted disjunctions are deactivated, so that the new disjunctions
+        could be transformed again."""
+        created = self.created.pop(owner, {'names': [], 'cons': []})
+        registered = {self.full_name(owner, key): key for key in
+                      self.owners.get(owner, {})}
+        for name in created['names']:
+            if name in registered:
+                self.delete(model, owner, registered[name])
+            elif model.find_component(name) is not None:
+                _deactivate_transformed(model.find_component(name))
+                model.del_component(name)
+        for index in created['cons']:
+            if index in model.cons:
+                del model.cons[index]
+
+    def get(self, model, owner, key):
+        """Return the registered component. The lookup with name is only kept
+        as a compatibility shim for components, which are added into the
+        model without registry."""
+        try:
+            return self.owners[owner][key]
+        except KeyError:
+            component = model.find_component(self.full_name(owner, key))
+            if component is None:
+                warnings.warn("Can't find " + self.full_name(owner, key) +
+                              " in the model.")
+            return component
+
+    def has(self, owner, key):
+        return owner in self.owners and key in self.owners[owner]
+
+    def flow(self, model, energy_type, source, destination):
+        """Return the variable of energy flow between two components."""
+        try:
+            return self.flows[(energy_type, source, destination)]
+        except KeyError:
+            return model.find_component(energy_type + '_' + source + '_' +
+                                        destination)
+
+    # The following methods are the typed access for the most used variables.
+    def size(self, model, owner):
+        return self.get(model, owner, 'size')
+
+    def invest(self, model, owner):
+        return self.get(model, owner, 'invest')
+
+    def annual_cost(self, model, owner):
+        return self.get(model, owner, 'annual_cost')
+
+    def input(self, model, owner, energy_type):
+        return self.get(model, owner, 'input_' + energy_type)
+
+    def output(self, model, owner, energy_type):
+        return self.get(model, owner, 'output_' + energy_type)
+
+
+def get_registry(model):
+    """Return the registry of the model. If the model has no registry,
+    for example the model is built outside the Project, a new registry is
+    attached to it."""
+    if not hasattr(model, 'registry'):
+        model.registry = VarRegistry()
+    return model.registry
+
+
+def _deactivate_transformed(component):
+    """Deactivate the constraints, which are generated from the disjuncts and
+    disjunctions by the gdp transformation."""
+    # The variables of the matrix model have no ctype.
+    if getattr(component, 'ctype', None) not in [Disjunct, Disjunction]:
+        return
+    for data in component.values():
+        for item in [getattr(data, 'transformation_block', None),
+                     getattr(data, 'algebraic_constraint', None)]:
+            if item is not None:
+                item.deactivate()
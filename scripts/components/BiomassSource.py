@@ -20,3 +20,6 @@ class BiomassSource(Component):
         The Grid has "no" fixed input and therefore it should not be constrainted
         """
         pass
+
+    def _matrix_conver(self, model):
+        pass
@@ -2,6 +2,7 @@ import warnings
 import pyomo.environ as pyo
 from pyomo.gdp import Disjunct, Disjunction
 from scripts.Component import Component
+from scripts.VarRegistry import get_registry
 from utils.calc_annuity_vdi2067 import calc_annuity
 
 small_num = 0.0001
@@ -127,17 +128,18 @@ class CHP(Component):
         The sub model contains the products smaller than 50 kW, so a GDP
         model is used here.
         """
-        power_el = model.find_component('size_' + self.name)
-        power_th = model.find_component('therm_size_' + self.name)
+        power_el = self._get_var(model, 'size')
+        power_th = self._get_var(model, 'therm_size')
         if self.sub_model == "small":
             model.cons.add(power_th == 2.1178 * power_el + 2.5991)
         elif self.sub_model == "condensing":
             model.cons.add(power_el == 0.551 * power_th - 1.7544)
-            if model.find_component('select_small_' + self.name):
-                select_small = model.find_component('select_small_' + self.name)
+            registry = get_registry(model)
+            if registry.has(self.name, 'select_small'):
+                select_small = self._get_var(model, 'select_small')
             else:
                 select_small = Disjunct()
-                model.add_component('select_small_' + self.name, select_small)
+                self._add_var(model, 'select_small', select_small)
                 select_small_size = pyo.Constraint(expr=power_el <= 50)
                 select_small.add_component('select_small_size_' + self.name,
                                            select_small_size)
@@ -146,13 +148,13 @@ class CHP(Component):
             select_small.add_component('select_small_relation_' + self.name,
                                        select_small_relation)
 
-            if not model.find_component('select_large_' + self.name):
+            if not registry.has(self.name, 'select_large'):
                 dj_power = Disjunction(expr=select_small)
                 model.add_component('disjunction_power_' + self.name, dj_power)
 
     def _constraint_start_stop_ratio(self, model):
-        status = model.find_component('status_' + self.name)
-        inlet_temp = model.find_component('inlet_temp_' + self.name)
+        status = self._get_var(model, 'status')
+        inlet_temp = self._get_var(model, 'inlet_temp')
         # start = model.find_component('start_' + self.name)
         model.cons.add(status[1] == 0)
         for t in model.time_step:
@@ -213,22 +215,22 @@ class CHP(Component):
             model.add_component('dj_dis3_' + str(t), dj)
 
     def _constraint_start_cost(self, model):
-        start = model.find_component('start_' + self.name)
-        start_cost = model.find_component('start_cost_' + self.name)
-        other_op_cost = model.find_component('other_op_cost_' + self.name)
+        start = self._get_var(model, 'start')
+        start_cost = self._get_var(model, 'start_cost')
+        other_op_cost = self._get_var(model, 'other_op_cost')
         model.cons.add(start_cost == self.start_price * sum(start[t] for t in
                                                             model.time_step))
         model.cons.add(other_op_cost == start_cost)
 
     def _constraint_status(self, model):
         """
-        The status is set to 0 every 24 hours.
+        The status is set to 0 at the end of each period, which is one day
+        without clustering.
         """
-        period_length = 24
-        status = model.find_component('status_' + self.name)
+        status = self._get_var(model, 'status')
 
         for t in range(2, len(model.time_step) + 6):
-            if t % period_length == 0:
+            if t % self.period_length == 0:
                 model.cons.add(status[t] == 0)
 
     def _constraint_conver_puls(self, model):
@@ -236,21 +238,31 @@ class CHP(Component):
         status_chp ----- zur Beschreibung der taktenden Betrieb
         input * η = output
         """
-        size = model.find_component('size_' + self.name)
-        therm_size = model.find_component('therm_size_' + self.name)
-        therm_eff = model.find_component('therm_eff_' + self.name)
-        input_energy = model.find_component(
-            'input_' + self.inputs[0] + '_' + self.name)
-        output_heat = model.find_component(
-            'output_' + self.outputs[0] + '_' + self.name)
-        output_elec = model.find_component(
-            'output_' + self.outputs[1] + '_' + self.name)
-        status = model.find_component('status_' + self.name)
+        size = self._get_var(model, 'size')
+        therm_size = self._get_var(model, 'therm_size')
+        therm_eff = self._get_var(model, 'therm_eff')
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        output_heat = self._get_var(model, 'output_' + self.outputs[0])
+        output_elec = self._get_var(model, 'output_' + self.outputs[1])
+        status = self._get_var(model, 'status')
 
-        for t in model.time_step:
-            model.cons.add(input_energy[t] * therm_eff[t] == output_heat[t])
-            model.cons.add(therm_size * status[t + 1] == output_heat[t])
-            model.cons.add(size * status[t + 1] == output_elec[t])
+        def conver_rule(m, t):
+            return input_energy[t] * therm_eff[t] == output_heat[t]
+
+        def therm_puls_rule(m, t):
+            return therm_size * status[t + 1] == output_heat[t]
+
+        def elec_puls_rule(m, t):
+            return size * status[t + 1] == output_elec[t]
+
+        model.add_component('conver_puls_' + self.name,
+                            pyo.Constraint(model.time_step, rule=conver_rule))
+        model.add_component('therm_puls_' + self.name,
+                            pyo.Constraint(model.time_step,
+                                           rule=therm_puls_rule))
+        model.add_component('elec_puls_' + self.name,
+                            pyo.Constraint(model.time_step,
+                                           rule=elec_puls_rule))
 
     def add_cons(self, model):
         super().add_cons(model)
@@ -266,7 +278,7 @@ class CHP(Component):
         super().add_vars(model)
 
         therm_size = pyo.Var(bounds=(0, 600))
-        model.add_component('therm_size_' + self.name, therm_size)
+        self._add_var(model, 'therm_size', therm_size)
 
         status = pyo.Var(range(1, len(model.time_step) + 6), domain=pyo.Binary)
-        model.add_component('status_' + self.name, status)
+        self._add_var(model, 'status', status)
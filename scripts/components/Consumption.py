@@ -0,0 +1,80 @@
+import numpy as np
+import pyomo.environ as pyo
+from scripts.Component import Component
+from scripts.VarRegistry import get_registry
+
+
+class Consumption(Component):
+    """
+    The class Consumption is the parent class for the heat, electrical and hot
+    water consumption. The input energy of the consumption is determined by
+    the demand profile consum_profile, which is set by the child classes.
+    """
+
+    def _constraint_vdi2067(self, model):
+        """
+        The consumption has currently no max. power or investment constraint.
+        However, in the future this can be used to implement costs of the
+        energy consumers.
+        """
+        pass
+
+    def _constraint_maxpower(self, model):
+        """
+        The consumption has currently no max. power or investment constraint.
+        However, in the future this can be used to implement the max. power of
+        single power socket etc.
+        """
+        pass
+
+    def _constraint_conver(self, model):
+        """The input energy for Consumption should equal to the demand profil"""
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+
+        if self._fix_profile(model) and isinstance(input_energy, pyo.Var):
+            # The input is determined by the profile, so the variables are
+            # fixed instead of adding an equality constraint for each time
+            # step. The fixed variables are handed to solver as constants.
+            # If the input is an expression over the energy flows, the
+            # equality constraint is still needed.
+            for t in model.time_step:
+                input_energy[t].fix(self.consum_profile[t-1])
+            return
+
+        # The profile is a mutable parameter, so that it could be updated
+        # without rebuilding the model.
+        profile = self._add_profile_param(model, 'consum_profile',
+                                          self.consum_profile)
+
+        def conver_rule(m, t):
+            return input_energy[t] == profile[t]
+
+        conver = pyo.Constraint(model.time_step, rule=conver_rule)
+        model.add_component('conver_' + self.name, conver)
+
+    def update_parameters(self, model):
+        """Update the demand profile in the model, the fixed input variables
+        are fixed to the new profile."""
+        if get_registry(model).has(self.name, 'consum_profile'):
+            self._set_profile_param(model, 'consum_profile',
+                                    self.consum_profile)
+        else:
+            input_energy = self._get_var(model, 'input_' + self.inputs[0])
+            for t in model.time_step:
+                input_energy[t].fix(self.consum_profile[t-1])
+
+    def _matrix_vdi2067(self, model, size_key='size', size_factor=1):
+        pass
+
+    def _matrix_maxpower(self, model):
+        pass
+
+    def _matrix_conver(self, model):
+        """Same as _constraint_conver for matrix model."""
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        profile = np.asarray(self.consum_profile[:len(model.time_step)])
+        if self._fix_profile(model):
+            model.fix(input_energy, profile)
+        else:
+            model.add_eq('conver_' + self.name, [(input_energy.cols, 1)],
+                         rhs=profile)
@@ -22,6 +22,9 @@ class ElectricityGrid(Component):
         """
         pass
 
+    def _matrix_conver(self, model):
+        pass
+
     # def add_vars(self, model):
     #     """Rewrite the function in case of input and output """
     #     # comp_size = pyo.Var(bounds=(self.min_size, self.max_size))
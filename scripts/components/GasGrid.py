@@ -20,3 +20,6 @@ class GasGrid(Component):
         """
         pass
 
+    def _matrix_conver(self, model):
+        pass
+
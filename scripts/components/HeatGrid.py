@@ -34,6 +34,10 @@ class HeatGrid(Component):
         The Grid could not provide more power than the source
         """
         if self.source_profile is not None:
-            output_powers = model.find_component('output_heat_' + self.name)
-            for t in model.time_step:
-                model.cons.add(output_powers[t] <= self.source_profile[t-1])
\ No newline at end of file
+            output_powers = self._get_var(model, 'output_heat')
+
+            def max_power_rule(m, t):
+                return output_powers[t] <= self.source_profile[t-1]
+
+            max_power = pyo.Constraint(model.time_step, rule=max_power_rule)
+            model.add_component('max_power_' + self.name, max_power)
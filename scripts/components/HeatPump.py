@@ -1,3 +1,4 @@
+import numpy as np
 import pyomo.environ as pyo
 from scripts.Component import Component
 import warnings
@@ -50,13 +51,27 @@ class HeatPump(Component):
         """
         # The cop_list could only be defined with dict, list is not possible
         # for pyomo 6.0. The reason is the unmatched index in pyomo and python
+        cop_profile = self._calc_cop(len(model.time_step))
         cop_list = {}
         for t in model.time_step:
-            cop_list[t] = (self.outlet_temp + 273.15) * self.efficiency[
-                self.outputs[0]] / (self.outlet_temp - self.temp_profile[t - 1])
+            cop_list[t] = cop_profile[t - 1]
 
-        cop = pyo.Param(model.time_step, initialize=cop_list)
-        model.add_component('cop_' + self.name, cop)
+        # The COP is mutable, so that it could be updated with a new
+        # temperature profile without rebuilding the model.
+        cop = pyo.Param(model.time_step, initialize=cop_list, mutable=True)
+        self._add_var(model, 'cop', cop)
+
+    def update_parameters(self, model):
+        """Update the COP with the current temperature profile."""
+        self._set_profile_param(model, 'cop',
+                                self._calc_cop(len(model.time_step)))
+
+    def _calc_cop(self, nr_time_steps):
+        """Return the COP value for the first nr_time_steps of the
+        temperature profile as numpy array."""
+        temp = np.asarray(self.temp_profile[:nr_time_steps], dtype=float)
+        return (self.outlet_temp + 273.15) * self.efficiency[
+            self.outputs[0]] / (self.outlet_temp - temp)
 
     def _constraint_conver(self, model):
         """
@@ -64,14 +79,21 @@ class HeatPump(Component):
         Heat pump has only one input and one output, maybe? be caution for 5
         generation heat network.
         """
-        input_powers = model.find_component('input_' + self.inputs[0] + '_' +
-                                            self.name)
-        output_powers = model.find_component('output_' + self.outputs[0] + '_' +
-                                             self.name)
-        cop = model.find_component('cop_' + self.name)
-        for t in model.time_step:
-            model.cons.add(output_powers[t] == input_powers[t] * cop[t])
-
-    def add_cons(self, model):
         self._constraint_cop(model)
-        super().add_cons(model)
+        input_powers = self._get_var(model, 'input_' + self.inputs[0])
+        output_powers = self._get_var(model, 'output_' + self.outputs[0])
+        cop = self._get_var(model, 'cop')
+
+        def conver_rule(m, t):
+            return output_powers[t] == input_powers[t] * cop[t]
+
+        conver = pyo.Constraint(model.time_step, rule=conver_rule)
+        model.add_component('conver_' + self.name, conver)
+
+    def _matrix_conver(self, model):
+        """Same as _constraint_conver for matrix model."""
+        input_powers = self._get_var(model, 'input_' + self.inputs[0])
+        output_powers = self._get_var(model, 'output_' + self.outputs[0])
+        cop = self._calc_cop(len(model.time_step))
+        model.add_eq('conver_' + self.name,
+                     [(output_powers.cols, 1), (input_powers.cols, -cop)])
@@ -1,6 +1,8 @@
 import pyomo.environ as pyo
 from pyomo.gdp import Disjunct, Disjunction
 from scripts.components.Storage import Storage
+from scripts.VarRegistry import get_registry
+from scripts.MatrixModel import MatrixVar
 from utils.calc_annuity_vdi2067 import calc_annuity
 
 water_heat_cap = 4.18 * 10 ** 3  # Unit J/kgK
@@ -33,8 +35,8 @@ class HotWaterStorage(Storage):
         This constraint indicates the relationship between storage volume in
         cubic meter and energy size in kWh
         """
-        size = model.find_component('size_' + self.name)
-        volume = model.find_component('volume_' + self.name)
+        size = self._get_var(model, 'size')
+        volume = self._get_var(model, 'volume')
         model.cons.add(size == volume * water_density * water_heat_cap *
                        self.temp_diff / unit_switch)
 
@@ -43,9 +45,9 @@ class HotWaterStorage(Storage):
         Compared to Component, the annual cost of hot water tank should be
         calculated with its volume instead of the energy size in kWh.
         """
-        volume = model.find_component('volume_' + self.name)
-        annual_cost = model.find_component('annual_cost_' + self.name)
-        invest = model.find_component('invest_' + self.name)
+        volume = self._get_var(model, 'volume')
+        annual_cost = self._get_var(model, 'annual_cost')
+        invest = self._get_var(model, 'invest')
 
         # Take the fixed cost for investment into account and use dgp model to
         # indicate that, if component size is equal to zero, the investment
@@ -134,9 +136,40 @@ class HotWaterStorage(Storage):
         # The unit for hot water storage in Topology and in calculation of
         # cost are cubic meter, so the maximal and minimal size of energy in
         # kWh should be modified.
-        model.del_component('size_' + self.name)
+        get_registry(model).delete(model, self.name, 'size')
         energy_size = pyo.Var(bounds=(0, None))
-        model.add_component('size_' + self.name, energy_size)  # unit in kWh
+        self._add_var(model, 'size', energy_size)  # unit in kWh
 
         volume = pyo.Var(bounds=(self.min_size, self.max_size))
-        model.add_component('volume_' + self.name, volume)  # unit in Liter
+        self._add_var(model, 'volume', volume)  # unit in Liter
+
+    def _update_size_bounds(self, model):
+        """The size range of hot water storage is given in volume."""
+        self._get_var(model, 'volume').setlb(self.min_size)
+        self._get_var(model, 'volume').setub(self.max_size)
+
+    def _matrix_volume(self, model):
+        size = self._get_var(model, 'size')
+        volume = self._get_var(model, 'volume')
+        model.add_eq('volume_' + self.name,
+                     [(size.col, 1), (volume.col, -water_density *
+                                      water_heat_cap * self.temp_diff /
+                                      unit_switch)])
+
+    def _matrix_vdi2067(self, model, size_key='volume', size_factor=1):
+        """The annual cost is calculated with volume, same as
+        _constraint_vdi2067."""
+        super()._matrix_vdi2067(model, size_key, size_factor)
+
+    def add_matrix_cons(self, model):
+        super().add_matrix_cons(model)
+
+        self._matrix_volume(model)
+
+    def add_matrix_vars(self, model):
+        super().add_matrix_vars(model)
+
+        get_registry(model).delete(model, self.name, 'size')
+        self._add_var(model, 'size', MatrixVar(bounds=(0, None)))
+        self._add_var(model, 'volume',
+                      MatrixVar(bounds=(self.min_size, self.max_size)))
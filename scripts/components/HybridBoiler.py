@@ -1,3 +1,4 @@
+import pyomo.environ as pyo
 from scripts.Component import Component
 import os
 
@@ -22,13 +23,17 @@ class HybridBoiler(Component):
         """
         The Grid has "no" fixed input and therefore it should not be constrainted
         """
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        input_energy_2 = self._get_var(model, 'input_' + self.inputs[1])
+        output_energy = {}
         for output in self.outputs:
-            output_energy = model.find_component('output_' + output + '_' +
-                                                 self.name)
-            input_energy = model.find_component('input_' + self.inputs[0] +
-                                                '_' + self.name)
-            input_energy_2 = model.find_component('input_' + self.inputs[1] +
-                                                  '_' + self.name)
-            for t in model.time_step:
-                model.cons.add(output_energy[t] == (input_energy[t] +
-                               input_energy_2[t]) * self.efficiency[output])
\ No newline at end of file
+            output_energy[output] = self._get_var(model, 'output_' + output)
+
+        def conver_rule(m, output, t):
+            return output_energy[output][t] == (input_energy[t] +
+                                                input_energy_2[t]) * \
+                self.efficiency[output]
+
+        conver = pyo.Constraint(self.outputs, model.time_step,
+                                rule=conver_rule)
+        model.add_component('conver_' + self.name, conver)
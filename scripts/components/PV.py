@@ -1,6 +1,9 @@
 import warnings
+import numpy as np
 import pyomo.environ as pyo
 from scripts.Component import Component
+from scripts.VarRegistry import get_registry
+from scripts.MatrixModel import MatrixVar
 
 
 class PV(Component):
@@ -25,8 +28,8 @@ class PV(Component):
         square meter and pv size in kWp. The nominal power is calculated
         according to the sunlight intensity of 1 kW/m².
         """
-        area = model.find_component('solar_area_' + self.name)
-        size = model.find_component('size_' + self.name)
+        area = self._get_var(model, 'solar_area')
+        size = self._get_var(model, 'size')
         model.cons.add(size == area * 1 * self.efficiency['elec'])  # The 1 in
         # equation means the standard sunlight intensity of 1 kW/m²
 
@@ -35,13 +38,37 @@ class PV(Component):
         This constraint indicates the relationship between panel area and the
         acceptable input energy.
         """
-        input_powers = model.find_component('input_' + self.inputs[0] + '_' +
-                                            self.name)
-        area = model.find_component('solar_area_' + self.name)
-        for t in model.time_step:
-            model.cons.add(input_powers[t] == area / 1000 * self.irr_profile[
-                t - 1])
+        if self._fix_profile(model):
+            # The input is already substituted in add_vars.
+            return
+
+        input_powers = self._get_var(model, 'input_' + self.inputs[0])
+        area = self._get_var(model, 'solar_area')
+        irr = self._add_profile_param(model, 'irr_profile', self.irr_profile)
+
+        def solar_input_rule(m, t):
             # unit fo irradiance is W/m², should be changed to kW/m²
+            return input_powers[t] == area / 1000 * irr[t]
+
+        solar_input = pyo.Constraint(model.time_step, rule=solar_input_rule)
+        model.add_component('solar_input_' + self.name, solar_input)
+
+    def _substitute_input(self, model):
+        """
+        The input energy is determined by the panel area and the irradiance
+        profile, so the input variables are replaced by an expression of the
+        area. The solver receives no constraint for each time step and the
+        expression is saved in the result file like a variable.
+        """
+        area = self._get_var(model, 'solar_area')
+        irr = self._add_profile_param(model, 'irr_profile', self.irr_profile)
+        get_registry(model).delete(model, self.name, 'input_' + self.inputs[0])
+
+        def solar_input_rule(m, t):
+            return area / 1000 * irr[t]
+
+        input_powers = pyo.Expression(model.time_step, rule=solar_input_rule)
+        self._add_var(model, 'input_' + self.inputs[0], input_powers)
 
     def add_cons(self, model):
         super().add_cons(model)
@@ -53,4 +80,35 @@ class PV(Component):
         super().add_vars(model)
 
         area = pyo.Var(bounds=(0, None))
-        model.add_component('solar_area_' + self.name, area)
+        self._add_var(model, 'solar_area', area)
+
+        if self._fix_profile(model):
+            self._substitute_input(model)
+
+    def update_parameters(self, model):
+        """Update the irradiance profile in the model."""
+        self._set_profile_param(model, 'irr_profile', self.irr_profile)
+
+    def _matrix_area(self, model):
+        area = self._get_var(model, 'solar_area')
+        size = self._get_var(model, 'size')
+        model.add_eq('area_' + self.name,
+                     [(size.col, 1), (area.col, -self.efficiency['elec'])])
+
+    def _matrix_input(self, model):
+        input_powers = self._get_var(model, 'input_' + self.inputs[0])
+        area = self._get_var(model, 'solar_area')
+        irr = np.asarray(self.irr_profile[:len(model.time_step)], dtype=float)
+        model.add_eq('solar_input_' + self.name,
+                     [(input_powers.cols, 1), (area.col, -irr / 1000)])
+
+    def add_matrix_cons(self, model):
+        super().add_matrix_cons(model)
+
+        self._matrix_area(model)
+        self._matrix_input(model)
+
+    def add_matrix_vars(self, model):
+        super().add_matrix_vars(model)
+
+        self._add_var(model, 'solar_area', MatrixVar(bounds=(0, None)))
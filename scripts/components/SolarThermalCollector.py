@@ -1,6 +1,10 @@
+import numpy as np
 import pyomo.environ as pyo
 from pyomo.gdp import Disjunct, Disjunction
 from scripts.Component import Component
+from scripts.VarRegistry import get_registry
+from scripts.BuildProfiler import profile
+from scripts.MatrixModel import MatrixVar
 from utils.calc_annuity_vdi2067 import calc_annuity
 
 small_num = 0.0001
@@ -29,8 +33,8 @@ class SolarThermalCollector(Component):
         square meter and pv size in kWp. The nominal power is calculated
         according to the sunlight intensity of 1 kW/m².
         """
-        area = model.find_component('solar_area_' + self.name)
-        size = model.find_component('size_' + self.name)
+        area = self._get_var(model, 'solar_area')
+        size = self._get_var(model, 'size')
         model.cons.add(size == area * 1 * self.efficiency['heat'])  # The 1 in
         # equation means the standard sunlight intensity of 1 kW/m²
 
@@ -39,22 +43,46 @@ class SolarThermalCollector(Component):
         This constraint indicates the relationship between panel area and the
         acceptable input energy.
         """
-        input_powers = model.find_component('input_' + self.inputs[0] + '_' +
-                                            self.name)
-        area = model.find_component('solar_area_' + self.name)
-        for t in model.time_step:
-            model.cons.add(input_powers[t] == area / 1000 * self.irr_profile[
-                t - 1])
+        if self._fix_profile(model):
+            # The input is already substituted in add_vars.
+            return
+
+        input_powers = self._get_var(model, 'input_' + self.inputs[0])
+        area = self._get_var(model, 'solar_area')
+        irr = self._add_profile_param(model, 'irr_profile', self.irr_profile)
+
+        def solar_input_rule(m, t):
             # unit fo irradiance is W/m², should be changed to kW/m²
+            return input_powers[t] == area / 1000 * irr[t]
+
+        solar_input = pyo.Constraint(model.time_step, rule=solar_input_rule)
+        model.add_component('solar_input_' + self.name, solar_input)
+
+    def _substitute_input(self, model):
+        """
+        The input energy is determined by the panel area and the irradiance
+        profile, so the input variables are replaced by an expression of the
+        area. The solver receives no constraint for each time step and the
+        expression is saved in the result file like a variable.
+        """
+        area = self._get_var(model, 'solar_area')
+        irr = self._add_profile_param(model, 'irr_profile', self.irr_profile)
+        get_registry(model).delete(model, self.name, 'input_' + self.inputs[0])
+
+        def solar_input_rule(m, t):
+            return area / 1000 * irr[t]
+
+        input_powers = pyo.Expression(model.time_step, rule=solar_input_rule)
+        self._add_var(model, 'input_' + self.inputs[0], input_powers)
 
     def _constraint_vdi2067(self, model):
         """
         Compared to Component, the annual cost of solar thermal colleactor
         should be calculated with its area instead of the energy size in kWh.
         """
-        area = model.find_component('solar_area_' + self.name)
-        annual_cost = model.find_component('annual_cost_' + self.name)
-        invest = model.find_component('invest_' + self.name)
+        area = self._get_var(model, 'solar_area')
+        annual_cost = self._get_var(model, 'annual_cost')
+        invest = self._get_var(model, 'invest')
 
         if self.min_size == 0:
             min_size = small_num
@@ -133,7 +161,9 @@ class SolarThermalCollector(Component):
         self._constraint_input(model)
 
         for subsidy in self.subsidy_list:
-            subsidy.add_cons(model)
+            with profile(model, subsidy.name + '_' + self.name, 'add_cons',
+                         level='subsidy'):
+                subsidy.add_cons(model)
             self._constraint_sub_annuity(model, subsidy.name)
 
     def add_vars(self, model):
@@ -143,4 +173,54 @@ class SolarThermalCollector(Component):
         max_area = self.max_size / 1 / self.efficiency['heat']
 
         area = pyo.Var(bounds=(min_area, max_area))
-        model.add_component('solar_area_' + self.name, area)
+        self._add_var(model, 'solar_area', area)
+
+        if self._fix_profile(model):
+            self._substitute_input(model)
+
+    def _update_size_bounds(self, model):
+        """The size range is also given to the area of solar collector."""
+        super()._update_size_bounds(model)
+        self._get_var(model, 'solar_area').setlb(
+            self.min_size / 1 / self.efficiency['heat'])
+        self._get_var(model, 'solar_area').setub(
+            self.max_size / 1 / self.efficiency['heat'])
+
+    def update_parameters(self, model):
+        """Update the irradiance profile in the model."""
+        self._set_profile_param(model, 'irr_profile', self.irr_profile)
+
+    def _matrix_area(self, model):
+        area = self._get_var(model, 'solar_area')
+        size = self._get_var(model, 'size')
+        model.add_eq('area_' + self.name,
+                     [(size.col, 1), (area.col, -self.efficiency['heat'])])
+
+    def _matrix_input(self, model):
+        input_powers = self._get_var(model, 'input_' + self.inputs[0])
+        area = self._get_var(model, 'solar_area')
+        irr = np.asarray(self.irr_profile[:len(model.time_step)], dtype=float)
+        model.add_eq('solar_input_' + self.name,
+                     [(input_powers.cols, 1), (area.col, -irr / 1000)])
+
+    def _matrix_vdi2067(self, model, size_key='solar_area', size_factor=None):
+        """The annual cost is calculated with area, same as
+        _constraint_vdi2067."""
+        if size_factor is None:
+            size_factor = 1 / self.efficiency['heat']
+        super()._matrix_vdi2067(model, size_key, size_factor)
+
+    def add_matrix_cons(self, model):
+        self._matrix_vdi2067(model)
+        self._matrix_conver(model)
+
+        self._matrix_area(model)
+        self._matrix_input(model)
+
+    def add_matrix_vars(self, model):
+        super().add_matrix_vars(model)
+
+        min_area = self.min_size / 1 / self.efficiency['heat']
+        max_area = self.max_size / 1 / self.efficiency['heat']
+        self._add_var(model, 'solar_area',
+                      MatrixVar(bounds=(min_area, max_area)))
@@ -1,6 +1,9 @@
 import warnings
+import numpy as np
 import pyomo.environ as pyo
 from scripts.Component import Component
+from scripts.BuildProfiler import profile
+from scripts.MatrixModel import MatrixVar
 
 
 class Storage(Component):
@@ -20,6 +23,16 @@ class Storage(Component):
         """
         self.cluster = None
         self.set_init = False
+        # The typical period of each original period (day) from the
+        # clustering, see Building.update_components. If inter_period is set
+        # to True, the stored energy is linked over the original periods, so
+        # that a seasonal storage could carry energy over the year, see
+        # _constraint_inter_period.
+        self.cluster_order = None
+        self.inter_period = False
+        # Whether the inter period storage is built, which is decided in
+        # add_vars and read in add_cons.
+        self.use_inter_period = False
 
     def _read_properties(self, properties):
         super()._read_properties(properties)
@@ -144,18 +157,27 @@ class Storage(Component):
         step. Other energy flows happen in the time step (1 hour), but stored
         energy is a state, which varies before and after the time step. In
         this utils, we consider the stored energy is before the time step.
+        For segmented typical periods the energy flows are the mean power in
+        the segment, so they are multiplied with the duration of the segment,
+        see _step_factors.
         """
-        input_energy = model.find_component('input_' + self.inputs[0] +
-                                            '_' + self.name)
-        output_energy = model.find_component('output_' + self.outputs[0] +
-                                             '_' + self.name)
-        stored_energy = model.find_component('energy_' + self.name)
-
-        for t in range(len(model.time_step) - 1):
-            model.cons.add(stored_energy[t + 1] * (1 - self.loss) +
-                           input_energy[t + 1] * self.input_efficiency -
-                           output_energy[t + 1] / self.output_efficiency ==
-                           stored_energy[t + 2])
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        output_energy = self._get_var(model, 'output_' + self.outputs[0])
+        stored_energy = self._get_var(model, 'energy')
+
+        last_time = len(model.time_step)
+
+        def conver_rule(m, t):
+            if t == last_time:
+                return pyo.Constraint.Skip
+            keep, duration = self._step_factors(t)
+            return stored_energy[t] * keep + \
+                input_energy[t] * (self.input_efficiency * duration) - \
+                output_energy[t] * (duration / self.output_efficiency) == \
+                stored_energy[t + 1]
+
+        conver = pyo.Constraint(model.time_step, rule=conver_rule)
+        model.add_component('conver_' + self.name, conver)
 
     def _constraint_init_energy(self, model):
         """
@@ -163,28 +185,40 @@ class Storage(Component):
         as fixed value. If this constraint is ignored, the initial state is
         not defined.
         """
-        stored_energy = model.find_component('energy_' + self.name)
-        size = model.find_component('size_' + self.name)
+        stored_energy = self._get_var(model, 'energy')
+        size = self._get_var(model, 'size')
         model.cons.add(stored_energy[1] == self.init_soc * size)
 
     def _constraint_maxpower(self, model):
-        input_energy = model.find_component('input_' + self.inputs[0] +
-                                            '_' + self.name)
-        output_energy = model.find_component('output_' + self.outputs[0] +
-                                             '_' + self.name)
-        size = model.find_component('size_' + self.name)
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        output_energy = self._get_var(model, 'output_' + self.outputs[0])
+        size = self._get_var(model, 'size')
 
-        for t in model.time_step:
-            model.cons.add(input_energy[t] <= size / self.e2p_in)
-            model.cons.add(output_energy[t] <= size / self.e2p_out)
+        def max_input_rule(m, t):
+            return input_energy[t] <= size / self.e2p_in
+
+        def max_output_rule(m, t):
+            return output_energy[t] <= size / self.e2p_out
+
+        max_input = pyo.Constraint(model.time_step, rule=max_input_rule)
+        max_output = pyo.Constraint(model.time_step, rule=max_output_rule)
+        model.add_component('max_input_' + self.name, max_input)
+        model.add_component('max_output_' + self.name, max_output)
 
     def _constraint_maxcap(self, model):
-        stored_energy = model.find_component('energy_' + self.name)
-        size = model.find_component('size_' + self.name)
+        stored_energy = self._get_var(model, 'energy')
+        size = self._get_var(model, 'size')
+
+        def max_cap_rule(m, t):
+            return stored_energy[t] <= self.max_soc * size
 
-        for t in model.time_step:
-            model.cons.add(stored_energy[t] <= self.max_soc * size)
-            model.cons.add(stored_energy[t] >= self.min_soc * size)
+        def min_cap_rule(m, t):
+            return stored_energy[t] >= self.min_soc * size
+
+        max_cap = pyo.Constraint(model.time_step, rule=max_cap_rule)
+        min_cap = pyo.Constraint(model.time_step, rule=min_cap_rule)
+        model.add_component('max_cap_' + self.name, max_cap)
+        model.add_component('min_cap_' + self.name, min_cap)
 
     def _constraint_conserve(self, model):
         """This constraint is used in the situation that cluster algorithm is
@@ -196,13 +230,11 @@ class Storage(Component):
         the simplify of energy conserve in a period would not influence the
         optimization results.
         """
-        # Attention! The period only for 24 hours is developed,
-        # other segments are not considered.
-        period_length = 24
+        period_length = self.period_length
         period_num = len(model.time_step) // period_length
         # period_end_list = [period_length * i for i in range(1, period_num + 1)]
 
-        stored_energy = model.find_component('energy_' + self.name)
+        stored_energy = self._get_var(model, 'energy')
         model.cons.add(sum(stored_energy[i * period_length] *
                            self.cluster[i * period_length - 1] for i in
                            range(1, period_num + 1)) -
@@ -217,34 +249,147 @@ class Storage(Component):
     def _constriant_unchange(self, model):
         """This is an additional constraint, which makes the final state of
         energy storage the same as the initial state."""
-        input_energy = model.find_component('input_' + self.inputs[0] +
-                                            '_' + self.name)
-        output_energy = model.find_component('output_' + self.outputs[0] +
-                                             '_' + self.name)
-        stored_energy = model.find_component('energy_' + self.name)
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        output_energy = self._get_var(model, 'output_' + self.outputs[0])
+        stored_energy = self._get_var(model, 'energy')
 
         last_time = len(model.time_step)
-        model.cons.add(stored_energy[last_time] * (1 - self.loss) +
-                       input_energy[last_time] * self.input_efficiency -
-                       output_energy[last_time] / self.output_efficiency ==
+        keep, duration = self._step_factors(last_time)
+        model.cons.add(stored_energy[last_time] * keep +
+                       input_energy[last_time] * (self.input_efficiency *
+                                                  duration) -
+                       output_energy[last_time] * (duration /
+                                                   self.output_efficiency) ==
                        stored_energy[1])
 
-    def add_cons(self, model):
-        self._constraint_conver(model)
-        self._constraint_maxpower(model)
-        self._constraint_maxcap(model)
-        self._constraint_vdi2067(model)
+    def _step_factors(self, t):
+        """The share of the stored energy, which is kept after the time step
+        t, and the duration of the time step in hours."""
+        if self.durations is None:
+            return 1 - self.loss, 1
+        duration = self.durations[t - 1]
+        return (1 - self.loss) ** duration, duration
+
+    def _use_inter_period(self):
+        if not self.inter_period or self.cluster is None:
+            return False
+        if self.cluster_order is None:
+            warnings.warn('The order of the typical periods is not given in '
+                          'the cluster result of ' + self.name + ', e.g. in a '
+                          'cluster file of an old version. The inter period '
+                          'storage is not used.')
+            return False
+        return True
+
+    def _period_starts(self):
+        """The first time step of each typical period."""
+        return list(range(1, len(self.cluster) + 1, self.period_length))
+
+    def _constraint_inter_period(self, model):
+        """
+        The formulation for seasonal storage in clustered models according to
+        the paper 'Time series aggregation for energy system design: Modeling
+        seasonal storage' (Kotzur et al. 2018). The stored energy is the
+        superposition of two states:
+            energy: the deviation in the typical period, which starts with 0
+                at the beginning of each typical period;
+            soc_inter: the stored energy at the beginning of each original
+                period (day), which is linked from one original period to the
+                next with the deviation at the end of its typical period.
+        The limits of the stored energy are checked with the maximal and
+        minimal deviation in each typical period (intra_max and intra_min),
+        which is a conservative simplification of the check in each time
+        step of the year.
+        """
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        output_energy = self._get_var(model, 'output_' + self.outputs[0])
+        stored_energy = self._get_var(model, 'energy')
+        soc_inter = self._get_var(model, 'soc_inter')
+        intra_max = self._get_var(model, 'intra_max')
+        intra_min = self._get_var(model, 'intra_min')
+        size = self._get_var(model, 'size')
+        starts = self._period_starts()
+
+        def balance(t):
+            keep, duration = self._step_factors(t)
+            return stored_energy[t] * keep + \
+                input_energy[t] * (self.input_efficiency * duration) - \
+                output_energy[t] * (duration / self.output_efficiency)
+
+        # The deviation in each typical period, which starts with 0.
+        def intra_conver_rule(m, t):
+            if (t - 1) % self.period_length == 0:
+                return stored_energy[t] == 0
+            return balance(t - 1) == stored_energy[t]
+
+        def intra_max_rule(m, t):
+            return stored_energy[t] <= intra_max[(t - 1) // self.period_length]
+
+        def intra_min_rule(m, t):
+            return stored_energy[t] >= intra_min[(t - 1) // self.period_length]
+
+        intra_conver = pyo.Constraint(model.time_step, rule=intra_conver_rule)
+        intra_max_cons = pyo.Constraint(model.time_step, rule=intra_max_rule)
+        intra_min_cons = pyo.Constraint(model.time_step, rule=intra_min_rule)
+        model.add_component('intra_conver_' + self.name, intra_conver)
+        model.add_component('intra_max_cap_' + self.name, intra_max_cons)
+        model.add_component('intra_min_cap_' + self.name, intra_min_cons)
+
+        # The share of stored energy, which is kept over each typical period.
+        keep_period = [np.prod([self._step_factors(t)[0] for t in
+                                range(start, start + self.period_length)])
+                       for start in starts]
+        days = range(1, len(self.cluster_order) + 1)
+
+        def link_rule(m, day):
+            nr = self.cluster_order[day - 1]
+            end = starts[nr] + self.period_length - 1
+            return soc_inter[day + 1] == soc_inter[day] * keep_period[nr] + \
+                balance(end)
+
+        def inter_max_rule(m, day):
+            nr = self.cluster_order[day - 1]
+            return soc_inter[day] + intra_max[nr] <= self.max_soc * size
+
+        def inter_min_rule(m, day):
+            nr = self.cluster_order[day - 1]
+            return soc_inter[day] * keep_period[nr] + intra_min[nr] >= \
+                self.min_soc * size
+
+        link = pyo.Constraint(days, rule=link_rule)
+        inter_max = pyo.Constraint(days, rule=inter_max_rule)
+        inter_min = pyo.Constraint(days, rule=inter_min_rule)
+        model.add_component('soc_inter_link_' + self.name, link)
+        model.add_component('inter_max_cap_' + self.name, inter_max)
+        model.add_component('inter_min_cap_' + self.name, inter_min)
+
+        model.cons.add(soc_inter[len(days) + 1] == soc_inter[1])
         if self.set_init:
-            self._constraint_init_energy(model)
-        self._constriant_unchange(model)
-        
-        if self.cluster is not None:
-            self._constraint_conserve(model)
+            model.cons.add(soc_inter[1] == self.init_soc * size)
+
+    def add_cons(self, model):
+        if self.use_inter_period:
+            self._constraint_maxpower(model)
+            self._constraint_vdi2067(model)
+            self._constraint_inter_period(model)
+        else:
+            self._constraint_conver(model)
+            self._constraint_maxpower(model)
+            self._constraint_maxcap(model)
+            self._constraint_vdi2067(model)
+            if self.set_init:
+                self._constraint_init_energy(model)
+            self._constriant_unchange(model)
+
+            if self.cluster is not None:
+                self._constraint_conserve(model)
         # else:
         #     self._constriant_unchange(model)
 
         for subsidy in self.subsidy_list:
-            subsidy.add_cons(model)
+            with profile(model, subsidy.name + '_' + self.name, 'add_cons',
+                         level='subsidy'):
+                subsidy.add_cons(model)
             self._constraint_sub_annuity(model, subsidy.name)
 
     def add_vars(self, model):
@@ -252,18 +397,140 @@ class Storage(Component):
         Compared to the general variables in components, the following
         variable should be assigned:
             energy: stored energy in the storage in each time step, unit kWh
+        For the inter period storage the energy is the deviation in the
+        typical period, which could be negative, and the following variables
+        are assigned, see _constraint_inter_period:
+            soc_inter: stored energy at the beginning of each original period
+            intra_max, intra_min: maximal and minimal deviation in each
+                typical period
         """
         super().add_vars(model)
 
-        energy = pyo.Var(model.time_step, bounds=(0, None))
-        model.add_component('energy_' + self.name, energy)
+        self.use_inter_period = self._use_inter_period()
+        if self.use_inter_period:
+            energy = pyo.Var(model.time_step, bounds=(None, None))
+            self._add_var(model, 'energy', energy)
+            nr_periods = len(self._period_starts())
+            self._add_var(model, 'soc_inter', pyo.Var(
+                range(1, len(self.cluster_order) + 2), bounds=(0, None)))
+            self._add_var(model, 'intra_max',
+                          pyo.Var(range(nr_periods), bounds=(0, None)))
+            self._add_var(model, 'intra_min',
+                          pyo.Var(range(nr_periods), bounds=(None, 0)))
+        else:
+            energy = pyo.Var(model.time_step, bounds=(0, None))
+            self._add_var(model, 'energy', energy)
+
+    def _matrix_conver(self, model):
+        """Same as _constraint_conver for matrix model, the stored energy in
+        the last time step is considered in _matrix_unchange."""
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        output_energy = self._get_var(model, 'output_' + self.outputs[0])
+        stored_energy = self._get_var(model, 'energy')
+        keep, duration = self._matrix_step_factors(model)
+
+        model.add_eq('conver_' + self.name,
+                     [(stored_energy.cols[:-1], keep[:-1]),
+                      (input_energy.cols[:-1],
+                       self.input_efficiency * duration[:-1]),
+                      (output_energy.cols[:-1],
+                       -duration[:-1] / self.output_efficiency),
+                      (stored_energy.cols[1:], -1)])
+
+    def _matrix_init_energy(self, model):
+        stored_energy = self._get_var(model, 'energy')
+        size = self._get_var(model, 'size')
+        model.add_eq('init_energy_' + self.name,
+                     [(stored_energy.cols[0], 1), (size.col, -self.init_soc)])
+
+    def _matrix_maxpower(self, model):
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        output_energy = self._get_var(model, 'output_' + self.outputs[0])
+        size = self._get_var(model, 'size')
+
+        model.add_rows('max_input_' + self.name,
+                       [(input_energy.cols, 1), (size.col, -1 / self.e2p_in)],
+                       ub=0)
+        model.add_rows('max_output_' + self.name,
+                       [(output_energy.cols, 1),
+                        (size.col, -1 / self.e2p_out)], ub=0)
+
+    def _matrix_maxcap(self, model):
+        stored_energy = self._get_var(model, 'energy')
+        size = self._get_var(model, 'size')
+
+        model.add_rows('max_cap_' + self.name,
+                       [(stored_energy.cols, 1), (size.col, -self.max_soc)],
+                       ub=0)
+        model.add_rows('min_cap_' + self.name,
+                       [(stored_energy.cols, 1), (size.col, -self.min_soc)],
+                       lb=0)
+
+    def _matrix_conserve(self, model):
+        """Same as _constraint_conserve for matrix model."""
+        period_length = self.period_length
+        period_num = len(model.time_step) // period_length
+        stored_energy = self._get_var(model, 'energy')
+        cluster = np.asarray(self.cluster, dtype=float)
+
+        # The index of python list starts from 0 and the time step from 1.
+        period_end = np.arange(1, period_num + 1) * period_length - 1
+        period_start = np.arange(period_num) * period_length
+        model.add_row('conserve_' + self.name,
+                      [(stored_energy.cols[period_end], cluster[period_end]),
+                       (stored_energy.cols[period_start],
+                        -cluster[period_start])], lb=0, ub=0)
+
+    def _matrix_unchange(self, model):
+        input_energy = self._get_var(model, 'input_' + self.inputs[0])
+        output_energy = self._get_var(model, 'output_' + self.outputs[0])
+        stored_energy = self._get_var(model, 'energy')
+        keep, duration = self._matrix_step_factors(model)
+
+        model.add_eq('unchange_' + self.name,
+                     [(stored_energy.cols[-1], keep[-1]),
+                      (input_energy.cols[-1],
+                       self.input_efficiency * duration[-1]),
+                      (output_energy.cols[-1],
+                       -duration[-1] / self.output_efficiency),
+                      (stored_energy.cols[0], -1)])
+
+    def _matrix_step_factors(self, model):
+        """Same as _step_factors for all time steps as arrays."""
+        if self.durations is None:
+            duration = np.ones(len(model.time_step))
+        else:
+            duration = np.asarray(self.durations, dtype=float)
+        return (1 - self.loss) ** duration, duration
+
+    def add_matrix_cons(self, model):
+        if self.inter_period:
+            warnings.warn('The inter period storage is not developed for the '
+                          'matrix model, the energy of ' + self.name + ' is '
+                          'only conserved over the typical periods.')
+        self._matrix_conver(model)
+        self._matrix_maxpower(model)
+        self._matrix_maxcap(model)
+        self._matrix_vdi2067(model)
+        if self.set_init:
+            self._matrix_init_energy(model)
+        self._matrix_unchange(model)
+
+        if self.cluster is not None:
+            self._matrix_conserve(model)
+
+    def add_matrix_vars(self, model):
+        super().add_matrix_vars(model)
+
+        self._add_var(model, 'energy',
+                      MatrixVar(model.time_step, bounds=(0, None)))
 
     # The class Storage is the parent class for Battery as well as Hot Water
     # Tank. Temperature is the attribution only for water tank, so this
     # following constraint should be sent to hot water tank fluid models.
     # def _constraint_conserve_temp(self, model):
     #     period_length = 24
-    #     temp_var = model.find_component('temp_' + self.name)
+    #     temp_var = self._get_var(model, 'temp')
     #
     #     for t in model.time_step:
     #         if t % period_length == 0:
@@ -3,6 +3,8 @@ import pyomo.environ as pyo
 from pyomo.gdp import Disjunct, Disjunction
 
 from scripts.subsidies.OperateSubsidy import OperateSubsidy
+from scripts.VarRegistry import get_registry
+from utils.weighted_sum import time_weights, weighted_sum
 
 
 small_num = 0.0001
@@ -41,15 +43,17 @@ class EEG(OperateSubsidy):
 
     def _constraint_rule(self, model, sbj_name, e_grid_name):
         # total_e_grid = model.find_component('input_elec_' + e_grid_name)
-        pv_to_e_grid = model.find_component('elec_' + sbj_name + '_' +
-                                            e_grid_name)
-        total_pv = model.find_component('output_elec_' + sbj_name)
-        sub_price = model.find_component('subsidy_price_' + self.name + '_' +
-                                         sbj_name)
-        sub_annuity = model.find_component('sub_annuity_' + self.name + '_' +
-                                           sbj_name)
-        sub_quantity = model.find_component('sub_quantity_' + self.name + '_' +
-                                            sbj_name)
+        registry = get_registry(model)
+        pv_to_e_grid = registry.flow(model, 'elec', sbj_name, e_grid_name)
+        total_pv = registry.output(model, sbj_name, 'elec')
+        sub_price = self._get_var(model, 'subsidy_price')
+        sub_annuity = self._get_var(model, 'sub_annuity')
+        sub_quantity = self._get_var(model, 'sub_quantity')
+
+        # The annual feed-in quantity is the same for all modes and rules.
+        feed_in_quantity = weighted_sum([pv_to_e_grid], model.time_step,
+                                        time_weights(model.time_step,
+                                                     self.cluster))
 
         def pv_to_grid_rule(model, t):
             return pv_to_e_grid[t] == total_pv[t]
@@ -65,20 +69,11 @@ class EEG(OperateSubsidy):
                 mode_rules[index + 1].add_component('sub_rule_' + str(index),
                                                     sub_rule)
 
-                if self.cluster is None:
-                    sub_quantity_rule = pyo.Constraint(expr=sub_quantity == sum(
-                        pv_to_e_grid[t] for t in model.time_step))
-                    mode_rules[index + 1].add_component('sub_quantity_rule_' +
-                                                        str(index),
-                                                        sub_quantity_rule)
-                else:
-                    nr_hour_occur = self.cluster['Occur']
-                    sub_quantity_rule = pyo.Constraint(expr=sub_quantity == sum(
-                        pv_to_e_grid[t] * nr_hour_occur[t - 1] for t in
-                        model.time_step))
-                    mode_rules[index + 1].add_component('sub_quantity_rule_' +
-                                                        str(index),
-                                                        sub_quantity_rule)
+                sub_quantity_rule = pyo.Constraint(expr=sub_quantity ==
+                                                   feed_in_quantity)
+                mode_rules[index + 1].add_component('sub_quantity_rule_' +
+                                                    str(index),
+                                                    sub_quantity_rule)
 
                 if mode in {'full feed-in + fixed compensation',
                             'full feed-in + direct marketing'}:
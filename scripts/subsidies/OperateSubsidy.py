@@ -3,6 +3,7 @@ import pyomo.environ as pyo
 from pyomo.gdp import Disjunct, Disjunction
 
 from scripts.Subsidy import Subsidy
+from scripts.VarRegistry import get_registry
 from utils.get_subsidy import find_sub_rules
 from utils.get_subsidy import find_sub_modes
 from utils.get_subsidy import find_mode_rules
@@ -48,14 +49,13 @@ class OperateSubsidy(Subsidy):
         # gurobi as the solver, the model might able be solved, as it could
         # solve the quadratic model.
         sub_price = pyo.Var(bounds=(0, 100))
-        model.add_component('subsidy_price_' + self.name + '_' + self.sbj_name,
-                            sub_price)
+        self._add_var(model, 'subsidy_price', sub_price)
 
         sub_quantity = pyo.Var(bounds=(0, 10e8))
-        model.add_component('sub_quantity_' + self.name + '_' + self.sbj_name,
-                            sub_quantity)
+        self._add_var(model, 'sub_quantity', sub_quantity)
 
-        model.del_component('subsidy_' + self.name + '_' + self.sbj_name)
+        get_registry(model).delete(model, self.sbj_name,
+                                   'subsidy_' + self.name)
 
     def add_cons(self, model):
         """add the constraints of the subsidy. sub_name is the name of the
@@ -73,9 +73,8 @@ class OperateSubsidy(Subsidy):
         #   50-100 kW: 0.1
         # the calculated subsidy price is 0.12 * (30 - 0) / 76 + 0.11 * (50 -
         # 30) / 76 + 0.1 * (76 - 50) / 76 = 0.111, but not 0.1.
-        sub_price = model.find_component('subsidy_price_' + self.name + '_' +
-                                         sbj_name)
-        depend_var = model.find_component('size_' + sbj_name)
+        sub_price = self._get_var(model, 'subsidy_price')
+        depend_var = get_registry(model).size(model, sbj_name)
 
         mode_list = []
         for mode in self.modes:
@@ -90,9 +89,12 @@ class OperateSubsidy(Subsidy):
                 bound_low = pyo.Constraint(expr=depend_var >= rules[index][
                     'lower'] + small_num)
 
-                if rules[index]['upper'] == 'inf':
-                    bound_up = pyo.Constraint(expr=depend_var <= np.inf)
-                else:
+                # The upper limit 'inf' in the csv file is read as float. The
+                # rule without upper limit has no constraint for the upper
+                # bound, depend_var <= inf would be transformed with an
+                # infinite big-M.
+                bound_up = None
+                if not np.isinf(float(rules[index]['upper'])):
                     bound_up = pyo.Constraint(expr=depend_var <= rules[index][
                         'upper'])
 
@@ -104,16 +106,17 @@ class OperateSubsidy(Subsidy):
 
                 rule[index + 1].add_component(self.name + '_bound_low_' + str(
                     index + 1), bound_low)
-                rule[index + 1].add_component(self.name + '_bound_up_' + str(
-                    index + 1), bound_up)
+                if bound_up is not None:
+                    rule[index + 1].add_component(
+                        self.name + '_bound_up_' + str(index + 1), bound_up)
                 rule[index + 1].add_component(self.name + '_' + mode
                                               + '_rule_' + str(index + 1),
                                               price_rule)
                 mode_list.append(rule[index + 1])
 
                 lower_bound = rules[index]['lower']
-                upper_bound = 10e5 if rules[index]['upper'] == 'inf' else (
-                    rules)[index]['upper']
+                upper_bound = 10e5 if np.isinf(float(rules[index][
+                    'upper'])) else rules[index]['upper']
                 range_size = upper_bound - lower_bound
                 weighted_price_expr += rules[index]['coefficient'] * range_size
 
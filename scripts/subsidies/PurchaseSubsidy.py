@@ -2,6 +2,7 @@ import numpy as np
 import pyomo.environ as pyo
 from pyomo.gdp import Disjunct, Disjunction
 from scripts.Subsidy import Subsidy
+from scripts.VarRegistry import get_registry
 
 
 small_num = 0.0001
@@ -27,15 +28,15 @@ class PurchaseSubsidy(Subsidy):
         self._constraint_rule(model)
 
     def _constraint_rule(self, model):
-        subsidy = model.find_component('subsidy_' + self.name + '_' +
-                                       self.sbj_name)
+        registry = get_registry(model)
+        subsidy = self._get_var(model, 'subsidy')
 
         if self.dependent_vars == 'investment':
-            depend_var = model.find_component('invest_' + self.sbj_name)
+            depend_var = registry.invest(model, self.sbj_name)
         elif self.dependent_vars == 'size':
-            depend_var = model.find_component('size_' + self.sbj_name)
+            depend_var = registry.size(model, self.sbj_name)
         elif self.dependent_vars == 'area':
-            depend_var = model.find_component('solar_area_' + self.sbj_name)
+            depend_var = registry.get(model, self.sbj_name, 'solar_area')
         else:
             raise ValueError('The dependent variable of subsidy {} is not '
                              'defined.'.format(self.name))
@@ -59,9 +60,11 @@ class PurchaseSubsidy(Subsidy):
                 bound_low = pyo.Constraint(expr=depend_var >= rules[index][
                     'lower'])
 
-            if rules[index]['upper'] == 'inf':
-                bound_up = pyo.Constraint(expr=depend_var <= np.inf)
-            else:
+            # The upper limit 'inf' in the csv file is read as float. The rule
+            # without upper limit has no constraint for the upper bound,
+            # depend_var <= inf would be transformed with an infinite big-M.
+            bound_up = None
+            if not np.isinf(float(rules[index]['upper'])):
                 bound_up = pyo.Constraint(expr=depend_var <= rules[index][
                     'upper'] - small_num)
 
@@ -74,8 +77,9 @@ class PurchaseSubsidy(Subsidy):
             # to be checked later
             rule[index + 1].add_component(self.name + '_bound_low_' + str(
                 index + 1), bound_low)
-            rule[index + 1].add_component(self.name + '_bound_up_' + str(
-                index + 1), bound_up)
+            if bound_up is not None:
+                rule[index + 1].add_component(self.name + '_bound_up_' + str(
+                    index + 1), bound_up)
             rule[index + 1].add_component(self.name + '_rule_' + str(index + 1),
                                           sub_rule)
             rule_list.append(rule[index + 1])
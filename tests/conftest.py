@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules are imported from the root of the repository like in the
+# examples, e.g. "from scripts.Project import Project".
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,39 @@
+import pyomo.environ as pyo
+from scripts.Checkpoint import Checkpoint
+
+
+def create_model():
+    model = pyo.ConcreteModel()
+    model.time_step = pyo.RangeSet(3)
+    model.x = pyo.Var(model.time_step, bounds=(0, 10))
+    model.y = pyo.Var(domain=pyo.Binary)
+    model.obj = pyo.Objective(expr=sum(model.x[t] for t in model.time_step))
+    return model
+
+
+def test_round_trip(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint'))
+    assert not checkpoint.exists()
+
+    model = create_model()
+    for t in model.time_step:
+        model.x[t].set_value(t * 1.5)
+    model.y.set_value(1)
+    checkpoint.save(model, objective=9.0, bound=8.5, gap=0.05,
+                    solve_time=1.2)
+    # The values of a callback replace the current values of the model.
+    checkpoint.save(model, {'x[2]': 7.0, 'y[None]': 0.9999}, objective=8.7,
+                    bound=8.6, gap=0.01, solve_time=2.0, finished=True)
+    assert checkpoint.exists()
+
+    info = checkpoint.info()
+    assert info['incumbent'] == 2
+    assert info['finished']
+    assert (info['objective'], info['bound'], info['gap']) == (8.7, 8.6, 0.01)
+
+    resumed = create_model()
+    resumed.x[3].fix(0)
+    assert checkpoint.load(resumed) == 3
+    assert [resumed.x[t].value for t in resumed.time_step] == [1.5, 7.0, 0]
+    # The binary values are rounded.
+    assert resumed.y.value == 1
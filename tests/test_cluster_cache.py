@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from scripts.ClusterCache import ClusterCache
+
+
+def create_profiles(seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'heat_demand': rng.random(48),
+                         'temp': rng.random(48)})
+
+
+def create_periods(seed):
+    rng = np.random.default_rng(seed)
+    typ_periods = pd.DataFrame({'level_0': np.repeat([0, 1], 24),
+                                'heat_demand': rng.random(48),
+                                'Occur': np.repeat([100, 265], 24)})
+    typ_periods.attrs['cluster_order'] = [0, 1, 1]
+    return typ_periods
+
+
+def test_key(tmp_path):
+    cache = ClusterCache(str(tmp_path))
+    settings = {'nr_periods': 2, 'hours_period': 24}
+    key = cache.key(create_profiles(0), settings)
+
+    assert cache.key(create_profiles(0), dict(settings)) == key
+    assert cache.key(create_profiles(0)[['temp', 'heat_demand']],
+                     settings) == key
+    assert cache.key(create_profiles(1), settings) != key
+    assert cache.key(create_profiles(0),
+                     {**settings, 'nr_periods': 3}) != key
+
+
+def test_store_and_load(tmp_path):
+    cache = ClusterCache(str(tmp_path))
+    typ_periods = create_periods(0)
+    cache.store('a', typ_periods, {'nr_periods': 2})
+    loaded = cache.load('a')
+
+    pd.testing.assert_frame_equal(loaded, typ_periods)
+    assert loaded.attrs['cluster_order'] == [0, 1, 1]
+    assert all(isinstance(column, str) for column in loaded.columns)
+    assert cache.load('b') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = ClusterCache(str(tmp_path))
+    cache.store('a', create_periods(0), {})
+    size = cache.report()['size']
+    # The cache holds two results.
+    cache.max_size = 2.5 * size
+    cache.store('b', create_periods(1), {})
+    cache.load('a')
+    cache.store('c', create_periods(2), {})
+
+    assert cache.load('a') is not None
+    assert cache.load('b') is None
+    assert cache.load('c') is not None
+    assert cache.report()['entries'] == 2
+    assert not (tmp_path / 'b.npz').exists()
@@ -0,0 +1,52 @@
+"""
+The matrix model should give the same objective as the pyomo model. The
+building of example 1 is optimized for one week with the heat and hot water
+demand as one profile.
+"""
+
+import os
+import numpy as np
+import pytest
+import pyomo.environ as pyo
+from scripts.Project import Project
+from scripts.Environment import Environment
+from scripts.Building import Building
+
+pytest.importorskip('highspy')
+
+base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_project(topology):
+    project = Project(name='test_matrix', typ='building')
+    env = Environment(time_step=168, city='Dusseldorf')
+    project.add_environment(env)
+
+    bld = Building(name='bld_1', area=500, bld_typ='Multi-family house')
+    bld.add_thermal_profile('heat', env)
+    bld.add_hot_water_profile(env)
+    bld.demand_profile['heat_demand'] = np.array(bld.demand_profile[
+        'heat_demand']) + np.array(bld.demand_profile['hot_water_demand'])
+    bld.add_elec_profile(env)
+    bld.add_topology(os.path.join(base_path, 'data', 'topology',
+                                  topology + '.csv'))
+    bld.add_components(project.environment)
+    project.add_building(bld)
+    return project
+
+
+@pytest.mark.parametrize('topology, objective', [('basic', 865.4241),
+                                                 ('basic_with_dhw', 1016.0127)])
+def test_objective_parity(topology, objective):
+    pyomo_project = create_project(topology)
+    pyomo_project.build_model()
+    pyomo_project.run_optimization('appsi_highs')
+
+    matrix_project = create_project(topology)
+    matrix_project.build_model(backend='matrix')
+    matrix_project.run_optimization('highs')
+
+    assert pyo.value(pyomo_project.model.obj) == pytest.approx(objective,
+                                                               abs=1e-4)
+    assert matrix_project.model.objective_value == pytest.approx(
+        pyo.value(pyomo_project.model.obj), rel=1e-6)
@@ -0,0 +1,46 @@
+import os
+import pytest
+import pyomo.environ as pyo
+from scripts.SolutionCache import SolutionCache
+
+
+def create_model(values):
+    model = pyo.ConcreteModel()
+    model.time_step = pyo.RangeSet(len(values))
+    model.x = pyo.Var(model.time_step, initialize=dict(enumerate(values, 1)))
+    model.obj = pyo.Objective(expr=sum(model.x[t] for t in model.time_step))
+    return model
+
+
+def test_nearest_and_load(tmp_path):
+    cache = SolutionCache(str(tmp_path))
+    cache.store(create_model([1, 2, 3]), 'a', {'elec_price': 0.3})
+    cache.store(create_model([4, 5, 6]), 'b', {'elec_price': 0.4})
+
+    model = create_model([0, 0, 0])
+    entry, distance = cache.nearest(model, {'elec_price': 0.39})
+    assert entry['project'] == 'b'
+    assert distance == pytest.approx(0.01 / 0.4)
+    assert cache.load(model, entry) == 3
+    assert [model.x[t].value for t in model.time_step] == [4, 5, 6]
+
+    # Another structure of the model has no cached solution.
+    assert cache.nearest(create_model([0, 0]), {}) == (None, None)
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = SolutionCache(str(tmp_path))
+    model = create_model([1, 2, 3])
+    cache.store(model, 'a', {'elec_price': 0.1})
+    fingerprint = cache.fingerprint(model)
+    size = cache._load_index(fingerprint)[0]['size']
+    # The cache holds two solutions.
+    cache.max_size = 2.5 * size
+    cache.store(model, 'b', {'elec_price': 0.2})
+    cache.load(model, cache.nearest(model, {'elec_price': 0.1})[0])
+    cache.store(model, 'c', {'elec_price': 0.3})
+
+    entries = cache._load_index(fingerprint)
+    assert sorted(entry['project'] for entry in entries) == ['a', 'c']
+    assert sorted(os.listdir(tmp_path / fingerprint)) == sorted(
+        [entry['file'] for entry in entries] + ['index.json'])
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+import pyomo.environ as pyo
+from utils.weighted_sum import time_weights, weighted_sum
+
+
+def create_cluster(occur, duration=None):
+    cluster = pd.DataFrame({'Occur': occur})
+    if duration is not None:
+        cluster['Duration'] = duration
+    return cluster
+
+
+def test_time_weights():
+    time_step = pyo.RangeSet(3)
+    assert time_weights(time_step).tolist() == [1, 1, 1]
+    assert time_weights(time_step, create_cluster(
+        [2, 2, 5])).tolist() == [2, 2, 5]
+    assert time_weights(time_step, create_cluster(
+        [2, 2, 5], [1, 3, 2])).tolist() == [2, 6, 10]
+
+
+def test_time_weights_length():
+    time_step = pyo.RangeSet(3)
+    with pytest.raises(ValueError, match='4 time steps'):
+        time_weights(time_step, create_cluster([1, 1, 1, 1]))
+
+
+def test_weighted_sum():
+    model = pyo.ConcreteModel()
+    model.time_step = pyo.RangeSet(3)
+    model.x = pyo.Var(model.time_step, initialize={1: 1, 2: 2, 3: 3})
+    model.y = pyo.Var(model.time_step, initialize=1)
+    expr = weighted_sum([model.x, model.y], model.time_step,
+                        np.array([1, 2, 3]))
+    assert pyo.value(expr) == 1 + 4 + 9 + 6
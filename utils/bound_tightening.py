@@ -0,0 +1,140 @@
+"""
+The bounds of the variables determine the big-M values of gdp.bigm. Most
+variables are defined with placeholder bounds, e.g. invest and the energy
+flows with (0, 10 ** 10), so the big-Ms are huge and the LP relaxation is
+weak. The bound inference tightens the bounds before the transformation:
+1. The bounds are propagated through the constraints of the model outside
+   the disjuncts (feasibility based bound tightening), so the maximal
+   sizes, the e2p ratios of storages and the peak demands limit the energy
+   flows and the inputs and outputs of the components.
+2. For the variables, which still have placeholder bounds, e.g. invest and
+   subsidy, the bounds implied by each disjunct are computed and the union
+   over the disjuncts of a disjunction is used, since one disjunct is
+   always selected. So the cost coefficients of cost model 1 and 2 and the
+   rules of the subsidies limit the investment and the subsidy.
+3. The new bounds are propagated again, e.g. from invest to annual cost.
+The bounds are only valid for the current parameters of the model. They
+could be restored after the transformation with restore_bounds.
+"""
+
+from warnings import warn
+import pyomo.environ as pyo
+from pyomo.common.collections import ComponentMap
+from pyomo.common.errors import InfeasibleConstraintException
+from pyomo.contrib.fbbt.fbbt import fbbt
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.gdp import Disjunct, Disjunction
+
+# The bounds from this value on are seen as placeholder bounds, e.g. 10 ** 8
+# for energy flows and 10 ** 10 for invest.
+loose_bound = 1e8
+
+
+def infer_bounds(model):
+    """
+    Tighten the bounds of the variables in the model, which are not fixed.
+    The disjunctions should not be transformed yet, the disjunctions, which
+    are already transformed, are ignored.
+    Returns the original bounds of all variables, see restore_bounds.
+    """
+    saved = ComponentMap()
+    for var in model.component_data_objects(
+            pyo.Var, active=None, descend_into=(pyo.Block, Disjunct)):
+        # The bounds could be given with mutable parameters.
+        saved[var] = (var.lower, var.upper)
+
+    disjunctions = list(model.component_data_objects(
+        Disjunction, active=True, descend_into=(pyo.Block, Disjunct)))
+    _propagate(model)
+    for disjunction in disjunctions:
+        if any(_is_loose(var) for disjunct in disjunction.disjuncts
+               for var in _disjunct_vars(disjunct)):
+            _tighten_disjunction(disjunction)
+    _propagate(model)
+    return saved
+
+
+def restore_bounds(saved):
+    """Restore the bounds, which are returned by infer_bounds."""
+    for var, (lb, ub) in saved.items():
+        var.setlb(lb)
+        var.setub(ub)
+
+
+def _is_loose(var):
+    return not var.fixed and (var.ub is None or var.ub >= loose_bound)
+
+
+def _disjunct_vars(disjunct):
+    variables = ComponentMap()
+    for con in disjunct.component_data_objects(pyo.Constraint, active=True,
+                                               descend_into=True):
+        for var in identify_variables(con.body, include_fixed=False):
+            variables[var] = None
+    return list(variables)
+
+
+def _propagate(model):
+    """Propagate the bounds through the active constraints outside the
+    disjuncts. The interval tightener of appsi is implemented in C++, the
+    python implementation of fbbt is too slow for the models with 8760 time
+    steps, so the step is skipped, if appsi is not compiled."""
+    from pyomo.contrib.appsi.cmodel import cmodel_available
+    if not cmodel_available:
+        warn('The appsi extensions of pyomo are not built, the bounds are '
+             'only inferred from the disjunctions. Run "pyomo build-'
+             'extensions" for the full bound inference.')
+        return
+    from pyomo.contrib.appsi.fbbt import IntervalTightener
+
+    # The constraints in the disjuncts are only valid, if the disjunct is
+    # selected, so they are deactivated during the propagation. The
+    # disjuncts themselves are not deactivated, since this would fix their
+    # indicator variables.
+    disjunct_cons = [con for disjunct in model.component_data_objects(
+        Disjunct, active=True, descend_into=(pyo.Block, Disjunct))
+        for con in disjunct.component_data_objects(
+            pyo.Constraint, active=True, descend_into=True)]
+    for con in disjunct_cons:
+        con.deactivate()
+    try:
+        tightener = IntervalTightener()
+        tightener.config.deactivate_satisfied_constraints = False
+        tightener.perform_fbbt(model)
+    finally:
+        for con in disjunct_cons:
+            con.activate()
+
+
+def _tighten_disjunction(disjunction):
+    """Set the bounds of the variables in the disjuncts to the union of the
+    bounds implied by each disjunct."""
+    implied = []
+    variables = ComponentMap()
+    for disjunct in disjunction.disjuncts:
+        disjunct_vars = _disjunct_vars(disjunct)
+        bounds = [(var, var.lb, var.ub) for var in disjunct_vars]
+        try:
+            fbbt(disjunct, deactivate_satisfied_constraints=False)
+            implied.append(ComponentMap((var, (var.lb, var.ub)) for var in
+                                        disjunct_vars))
+        except InfeasibleConstraintException:
+            # The disjunct could never be selected.
+            pass
+        finally:
+            for var, lb, ub in bounds:
+                var.setlb(lb)
+                var.setub(ub)
+        for var in disjunct_vars:
+            variables[var] = None
+    # At least one disjunct is selected, so the union is also valid for the
+    # disjunctions without xor.
+    if not implied:
+        return
+    for var in variables:
+        lbs = [item[var][0] if var in item else var.lb for item in implied]
+        ubs = [item[var][1] if var in item else var.ub for item in implied]
+        if None not in lbs and (var.lb is None or min(lbs) > var.lb):
+            var.setlb(min(lbs))
+        if None not in ubs and (var.ub is None or max(ubs) < var.ub):
+            var.setub(max(ubs))
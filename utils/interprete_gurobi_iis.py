@@ -1,6 +1,7 @@
 # interpretes the infeasible set of constraints and variables returned by gurobi
 import os
 import re
+from utils.model_writer import read_labels, constraint_name
 
 
 # 查找两个文件中变量的映射关系
@@ -102,8 +103,8 @@ def check_variables(file1, file2, vars_map):
 # vars_map中对应的value。最后将修改后的内容保存在一个新文件中
 def check_constraints(file, cons_map, vars_map):
     # Define regex patterns for variable and constraint
-    var_pattern = re.compile(r'(x\d+)')
-    cons_pattern = re.compile(r'(c_.+):')
+    var_pattern = re.compile(r'\b(x\d+)\b')
+    cons_pattern = re.compile(r'^(\S+):')
 
     new_file = file.replace('.ilp', '_new.ilp')
     with open(file, 'r') as f, open(new_file, 'w') as new_f:
@@ -112,15 +113,15 @@ def check_constraints(file, cons_map, vars_map):
             cons_match = cons_pattern.search(line)
             if cons_match:
                 cons = cons_match.group(1)
-                if cons in cons_map:
-                    line = line.replace(cons, cons_map[cons])
+                name = constraint_name(cons, cons_map)
+                if name is not None:
+                    line = line.replace(cons, name, 1)
 
-            # 检查line中的变量是否在vars_map的key中
-            var_match = var_pattern.findall(line)
-            if var_match:
-                for var in var_match:
-                    if var in vars_map:
-                        line = line.replace(var, vars_map[var])
+            # 检查line中的变量是否在vars_map的key中. The whole label is
+            # replaced, so that x1 is not replaced in x12.
+            line = var_pattern.sub(
+                lambda match: vars_map.get(match.group(1), match.group(1)),
+                line)
 
             new_f.write(line)
 
@@ -131,12 +132,10 @@ if __name__ == '__main__':
     base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     model_path = os.path.join(base_path, 'data', 'opt_output', 'project_4_2',
                               'model.lp')
-    raw_model_path = os.path.join(base_path, 'data', 'opt_output',
-                                  'project_4_2', 'raw_model.lp')
     iis_path = os.path.join(base_path, 'data', 'opt_output', 'project_4_2',
                             'iis.ilp')
 
-    if check_line_count(raw_model_path, model_path):
-        vars_map = map_variables(raw_model_path, model_path)
-        cons_map = map_constraints(raw_model_path, model_path)
-        new_file = check_constraints(iis_path, cons_map, vars_map)
+    # The names of the labels are saved in model_labels.csv by
+    # Project.run_optimization with save_lp=True.
+    vars_map, cons_map = read_labels(model_path)
+    new_file = check_constraints(iis_path, cons_map, vars_map)
@@ -0,0 +1,101 @@
+"""
+Write the model as lp or mps file in one pass with the compact labels of the
+pyomo writer (x1, x2, ... for variables) and save the mapping between the
+compact labels and the names of the variables and constraints in a separate
+csv file. The symbolic labels are not written into the model file, so the
+file is smaller and written faster, and the same file could be given to the
+solvers as input, see SolverRace. The label map replaces the second model
+file with symbolic labels, which was used to interpret the iis of gurobi,
+see utils/interprete_gurobi_iis.py.
+"""
+
+import os
+import re
+import weakref
+import pandas as pd
+import pyomo.environ as pyo
+
+# The lp writer of older pyomo versions adds the sense of the constraint to
+# the label in the file, e.g. c_u_x5_ for the label x5.
+_constraint_label = re.compile(r'^[cr]_[elu]_(.+)_$')
+
+
+def label_path(model_path):
+    """The path of the label map for the model file, e.g. model_labels.csv
+    for model.lp."""
+    return os.path.splitext(model_path)[0] + '_labels.csv'
+
+
+def write_model(model, path, save_labels=True):
+    """
+    Write the model into the lp or mps file, the format is given by the
+    extension of path. The label map is saved as csv file with the columns
+    label, name and type (var, con or obj) next to the model file, if
+    save_labels is True. The names are the same as in result.csv.
+    Returns the symbol map of the writer, which maps the labels in the file
+    to the components of the model.
+    """
+    _, smap_id = model.write(path, io_options={
+        'symbolic_solver_labels': False})
+    symbol_map = model.solutions.symbol_map[smap_id]
+    if save_labels:
+        # The names are built as in result.csv from the name of the indexed
+        # component and the index, which is faster than the name of each
+        # element.
+        parent_names = {}
+        records = []
+        for label, obj in symbol_map.bySymbol.items():
+            obj = _deref(obj)
+            if obj is None:
+                continue
+            parent = obj.parent_component()
+            if id(parent) not in parent_names:
+                parent_names[id(parent)] = parent.name
+            if obj.ctype is pyo.Var:
+                typ = 'var'
+            elif obj.ctype is pyo.Objective:
+                typ = 'obj'
+            else:
+                typ = 'con'
+            records.append((label, parent_names[id(parent)] + '[' +
+                            str(obj.index()) + ']', typ))
+        pd.DataFrame(records, columns=['label', 'name', 'type']).to_csv(
+            label_path(path), index=False)
+    return symbol_map
+
+
+def read_labels(path):
+    """Read the label map of the model file. Returns the dicts of the
+    variables and the constraints, which map the labels to the names."""
+    label_df = pd.read_csv(label_path(path))
+    var_map = label_df[label_df['type'] == 'var']
+    con_map = label_df[label_df['type'] != 'var']
+    return (dict(zip(var_map['label'], var_map['name'])),
+            dict(zip(con_map['label'], con_map['name'])))
+
+
+def constraint_name(label, con_map):
+    """Return the name of the constraint for the label in the model file or
+    None, if the label is not in the map."""
+    if label in con_map:
+        return con_map[label]
+    match = _constraint_label.match(label)
+    if match:
+        return con_map.get(match.group(1))
+    return None
+
+
+def set_values(symbol_map, values):
+    """Set the values of the solution, which are given by the labels in the
+    model file, as values of the not fixed variables."""
+    for label, value in values.items():
+        var = _deref(symbol_map.bySymbol.get(label))
+        if var is not None and var.ctype is pyo.Var and not var.fixed:
+            var.set_value(value, skip_validation=True)
+
+
+def _deref(obj):
+    # Older pyomo versions keep weak references in the symbol map.
+    if isinstance(obj, weakref.ReferenceType):
+        return obj()
+    return obj
@@ -0,0 +1,42 @@
+"""
+The linear relaxation of the model gives a lower bound of the objective for
+a fast screening of many buildings. All binary and integer variables are
+relaxed to continuous variables within their bounds: the indicator binaries
+of the disjunctions after gdp.bigm (cost model 1 and 2, part load, subsidy
+rules) and the binaries, which are declared directly in the model, e.g. the
+status of CHP and the connection of the building to the grid. The domains
+are restored after the solve, so that the same model could be solved as MILP
+afterwards.
+"""
+
+import pyomo.environ as pyo
+from pyomo.gdp import Disjunct
+
+
+def relax_integer_vars(model):
+    """Relax all binary and integer variables of the model including the
+    indicator variables of the deactivated disjuncts. Returns the list of
+    the relaxed variables with their domains and bounds, which is given to
+    restore_integer_vars."""
+    relaxed = []
+    for var in model.component_data_objects(
+            pyo.Var, active=None, descend_into=(pyo.Block, Disjunct)):
+        if not var.is_integer():
+            continue
+        # The bounds of binaries are given by the domain, they are set
+        # explicitly before the domain is changed.
+        lb, ub = var.bounds
+        relaxed.append((var, var.domain, var.lb, var.ub))
+        var.domain = pyo.Reals
+        var.setlb(lb)
+        var.setub(ub)
+    return relaxed
+
+
+def restore_integer_vars(relaxed):
+    """Restore the domains and bounds of the relaxed variables. The relaxed
+    values are kept in the variables."""
+    for var, domain, lb, ub in relaxed:
+        var.domain = domain
+        var.setlb(lb)
+        var.setub(ub)
@@ -0,0 +1,134 @@
+"""
+The performance profiles for the solvers. A profile describes the solving
+strategy with solver independent settings: relative mip gap, time limit in
+seconds, number of threads, presolve and heuristics. The settings are
+translated into the option names of each solver, so that the same profile
+could be used with gurobi, cplex, cbc, glpk and highs.
+"""
+
+import os
+from warnings import warn
+
+# threads: 0 means all available cores.
+# presolve: 'off', 'on' or 'aggressive'.
+# heuristics: 'low', 'normal' or 'high', the effort spent in heuristics.
+profiles = {
+    # The settings, which were used in run_optimization before.
+    'default': {'mip_gap': 0.01, 'time_limit': 90000},
+    # Fast comparison of many scenarios, the first good solution is enough.
+    'fast-screening': {'mip_gap': 0.05, 'time_limit': 600, 'threads': 0,
+                       'presolve': 'aggressive', 'heuristics': 'high'},
+    # Final design of the energy system with small gap.
+    'design-quality': {'mip_gap': 0.005, 'time_limit': 86400, 'threads': 0,
+                       'presolve': 'on', 'heuristics': 'normal'},
+    # The component sizes are given, only the operation is optimized, which
+    # is mostly a linear model or a model with few binaries.
+    'operation-only': {'mip_gap': 0.0001, 'time_limit': 3600, 'threads': 0,
+                       'presolve': 'on', 'heuristics': 'low'},
+}
+
+# The option names and the translation of values for each solver. The
+# solver names with prefix or suffix (appsi_highs, gurobi_persistent,
+# cplex_direct, ...) use the same options as the solver.
+solver_vocabulary = {
+    'gurobi': {'mip_gap': 'MIPGap', 'time_limit': 'TimeLimit',
+               'threads': 'Threads',
+               'presolve': ('Presolve', {'off': 0, 'on': 1,
+                                         'aggressive': 2}),
+               'heuristics': ('Heuristics', {'low': 0.01, 'normal': 0.05,
+                                             'high': 0.2})},
+    'cplex': {'mip_gap': 'mipgap', 'time_limit': 'timelimit',
+              'threads': 'threads',
+              'presolve': ('preprocessing_presolve', {'off': 0, 'on': 1,
+                                                      'aggressive': 1}),
+              'heuristics': ('mip_strategy_heuristicfreq',
+                             {'low': -1, 'normal': 0, 'high': 5})},
+    'cbc': {'mip_gap': 'ratioGap', 'time_limit': 'seconds',
+            'threads': 'threads',
+            'presolve': ('preprocess', {'off': 'off', 'on': 'on',
+                                        'aggressive': 'on'}),
+            'heuristics': ('heuristicsOnOff', {'low': 'off', 'normal': 'on',
+                                               'high': 'on'})},
+    # glpk has no threads, the flags are given with empty value.
+    'glpk': {'mip_gap': 'mipgap', 'time_limit': 'tmlim',
+             'presolve': ('presol', {'on': '', 'aggressive': ''}),
+             'heuristics': ('fpump', {'high': ''})},
+    'highs': {'mip_gap': 'mip_rel_gap', 'time_limit': 'time_limit',
+              'threads': 'threads',
+              'presolve': ('presolve', {'off': 'off', 'on': 'on',
+                                        'aggressive': 'on'}),
+              'heuristics': ('mip_heuristic_effort', {'low': 0.01,
+                                                      'normal': 0.05,
+                                                      'high': 0.3})},
+}
+
+# Gurobi needs the option for the bilinear constraints of subsidies.
+solver_fixed_options = {'gurobi': {'NonConvex': 2}}
+
+# The solvers, which need the exact number of threads instead of 0.
+count_threads = ['cbc', 'highs']
+
+# The prefixes and suffixes of the pyomo interfaces for the solvers.
+interface_prefixes = ['appsi_']
+interface_suffixes = ['_persistent', '_direct']
+
+
+def get_solver_family(solver_name):
+    """Return the solver without interface prefix or suffix, e.g. 'highs'
+    for 'appsi_highs' and 'gurobi' for 'gurobi_persistent', or None, if the
+    solver is not in solver_vocabulary."""
+    family = solver_name
+    for prefix in interface_prefixes:
+        if family.startswith(prefix):
+            family = family[len(prefix):]
+    for suffix in interface_suffixes:
+        if family.endswith(suffix):
+            family = family[:-len(suffix)]
+    if family in solver_vocabulary:
+        return family
+    return None
+
+
+def get_profile(profile='default'):
+    """Return the solver independent settings of the profile. The profile
+    could be the name or a dict with the settings."""
+    if isinstance(profile, dict):
+        return dict(profile)
+    if profile not in profiles:
+        raise ValueError('The solver profile ' + str(profile) + ' is not '
+                         'defined. The defined profiles are: ' +
+                         ', '.join(profiles) + '.')
+    return dict(profiles[profile])
+
+
+def get_solver_options(solver_name, profile='default', options=None):
+    """
+    Translate the profile into the options of the solver.
+    options: dict of solver options, which overwrite the translated options.
+    """
+    family = get_solver_family(solver_name)
+    solver_options = {}
+    if family is None:
+        warn('The options of solver ' + solver_name + ' are not known, the '
+             'profile is not used.')
+    else:
+        vocabulary = solver_vocabulary[family]
+        for key, value in get_profile(profile).items():
+            if value is None or key not in vocabulary:
+                continue
+            if key == 'threads' and value == 0 and family in count_threads:
+                value = os.cpu_count()
+            if key == 'time_limit' and family == 'glpk':
+                # glpk only accepts integer seconds.
+                value = int(value)
+            if isinstance(vocabulary[key], tuple):
+                name, values = vocabulary[key]
+                if value not in values:
+                    continue
+                solver_options[name] = values[value]
+            else:
+                solver_options[vocabulary[key]] = value
+        solver_options.update(solver_fixed_options.get(family, {}))
+    if options is not None:
+        solver_options.update(options)
+    return solver_options
@@ -0,0 +1,82 @@
+"""
+Run the clustering of the profiles with tsam and evaluate the error of the
+profiles, which are reconstructed from the typical periods, against the
+original profiles. The errors are used in Project.time_cluster to choose the
+smallest number of typical periods, which meets the given tolerance. The
+functions are defined on module level, so that they could be run in other
+processes.
+"""
+
+import copy
+import numpy as np
+import pandas as pd
+import tsam.timeseriesaggregation as tsam
+
+# The errors of the reconstructed profiles, all errors are relative to the
+# range (maximum - minimum) of the original profile.
+# rmse: the root mean square error over all time steps.
+# peak: the difference of the maxima of the profiles.
+# duration: the root mean square error of the duration curves, which are the
+#   profiles sorted in descending order.
+error_metrics = ['rmse', 'peak', 'duration']
+
+
+def cluster_profiles(raw, settings, errors=False):
+    """
+    Cluster the profiles into typical periods.
+    raw: DataFrame with one column for each profile and an hourly index.
+    settings: the arguments of tsam.TimeSeriesAggregation.
+    Returns the typical periods as DataFrame with the columns level_0 (the
+    typical period), TimeStep, the profiles and Occur (the number of
+    occurrence of the typical period). For the segmented periods the column
+    Duration gives the number of hours of each segment, the profiles are
+    the mean values over the hours of the segment. The typical period of
+    each original period is given as list in attrs['cluster_order']. If
+    errors is True, the
+    errors of each profile are also returned as DataFrame with the profiles
+    as index and the error metrics as columns.
+    """
+    # tsam changes the weights below its minimal weight.
+    aggregation = tsam.TimeSeriesAggregation(raw, **copy.deepcopy(settings))
+    typ_periods = aggregation.createTypicalPeriods()
+    period_occurs = aggregation.clusterPeriodNoOccur
+    typ_periods = typ_periods.reset_index().rename(columns={
+        'Segment Step': 'TimeStep', 'Segment Duration': 'Duration'})
+    typ_periods['Occur'] = typ_periods['level_0'].apply(
+        lambda x: period_occurs[x])
+    typ_periods.attrs['cluster_order'] = [int(nr) for nr in
+                                          aggregation.clusterOrder]
+    if not errors:
+        return typ_periods
+    predicted = aggregation.predictOriginalData()
+    return typ_periods, profile_errors(raw, predicted)
+
+
+def profile_errors(original, predicted):
+    """Return the errors of the predicted profiles, see error_metrics."""
+    records = {}
+    for column in original.columns:
+        orig = np.asarray(original[column], dtype=float)
+        pred = np.asarray(predicted[column], dtype=float)[:len(orig)]
+        span = orig.max() - orig.min()
+        if span == 0:
+            span = max(abs(orig.max()), 1)
+        records[column] = {
+            'rmse': np.sqrt(np.mean((pred - orig) ** 2)) / span,
+            'peak': abs(pred.max() - orig.max()) / span,
+            'duration': np.sqrt(np.mean((np.sort(pred) - np.sort(orig)) **
+                                        2)) / span}
+    return pd.DataFrame.from_dict(records, orient='index')[error_metrics]
+
+
+def meets_tolerance(errors, target_error):
+    """
+    Check, if the errors of all profiles meet the tolerance.
+    target_error: float, which is used for all error metrics, or dict with
+        the tolerance of the error metrics, the missing metrics are not
+        checked.
+    """
+    if not isinstance(target_error, dict):
+        target_error = {metric: target_error for metric in error_metrics}
+    return all(errors[metric].max() <= tolerance for metric, tolerance in
+               target_error.items())
@@ -0,0 +1,75 @@
+"""
+The annual sums over all time steps, like the operation cost or the revenue
+of the building, are built as flat linear expressions. The coefficients are
+calculated with numpy and handed to pyomo as one LinearExpression, instead
+of adding one term after another with the python sum, which is slow for long
+time series.
+"""
+
+import numpy as np
+import pyomo.environ as pyo
+from pyomo.common.gc_manager import PauseGC
+from pyomo.core.expr.numeric_expr import LinearExpression
+
+
+def time_weights(time_step, cluster=None):
+    """The weight of each time step in the annual sum. Without clustering
+    each time step has the weight 1, otherwise the number of occurrence of
+    the typical period, which is multiplied with the duration of the time
+    step in hours, if the periods are segmented. A ValueError is raised, if
+    the cluster has another number of time steps than the model."""
+    if cluster is None:
+        return np.ones(len(time_step))
+    weights = np.asarray(cluster['Occur'], dtype=float)
+    if 'Duration' in cluster.columns:
+        weights = weights * np.asarray(cluster['Duration'], dtype=float)
+    if len(weights) != len(time_step):
+        raise ValueError('The cluster has ' + str(len(weights)) + ' time '
+                         'steps, but the model has ' + str(len(time_step)) +
+                         ' time steps. The cluster does not match the '
+                         'profiles of the model.')
+    return weights
+
+
+def time_durations(cluster=None):
+    """The duration of each time step in hours for the segmented typical
+    periods, see Project.time_cluster, or None, if each time step is one
+    hour."""
+    if cluster is None or 'Duration' not in cluster.columns:
+        return None
+    return np.asarray(cluster['Duration'], dtype=float).tolist()
+
+
+def period_length(cluster):
+    """The number of time steps in each typical period."""
+    return int((cluster['level_0'] == cluster['level_0'].iloc[0]).sum())
+
+
+def weighted_sum(variables, time_step, coefs=1):
+    """
+    Return the sum of var[t] * coefs[t-1] over all time steps and all given
+    variables.
+    variables: list of indexed pyomo variables. Expressions are also
+        allowed, but they are summed up with quicksum.
+    coefs: float or array with the length of time steps.
+    """
+    coefs = np.broadcast_to(np.asarray(coefs, dtype=float),
+                            len(time_step)).tolist()
+    linear_vars = []
+    linear_coefs = []
+    others = []
+    # The garbage collection is paused like in the pyomo writers, since the
+    # terms are many small objects, which trigger the collection over the
+    # whole model.
+    with PauseGC():
+        for var in variables:
+            if var.ctype is pyo.Var:
+                linear_vars += [var[t] for t in time_step]
+                linear_coefs += coefs
+            else:
+                others += [coef * var[t] for coef, t in zip(coefs, time_step)]
+        expr = LinearExpression(constant=0, linear_coefs=linear_coefs,
+                                linear_vars=linear_vars)
+    if others:
+        return expr + pyo.quicksum(others)
+    return expr